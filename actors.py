@@ -0,0 +1,236 @@
+# actors.py
+# Actor/learner training: actor processes roll out CarAvoidEnv with a periodically synced NumPy copy of Net
+# and stream transitions to the learner (this process) through per-actor shared-memory rings.
+import os
+import signal
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+import torch.optim as optim
+
+from env import CarAvoidEnv, episode_seed
+from numpy_policy import NumpyPolicy
+from dqn import (Net, learn, make_buffer, device, ENV_CONFIG, LR, MIN_REPLAY, EPS_START, EPS_END, EPS_DECAY,
+                 MODEL_PATH, RING_SIZE, SYNC_EVERY, TARGET_SYNC_UPDATES, EPISODE_STREAM, EXPLORE_STREAM,
+                 REPLAY_STREAM)
+
+LOG_INTERVAL = 5.0  # seconds between learner progress lines
+
+
+class TransitionRing:
+    """
+    Single-producer/single-consumer transition ring in one SharedMemory block.
+    counters = [written, read, episodes]; stats = [episode reward sum].
+    The actor only advances `written`, the learner only advances `read`.
+    """
+    def __init__(self, capacity, state_dim, name=None):
+        layout = [
+            ("counters", (3,), np.int64),
+            ("actions", (capacity,), np.int64),
+            ("stats", (1,), np.float64),
+            ("states", (capacity, state_dim), np.float32),
+            ("next_states", (capacity, state_dim), np.float32),
+            ("rewards", (capacity,), np.float32),
+            ("dones", (capacity,), np.bool_),
+        ]
+        size = sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in layout)
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        offset = 0
+        for field, shape, dtype in layout:
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            setattr(self, field, array)
+            offset += array.nbytes
+        if self.owner:
+            self.counters[:] = 0
+            self.stats[:] = 0.0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, s, a, r, ns, d, stop):
+        """Append one transition, waiting while the ring is full. Returns False if stop was set."""
+        while self.counters[0] - self.counters[1] >= self.capacity:
+            if stop.is_set():
+                return False
+            time.sleep(0.0005)
+        i = self.counters[0] % self.capacity
+        self.states[i] = s
+        self.actions[i] = a
+        self.rewards[i] = r
+        self.next_states[i] = ns
+        self.dones[i] = d
+        self.counters[0] += 1
+        return True
+
+    def end_episode(self, episode_reward):
+        self.stats[0] += episode_reward
+        self.counters[2] += 1
+
+    def read_into(self, buffer):
+        """Move every pending transition into a replay buffer; returns how many were moved."""
+        written, read = self.counters[0], self.counters[1]
+        n = written - read
+        if n:
+            idx = (read + np.arange(n)) % self.capacity
+            buffer.push_many(self.states[idx], self.actions[idx], self.rewards[idx],
+                             self.next_states[idx], self.dones[idx])
+            self.counters[1] = written
+        return n
+
+    def close(self):
+        # drop array views before closing so the mmap has no exported buffers
+        for field in ("counters", "actions", "stats", "states", "next_states", "rewards", "dones"):
+            setattr(self, field, None)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def read_weights(shared_net, weights_version):
+    """
+    (version, NumpyPolicy) from a consistent copy of shared_net. weights_version is a seqlock: the learner
+    makes it odd while it copies new weights in and even again after, so a copy taken while it was odd,
+    or while it changed, may mix layers of two updates and is retried.
+    """
+    while True:
+        version = weights_version.value
+        if version % 2 == 0:
+            policy = NumpyPolicy.from_state_dict(shared_net.state_dict())
+            if weights_version.value == version:
+                return version, policy
+        time.sleep(0.0001)
+
+
+def run_actor(actor_id, num_actors, ring_name, ring_size, shared_net, weights_version, stop, seed=None,
+              env_config=ENV_CONFIG):
+    """
+    Actor i plays global episodes i, i + num_actors, ...; each is reset with
+    episode_seed(seed, EPISODE_STREAM, episode) so its env randomness does not depend on the worker.
+    """
+    torch.set_num_threads(1)
+    rng = np.random.default_rng(episode_seed(seed, EXPLORE_STREAM, actor_id))
+    env = CarAvoidEnv(**env_config)
+    n_actions = env.action_space()
+    state_dim = env.observation_space_dim()
+    ring = TransitionRing(ring_size, state_dim, name=ring_name)
+    policy = None
+    version = -1
+    eps = EPS_START
+    episode = actor_id
+
+    try:
+        while not stop.is_set():
+            state = env.reset(seed=episode_seed(seed, EPISODE_STREAM, episode))
+            episode += num_actors
+            episode_reward = 0.0
+            done = False
+            while not done:
+                if weights_version.value != version:
+                    version, policy = read_weights(shared_net, weights_version)
+                if rng.random() < eps:
+                    action = int(rng.integers(n_actions))
+                else:
+                    action = policy.act(state)
+                next_state, reward, done, info = env.step(action)
+                if not ring.write(state, action, reward, next_state, done, stop):
+                    return
+                state = next_state
+                episode_reward += reward
+            ring.end_episode(episode_reward)
+            eps = max(EPS_END, eps * EPS_DECAY)
+    finally:
+        ring.close()
+
+
+def train_distributed(num_actors=2, total_steps=200_000, prioritized=False, model_path=MODEL_PATH,
+                      ring_size=RING_SIZE, sync_every=SYNC_EVERY, seed=None, env_config=ENV_CONFIG):
+    """env_config: CarAvoidEnv kwargs for every actor. Single-agent only: a ring slot holds one transition per step."""
+    if seed is not None:
+        torch.manual_seed(seed)
+    env = CarAvoidEnv(**env_config)
+    n_actions = env.action_space()
+    state_dim = env.observation_space_dim()
+
+    policy_net = Net(state_dim, n_actions).to(device)
+    target_net = Net(state_dim, n_actions).to(device)
+    target_net.load_state_dict(policy_net.state_dict())
+    optimizer = optim.Adam(policy_net.parameters(), lr=LR)
+    buffer = make_buffer(state_dim, prioritized, seed=episode_seed(seed, REPLAY_STREAM))
+
+    ctx = mp.get_context("spawn")
+    shared_net = Net(state_dim, n_actions)
+    shared_net.load_state_dict(policy_net.state_dict())
+    shared_net.share_memory()
+    weights_version = ctx.Value("l", 0)
+    stop = ctx.Event()
+    rings = [TransitionRing(ring_size, state_dim) for _ in range(num_actors)]
+    actors = [ctx.Process(target=run_actor, daemon=True,
+                          args=(i, num_actors, ring.name, ring_size, shared_net, weights_version, stop, seed,
+                                env_config))
+              for i, ring in enumerate(rings)]
+
+    # actors inherit SIG_IGN so Ctrl-C only reaches the learner, which then stops them
+    handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        for actor in actors:
+            actor.start()
+    finally:
+        signal.signal(signal.SIGINT, handler)
+
+    steps = updates = 0
+    start = last_log = time.perf_counter()
+    last_steps = last_updates = last_episodes = 0
+    last_reward_sum = 0.0
+    try:
+        while steps < total_steps:
+            received = sum(ring.read_into(buffer) for ring in rings)
+            steps += received
+            if len(buffer) >= MIN_REPLAY:
+                learn(policy_net, target_net, optimizer, buffer)
+                updates += 1
+                if updates % sync_every == 0:
+                    weights_version.value += 1  # odd: actors skip the weights until the copy is done
+                    with torch.no_grad():
+                        for shared, param in zip(shared_net.parameters(), policy_net.parameters()):
+                            shared.copy_(param)
+                    weights_version.value += 1
+                if updates % TARGET_SYNC_UPDATES == 0:
+                    target_net.load_state_dict(policy_net.state_dict())
+            elif not received:
+                time.sleep(0.001)
+
+            now = time.perf_counter()
+            if now - last_log >= LOG_INTERVAL:
+                episodes = sum(int(ring.counters[2]) for ring in rings)
+                reward_sum = sum(float(ring.stats[0]) for ring in rings)
+                mean_reward = (reward_sum - last_reward_sum) / max(1, episodes - last_episodes)
+                elapsed = now - last_log
+                print(f"steps={steps} episodes={episodes} reward={mean_reward:.3f} "
+                      f"env-steps/s={(steps - last_steps) / elapsed:.0f} updates/s={(updates - last_updates) / elapsed:.0f}")
+                last_log, last_steps, last_updates = now, steps, updates
+                last_episodes, last_reward_sum = episodes, reward_sum
+    except KeyboardInterrupt:
+        print("Interrupted, stopping actors...")
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join(timeout=5)
+            if actor.is_alive():
+                actor.terminate()
+                actor.join()
+        for ring in rings:
+            ring.close()
+
+    elapsed = time.perf_counter() - start
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    torch.save(policy_net.state_dict(), model_path)
+    print(f"Collected {steps} env steps in {elapsed:.1f}s ({steps / elapsed:.0f}/s), {updates} updates. "
+          f"Model saved to {model_path}")
+    return policy_net
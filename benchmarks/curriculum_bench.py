@@ -0,0 +1,43 @@
+# benchmarks/curriculum_bench.py
+# Env steps and wall-clock until the greedy evaluation reward on the hardest curriculum stage reaches a target:
+# training on that stage directly against working up through the whole curriculum. Both runs evaluate the
+# same seeded episodes of the hardest stage once they train on it, and count every training env step.
+# Time to target varies a lot between seeds, hence the default of seven.
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from curriculum import EXAMPLE_STAGES, load_stages
+from sample_efficiency import time_to_target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark env steps to a target reward with and without a curriculum")
+    parser.add_argument("--target", type=float, default=15.0, help="greedy evaluation reward on the hardest stage")
+    parser.add_argument("--budget", type=int, default=400, help="episode budget per run")
+    parser.add_argument("--eval-every", type=int, default=10)
+    parser.add_argument("--eval-episodes", type=int, default=20)
+    parser.add_argument("--seeds", type=int, nargs="+", default=list(range(7)))
+    parser.add_argument("--stages", help="curriculum stages JSON (default: curriculum.EXAMPLE_STAGES)")
+    args = parser.parse_args()
+    if args.budget % args.eval_every:
+        parser.error("--budget must be a multiple of --eval-every")
+
+    stages = load_stages(args.stages) if args.stages else list(EXAMPLE_STAGES)
+    model_path = os.path.join(tempfile.mkdtemp(), "curriculum.pth")
+    print(f"hardest stage {stages[-1]}")
+    print(f"target eval reward {args.target} within {args.budget} episodes, seeds {args.seeds}")
+    print(f"{'variant':12s} {'reached':>7s} {'median steps':>12s} {'median secs':>11s}  per seed (steps/secs)")
+    for name, curriculum in (("direct", stages[-1:]), ("curriculum", stages)):
+        runs = [time_to_target(dict(curriculum=curriculum), args.target, args.budget, args.eval_every,
+                               args.eval_episodes, seed, model_path) for seed in args.seeds]
+        hits = [(steps, secs) for reached, steps, secs in runs if reached]
+        per_seed = "  ".join(f"{steps}/{secs:.0f}" if reached else "-" for reached, steps, secs in runs)
+        if hits:
+            print(f"{name:12s} {len(hits):3d}/{len(runs):<3d} {statistics.median(s for s, _ in hits):12,.0f} "
+                  f"{statistics.median(t for _, t in hits):11.1f}  {per_seed}")
+        else:
+            print(f"{name:12s} {0:3d}/{len(runs):<3d} {'-':>12s} {'-':>11s}  {per_seed}")
@@ -0,0 +1,74 @@
+# benchmarks/inference_load.py
+# Load generator: many concurrent clients asking for actions, served either by per-request
+# policy_net(s_t) calls or through the batching InferenceServer (in-process or over the Unix socket).
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn import load_policy, MODEL_PATH
+from inference_server import InferenceServer, PolicyClient, serve_unix
+
+
+def run_clients(num_clients, requests_per_client, make_act, state_dim):
+    def client(i):
+        act = make_act()
+        obs = np.random.default_rng(i).random((requests_per_client, state_dim), dtype=np.float32)
+        for row in obs:
+            act(row)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(num_clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return num_clients * requests_per_client / (time.perf_counter() - start)
+
+
+def per_request(policy_net):
+    def act(obs):
+        with torch.no_grad():
+            s_t = torch.tensor(obs, dtype=torch.float32).unsqueeze(0)
+            return int(torch.argmax(policy_net(s_t)).item())
+    return lambda: act
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=500, help="requests per client")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-latency-ms", type=float, default=2.0)
+    parser.add_argument("--socket", action="store_true", help="also benchmark the Unix socket front-end")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    policy_net = load_policy(args.model_path)
+    state_dim = policy_net.net[0].in_features
+
+    rps = run_clients(args.clients, args.requests, per_request(policy_net), state_dim)
+    print(f"per-request policy_net(s_t): {rps:,.0f} req/s")
+
+    with InferenceServer(policy_net, args.max_batch_size, args.max_latency_ms) as inference:
+        rps = run_clients(args.clients, args.requests, lambda: inference.act, state_dim)
+        print(f"batched in-process:         {rps:,.0f} req/s  {inference.metrics()}")
+
+    if args.socket:
+        path = f"/tmp/inference_load_{os.getpid()}.sock"
+        with InferenceServer(policy_net, args.max_batch_size, args.max_latency_ms) as inference:
+            server = serve_unix(inference, path)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                rps = run_clients(args.clients, args.requests, lambda: PolicyClient(path).act, state_dim)
+                print(f"batched unix socket:        {rps:,.0f} req/s  {inference.metrics()}")
+            finally:
+                server.shutdown()
+                server.server_close()
+                os.unlink(path)
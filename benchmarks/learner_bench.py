@@ -0,0 +1,81 @@
+# benchmarks/learner_bench.py
+# Learner updates/sec: eager learn() against FusedLearner with compile, bf16 and megabatch options.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn import (BATCH_SIZE, FusedLearner, Net, PrioritizedReplayBuffer, ReplayBuffer, device, learn,
+                 make_optimizer)
+
+VARIANTS = [
+    ("fused", {}),
+    ("fused+k4", dict(updates_per_sample=4)),
+    ("fused+bf16", dict(bf16=True)),
+    ("fused+compile", dict(compile=True)),
+    ("fused+compile+k4", dict(compile=True, updates_per_sample=4)),
+    ("fused+compile+bf16+k4", dict(compile=True, bf16=True, updates_per_sample=4)),
+]
+
+
+def filled_buffer(cls, capacity, state_dim, n_actions):
+    buffer = cls(capacity, state_dim, seed=0)
+    rng = np.random.default_rng(0)
+    s = rng.random((capacity, state_dim), dtype=np.float32)
+    buffer.push_many(s, rng.integers(0, n_actions, capacity), rng.random(capacity), s, rng.random(capacity) < 0.01)
+    return buffer
+
+
+def rate(update, updates_per_call, duration):
+    """Warm up (this triggers compilation), then count gradient updates per second."""
+    start = time.perf_counter()
+    update()
+    warmup = time.perf_counter() - start
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        update()
+        calls += 1
+    return calls * updates_per_call / (time.perf_counter() - start), warmup
+
+
+def bench(prioritized, duration, capacity, state_dim, n_actions, variants):
+    cls = PrioritizedReplayBuffer if prioritized else ReplayBuffer
+    name = "prioritized" if prioritized else "uniform"
+
+    torch.manual_seed(0)
+    policy_net, target_net = Net(state_dim, n_actions).to(device), Net(state_dim, n_actions).to(device)
+    optimizer = make_optimizer(policy_net)
+    buffer = filled_buffer(cls, capacity, state_dim, n_actions)
+    eager, _ = rate(lambda: learn(policy_net, target_net, optimizer, buffer), 1, duration)
+    print(f"{name:12s} {'eager':24s} {eager:9,.0f} updates/sec")
+
+    for label, kwargs in variants:
+        torch.manual_seed(0)
+        policy_net, target_net = Net(state_dim, n_actions).to(device), Net(state_dim, n_actions).to(device)
+        learner = FusedLearner(policy_net, target_net, make_optimizer(policy_net, fused=True), **kwargs)
+        buffer = filled_buffer(cls, capacity, state_dim, n_actions)
+        updates, warmup = rate(lambda: learner.update(buffer), learner.updates_per_sample, duration)
+        print(f"{name:12s} {label:24s} {updates:9,.0f} updates/sec  {updates / eager:4.2f}x  (warm-up {warmup:.1f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark eager vs fused/compiled learner updates")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per measurement")
+    parser.add_argument("--capacity", type=int, default=100_000)
+    parser.add_argument("--state-dim", type=int, default=5)
+    parser.add_argument("--actions", type=int, default=9)
+    parser.add_argument("--threads", type=int, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--prioritized", action="store_true", help="also benchmark prioritized replay")
+    parser.add_argument("--no-compile", action="store_true", help="skip the torch.compile variants")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    variants = [(label, kw) for label, kw in VARIANTS if not (args.no_compile and kw.get("compile"))]
+    print(f"batch={BATCH_SIZE} threads={torch.get_num_threads()} device={device}")
+    for prioritized in ((False, True) if args.prioritized else (False,)):
+        bench(prioritized, args.duration, args.capacity, args.state_dim, args.actions, variants)
@@ -0,0 +1,52 @@
+# benchmarks/multi_agent_bench.py
+# Multi-agent action selection as traffic grows: one batched forward over every NPC's observation
+# against one forward call per NPC, timed per env step.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn import Net, act_multi_agent, device
+from env import CarAvoidEnv
+
+NPC_COUNTS = (3, 10, 50, 200)
+
+
+def per_npc(policy_net, states):
+    with torch.no_grad():
+        return np.array([int(policy_net(torch.as_tensor(s, device=device).unsqueeze(0)).argmax()) for s in states])
+
+
+def step_time(env, select, steps):
+    """Mean seconds per step of action selection alone, over `steps` env steps."""
+    state = env.reset(seed=0)
+    spent = 0.0
+    for _ in range(steps):
+        start = time.perf_counter()
+        actions = select(state)
+        spent += time.perf_counter() - start
+        state, _, done, _ = env.step(actions)
+        if done:
+            state = env.reset()
+    return spent / steps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched vs per-NPC multi-agent action selection")
+    parser.add_argument("--steps", type=int, default=500, help="env steps per measurement")
+    parser.add_argument("--npc-counts", type=int, nargs="+", default=list(NPC_COUNTS))
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    policy_net = Net(5, 3).to(device)
+    rng = np.random.default_rng(0)
+    print(f"{'npcs':>5s} {'batched':>12s} {'per-NPC':>12s} {'speedup':>8s}")
+    for npc_count in args.npc_counts:
+        env = CarAvoidEnv(lanes=5, npc_count=npc_count, archetype="aggressive", max_steps=200, multi_agent=True)
+        batched = step_time(env, lambda s: act_multi_agent(policy_net, s, 0.0, rng), args.steps)
+        looped = step_time(env, lambda s: per_npc(policy_net, s), args.steps)
+        print(f"{npc_count:5d} {batched * 1e6:9.0f} us {looped * 1e6:9.0f} us {looped / batched:7.1f}x")
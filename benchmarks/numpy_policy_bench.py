@@ -0,0 +1,67 @@
+# benchmarks/numpy_policy_bench.py
+# Parity check of NumpyPolicy (float32 and int8) against Net, and per-call action latency of each.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn import load_policy, MODEL_PATH
+from numpy_policy import NumpyPolicy, export_npz
+
+
+def check_parity(policy_net, policy, obs, atol, rtol=0.0):
+    with torch.no_grad():
+        expected = policy_net(torch.from_numpy(obs)).numpy()
+    batch = policy.forward_batch(obs)
+    single = np.stack([policy.forward(row).copy() for row in obs])
+    err = max(np.abs(batch - expected).max(), np.abs(single - expected).max())
+    agree = (single.argmax(axis=1) == expected.argmax(axis=1)).mean()
+    tol = atol + rtol * np.abs(expected).max()
+    assert err <= tol, f"max abs error {err:.2e} exceeds {tol:.2e}"
+    return err, agree
+
+
+def per_call_us(act, obs, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for row in obs:
+            act(row)
+    return (time.perf_counter() - start) / (repeats * len(obs)) * 1e6
+
+
+def torch_act(policy_net):
+    def act(state):
+        with torch.no_grad():
+            s_t = torch.tensor(state, dtype=torch.float32).unsqueeze(0)
+            return int(torch.argmax(policy_net(s_t)).item())
+    return act
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    policy_net = load_policy(args.model_path)
+    obs = np.random.default_rng(0).uniform(-1, 1, (args.samples, policy_net.net[0].in_features)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32 = NumpyPolicy.load(export_npz(args.model_path, os.path.join(tmp, "fp32.npz")))
+        int8 = NumpyPolicy.load(export_npz(args.model_path, os.path.join(tmp, "int8.npz"), int8=True))
+        sizes = {name: os.path.getsize(os.path.join(tmp, f"{name}.npz")) for name in ("fp32", "int8")}
+
+    err, agree = check_parity(policy_net, fp32, obs, atol=1e-4)
+    print(f"fp32 parity: max abs error {err:.2e}, argmax agreement {agree:.3f}, {sizes['fp32']} bytes")
+    err, agree = check_parity(policy_net, int8, obs, atol=1e-4, rtol=0.02)
+    print(f"int8 parity: max abs error {err:.2e}, argmax agreement {agree:.3f}, {sizes['int8']} bytes")
+
+    print(f"torch Net act:   {per_call_us(torch_act(policy_net), obs, args.repeats):6.2f} us/call")
+    print(f"NumpyPolicy act: {per_call_us(fp32.act, obs, args.repeats):6.2f} us/call")
@@ -0,0 +1,74 @@
+# benchmarks/replay_bench.py
+# Uniform vs prioritized replay: sampling throughput at large capacity and episodes-to-threshold.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn import ReplayBuffer, PrioritizedReplayBuffer, train
+
+
+def fill(buffer, state_dim, chunk=100_000):
+    rng = np.random.default_rng(0)
+    while len(buffer) < buffer.capacity:
+        n = min(chunk, buffer.capacity - len(buffer))
+        s = rng.random((n, state_dim), dtype=np.float32)
+        buffer.push_many(s, rng.integers(0, 9, n), rng.random(n), s, rng.random(n) < 0.01)
+
+
+def bench_sampling(capacity, batch_size, iters, state_dim=5):
+    results = {}
+    for name, cls in (("uniform", ReplayBuffer), ("prioritized", PrioritizedReplayBuffer)):
+        buffer = cls(capacity, state_dim)
+        fill(buffer, state_dim)
+        td = np.random.default_rng(1).random(batch_size)
+        start = time.perf_counter()
+        for _ in range(iters):
+            if name == "prioritized":
+                *_, idx = buffer.sample_tensors(batch_size)
+                buffer.update_priorities(idx, td)
+            else:
+                buffer.sample_tensors(batch_size)
+        elapsed = time.perf_counter() - start
+        results[name] = iters * batch_size / elapsed
+        print(f"{name:12s} capacity={capacity} batch={batch_size}: {results[name]:,.0f} samples/sec")
+    return results
+
+
+def episodes_to_threshold(rewards, threshold, window):
+    for ep in range(window, len(rewards) + 1):
+        if np.mean(rewards[ep - window:ep]) >= threshold:
+            return ep
+    return None
+
+
+def bench_training(episodes, threshold, window, seed=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        for prioritized in (False, True):
+            name = "prioritized" if prioritized else "uniform"
+            rewards = train(prioritized=prioritized, episodes=episodes,
+                            model_path=os.path.join(tmp, f"{name}.pth"), seed=seed)
+            ep = episodes_to_threshold(rewards, threshold, window)
+            reached = ep if ep is not None else f">{episodes}"
+            print(f"{name:12s} episodes to {window}-episode mean reward >= {threshold}: {reached}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--capacity", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--iters", type=int, default=2000)
+    parser.add_argument("--episodes", type=int, default=300)
+    parser.add_argument("--threshold", type=float, default=0.0)
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-training", action="store_true")
+    args = parser.parse_args()
+
+    bench_sampling(args.capacity, args.batch_size, args.iters)
+    if not args.skip_training:
+        bench_training(args.episodes, args.threshold, args.window, args.seed)
@@ -0,0 +1,65 @@
+# benchmarks/sample_efficiency.py
+# Env steps and wall-clock until the greedy evaluation reward reaches a target, for n-step returns and
+# replay ratios. Each variant trains from the same seeds; runs that miss the target within the episode
+# budget are reported as not reached.
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn import TrainConfig, train
+from instrument import StepCounter
+
+VARIANTS = [
+    ("1-step", {}),
+    ("3-step", dict(n_step=3)),
+    ("5-step", dict(n_step=5)),
+    ("3-step rr=0.25", dict(n_step=3, replay_ratio=0.25)),
+    ("3-step rr=2", dict(n_step=3, replay_ratio=2.0)),
+]
+
+
+def time_to_target(overrides, target, budget, eval_every, eval_episodes, seed, model_path):
+    """(reached, env steps, seconds) for one training run."""
+    # One episode past the budget is never evaluated, so stopping before it means the target was reached
+    config = TrainConfig(episodes=budget + 1, eval_every=eval_every, eval_episodes=eval_episodes,
+                         target_score=target, **overrides)
+    counter = StepCounter()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rewards = train(config, model_path=model_path, seed=seed, instrument=counter)
+    return len(rewards) <= budget, counter.steps, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark env steps and time to a target evaluation reward")
+    parser.add_argument("--target", type=float, default=-5.0, help="greedy evaluation reward to reach")
+    parser.add_argument("--budget", type=int, default=300, help="episode budget per run")
+    parser.add_argument("--eval-every", type=int, default=10)
+    parser.add_argument("--eval-episodes", type=int, default=20)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--only", nargs="+", choices=[name for name, _ in VARIANTS])
+    args = parser.parse_args()
+    if args.budget % args.eval_every:
+        parser.error("--budget must be a multiple of --eval-every")
+
+    model_path = os.path.join(tempfile.mkdtemp(), "sample_efficiency.pth")
+    print(f"target eval reward {args.target} within {args.budget} episodes, seeds {args.seeds}")
+    print(f"{'variant':16s} {'reached':>7s} {'median steps':>12s} {'median secs':>11s}  per seed (steps/secs)")
+    for name, overrides in VARIANTS:
+        if args.only and name not in args.only:
+            continue
+        runs = [time_to_target(overrides, args.target, args.budget, args.eval_every, args.eval_episodes, seed,
+                               model_path) for seed in args.seeds]
+        hits = [(steps, secs) for reached, steps, secs in runs if reached]
+        per_seed = "  ".join(f"{steps}/{secs:.0f}" if reached else "-" for reached, steps, secs in runs)
+        if hits:
+            print(f"{name:16s} {len(hits):3d}/{len(runs):<3d} {statistics.median(s for s, _ in hits):12,.0f} "
+                  f"{statistics.median(t for _, t in hits):11.1f}  {per_seed}")
+        else:
+            print(f"{name:16s} {0:3d}/{len(runs):<3d} {'-':>12s} {'-':>11s}  {per_seed}")
@@ -0,0 +1,66 @@
+# benchmarks/startup_bench.py
+# Cold-launch time of the entry points: each case runs in a fresh interpreter and is timed from process start
+# to exit, so imports, pygame/font setup and asset loading all count.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HIDDEN = 64
+
+
+def write_policy(path):
+    """Random-weight .npz policy sized for the default env, so the rollout case needs neither torch nor a model."""
+    from env import CarAvoidEnv
+
+    env = CarAvoidEnv(lanes=5, npc_count=3, archetype="aggressive", max_steps=200)
+    sizes = [env.observation_space_dim(), HIDDEN, HIDDEN, env.action_space()]
+    rng = np.random.default_rng(0)
+    arrays = {}
+    for i, (fan_in, fan_out) in enumerate(zip(sizes, sizes[1:])):
+        arrays[f"w{i}"] = rng.standard_normal((fan_out, fan_in), dtype=np.float32)
+        arrays[f"b{i}"] = np.zeros(fan_out, dtype=np.float32)
+    np.savez(path, **arrays)
+    return path
+
+
+def cases(tmp):
+    policy = write_policy(os.path.join(tmp, "policy.npz"))
+    return {
+        # window, fonts, sprite atlas, one sim step and one rendered frame
+        "play": [os.path.join(ROOT, "play.py"), "--stress", "10", "--frames", "1"],
+        "rollout": [os.path.join(ROOT, "numpy_policy.py"), "rollout", policy, "--episodes", "1"],
+        "sweep-cli": [os.path.join(ROOT, "sweep.py"), "--param", "lr=0.001,0.0005", "--help"],
+    }
+
+
+def launch_time(argv, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argv, cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold launch of play.py and light CLI tools")
+    parser.add_argument("--repeat", type=int, default=5, help="launches per case")
+    parser.add_argument("--only", nargs="+", choices=["play", "rollout", "sweep-cli"])
+    args = parser.parse_args()
+
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, argv in cases(tmp).items():
+            if args.only and name not in args.only:
+                continue
+            launch_time(argv, env)  # warm the OS file cache and any on-disk asset cache
+            times = [launch_time(argv, env) for _ in range(args.repeat)]
+            print(f"{name:10s} median {statistics.median(times) * 1000:7.0f} ms  "
+                  f"min {min(times) * 1000:7.0f} ms  ({args.repeat} launches)")
@@ -0,0 +1,170 @@
+# benchmarks/suite.py
+# Headless throughput suite: env steps/sec, replay samples/sec, learner updates/sec and render frames/sec.
+# Results are written as JSON and can be compared against a stored baseline to flag regressions.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+ENV_CONFIGS = [(5, 3), (10, 10), (20, 50)]  # (lanes, npc_count)
+VEC_ENVS = 4096
+REPLAY_CAPACITY = 100_000
+BATCH_SIZE = 64
+
+
+def rate(fn, duration, units=1):
+    """Call fn repeatedly for about `duration` seconds; returns units processed per second."""
+    fn()  # warm-up
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return calls * units / elapsed
+
+
+def bench_env(duration):
+    from env import CarAvoidEnv, VecCarAvoidEnv
+
+    results = {}
+    for lanes, npcs in ENV_CONFIGS:
+        env = CarAvoidEnv(lanes=lanes, npc_count=npcs, archetype="aggressive", max_steps=200, seed=0)
+        actions = np.random.default_rng(0).integers(0, env.action_space(), 4096).tolist()
+        counter = iter(range(1 << 62))
+
+        def step():
+            _, _, done, _ = env.step(actions[next(counter) % 4096])
+            if done:
+                env.reset()
+
+        results[f"env_step/scalar/lanes={lanes},npcs={npcs}"] = rate(step, duration)
+
+        vec = VecCarAvoidEnv(VEC_ENVS, lanes=lanes, npc_count=npcs, archetype="aggressive", max_steps=200, seed=0)
+        vec_actions = np.random.default_rng(0).integers(0, vec.action_space(), (16, VEC_ENVS))
+        results[f"env_step/vec{VEC_ENVS}/lanes={lanes},npcs={npcs}"] = rate(
+            lambda: vec.step(vec_actions[next(counter) % 16]), duration, VEC_ENVS)
+    return results
+
+
+def _filled_buffer(cls, state_dim=5):
+    buffer = cls(REPLAY_CAPACITY, state_dim, seed=0)
+    rng = np.random.default_rng(0)
+    s = rng.random((REPLAY_CAPACITY, state_dim), dtype=np.float32)
+    buffer.push_many(s, rng.integers(0, 9, REPLAY_CAPACITY), rng.random(REPLAY_CAPACITY), s,
+                     rng.random(REPLAY_CAPACITY) < 0.01)
+    return buffer
+
+
+def bench_replay(duration):
+    from dqn import ReplayBuffer, PrioritizedReplayBuffer
+
+    uniform = _filled_buffer(ReplayBuffer)
+    prioritized = _filled_buffer(PrioritizedReplayBuffer)
+    td = np.random.default_rng(1).random(BATCH_SIZE)
+
+    def sample_prioritized():
+        *_, idx = prioritized.sample_tensors(BATCH_SIZE)
+        prioritized.update_priorities(idx, td)
+
+    return {
+        "replay_sample/uniform": rate(lambda: uniform.sample_tensors(BATCH_SIZE), duration, BATCH_SIZE),
+        "replay_sample/prioritized": rate(sample_prioritized, duration, BATCH_SIZE),
+    }
+
+
+def bench_learner(duration):
+    import torch
+    import torch.optim as optim
+    from dqn import Net, ReplayBuffer, PrioritizedReplayBuffer, LR, device, learn
+
+    results = {}
+    for name, cls in (("uniform", ReplayBuffer), ("prioritized", PrioritizedReplayBuffer)):
+        torch.manual_seed(0)
+        policy_net = Net(5, 9).to(device)
+        target_net = Net(5, 9).to(device)
+        target_net.load_state_dict(policy_net.state_dict())
+        optimizer = optim.Adam(policy_net.parameters(), lr=LR)
+        buffer = _filled_buffer(cls)
+        results[f"learner_update/{name}"] = rate(lambda: learn(policy_net, target_net, optimizer, buffer), duration)
+    return results
+
+
+def bench_render(duration):
+    import play
+    from sim import GameSim
+
+    play.setup()
+    play.sim = GameSim()
+    play.render_cached(full_redraw=True)
+
+    def frame(render):
+        if play.sim.game_over:
+            play.sim.reset()
+        play.sim.step(0)
+        render()
+
+    return {
+        "render_frame/legacy": rate(lambda: frame(play.render_legacy), duration),
+        "render_frame/cached": rate(lambda: frame(play.render_cached), duration),
+    }
+
+
+BENCHMARKS = {"env": bench_env, "replay": bench_replay, "learner": bench_learner, "render": bench_render}
+
+
+def compare(results, baseline, threshold):
+    """Metrics are all rates (higher is better); returns those below baseline by more than threshold."""
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base and value < base * (1.0 - threshold):
+            regressions.append((name, base, value))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the throughput benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--duration", type=float, default=1.0, help="seconds per measurement")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with these results")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only:
+        results.update(BENCHMARKS[name](args.duration))
+    for name, value in sorted(results.items()):
+        print(f"{name:45s} {value:14,.0f} /s")
+
+    report = {"machine": platform.machine(), "python": platform.python_version(), "cpus": os.cpu_count(),
+              "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, base, value in regressions:
+            print(f"REGRESSION {name}: {value:,.0f}/s vs baseline {base:,.0f}/s ({value / base - 1:+.1%})")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,52 @@
+# benchmarks/trajectory_bench.py
+# Trajectory datasets: recording overhead on a CarAvoidEnv rollout and streaming read throughput.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from env import CarAvoidEnv
+from trajectory import TrajectoryReader, TrajectoryWriter, transition_fields
+
+
+def rollout(steps, recorder=None):
+    """Random-action env steps/sec, appending each transition to recorder if given."""
+    env = CarAvoidEnv(lanes=5, npc_count=3, archetype="aggressive", max_steps=200, seed=0)
+    actions = np.random.default_rng(0).integers(0, env.action_space(), steps).tolist()
+    state = env.reset()
+    start = time.perf_counter()
+    for action in actions:
+        next_state, reward, done, _ = env.step(action)
+        if recorder:
+            recorder.append(state=state, action=action, reward=reward, next_state=next_state, done=done)
+        state = env.reset() if done else next_state
+    if recorder:
+        recorder.close()
+    return steps / (time.perf_counter() - start)
+
+
+def read_rate(reader, batch_size, shuffle):
+    start = time.perf_counter()
+    rows = sum(len(batch["action"]) for batch in reader.batches(batch_size, shuffle=shuffle, seed=0))
+    return rows / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark trajectory recording and streaming reads")
+    parser.add_argument("--steps", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    plain = rollout(args.steps)
+    with tempfile.TemporaryDirectory() as tmp:
+        recording = rollout(args.steps, TrajectoryWriter(tmp, transition_fields(5)))
+        reader = TrajectoryReader(tmp)
+        print(f"rollout  {plain:10,.0f} steps/sec plain, {recording:10,.0f} recording "
+              f"({(1 / recording - 1 / plain) * 1e6:.1f} us/step overhead)")
+        print(f"read     {read_rate(reader, args.batch_size, False):10,.0f} rows/sec sequential, "
+              f"{read_rate(reader, args.batch_size, True):10,.0f} shuffled "
+              f"({len(reader):,} rows in {len(reader.chunk_rows)} chunks)")
@@ -0,0 +1,204 @@
+# checkpoint.py
+# Non-blocking checkpointing: the training loop snapshots its state and a background thread writes it
+# with an atomic rename, so a crash never leaves a half-written file behind.
+import json
+import os
+import queue
+import shutil
+import threading
+
+import numpy as np
+import torch
+
+KEEP_LAST = 3
+KEEP_BEST = 3
+INDEX_NAME = "index.json"
+
+
+def snapshot(obj):
+    """Copy of obj safe to hand to another thread: tensors are detached CPU clones, arrays are copied."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, np.ndarray):
+        return obj.copy()
+    if isinstance(obj, dict):
+        return {k: snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(v) for v in obj)
+    return obj
+
+
+def atomic_save(obj, path):
+    tmp = f"{path}.tmp"
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+
+class AsyncWriter:
+    """
+    Single background thread that torch.saves snapshots with an atomic rename.
+    A write still queued when a newer one for the same path arrives is dropped.
+    Errors raised by the writer thread are re-raised on the next write/wait/close.
+    """
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, obj, path):
+        """Queue obj (already a snapshot) to be saved at path."""
+        self._submit(path, lambda: atomic_save(obj, path))
+
+    def _submit(self, key, job):
+        self._raise_error()
+        with self._lock:
+            self._latest[key] = job
+        self._queue.put((key, job))
+
+    def _run(self):
+        while True:
+            key, job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                with self._lock:
+                    superseded = self._latest.get(key) is not job
+                if not superseded:
+                    job()
+            except Exception as e:
+                self._error = e
+            finally:
+                # drop the reference so a finished job's snapshot can be freed; a newer one keeps its slot
+                if job is not None:
+                    with self._lock:
+                        if self._latest.get(key) is job:
+                            del self._latest[key]
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("background checkpoint write failed") from error
+
+    def wait(self):
+        """Block until every queued write is on disk."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put((None, None))
+            self._thread.join()
+        self._raise_error()
+
+
+class CheckpointManager(AsyncWriter):
+    """
+    Full training checkpoints in directory as ckpt_<step>.pt, keeping the last keep_last and the
+    keep_best highest-scoring ones. With a replay state, its arrays go to replay_<step>/<name>.npy,
+    written before the .pt so an existing checkpoint always has its replay; load() maps them with
+    mmap_mode="r". index.json records step, score and file names of the retained checkpoints.
+    The writer thread replaces self.index under the lock that best() reads it with.
+    """
+    def __init__(self, directory, keep_last=KEEP_LAST, keep_best=KEEP_BEST):
+        super().__init__()
+        self.directory = directory
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._read_index(directory)
+
+    @staticmethod
+    def _read_index(directory):
+        path = os.path.join(directory, INDEX_NAME)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def save(self, step, state, score=None, replay=None):
+        """
+        Snapshot state (and the replay buffer's state_dict, if given) now and write them in the background.
+        Only the snapshot copy runs on the caller's thread.
+        """
+        state = snapshot(state)
+        replay = snapshot(replay) if replay is not None else None
+        self._submit(("checkpoint", step), lambda: self._write_checkpoint(step, state, score, replay))
+
+    def _write_checkpoint(self, step, state, score, replay):
+        entry = {"step": step, "score": score, "path": f"ckpt_{step:08d}.pt", "replay": None}
+        if replay is not None:
+            entry["replay"] = f"replay_{step:08d}"
+            arrays = {k: v for k, v in replay.items() if isinstance(v, np.ndarray)}
+            state = dict(state, replay={k: v for k, v in replay.items() if k not in arrays})
+            final = os.path.join(self.directory, entry["replay"])
+            tmp = f"{final}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), array)
+            shutil.rmtree(final, ignore_errors=True)
+            os.replace(tmp, final)
+        atomic_save(state, os.path.join(self.directory, entry["path"]))
+
+        index = self._prune([e for e in self.index if e["step"] != step] + [entry])
+        with self._lock:
+            self.index = index
+        tmp = os.path.join(self.directory, f"{INDEX_NAME}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, os.path.join(self.directory, INDEX_NAME))
+
+    def _prune(self, index):
+        """Delete the files of checkpoints that are neither recent nor best; returns the retained entries."""
+        by_step = sorted(index, key=lambda e: e["step"])
+        keep = by_step[-self.keep_last:] if self.keep_last else []
+        scored = [e for e in by_step if e["score"] is not None]
+        keep += sorted(scored, key=lambda e: e["score"], reverse=True)[:self.keep_best]
+        kept_steps = {e["step"] for e in keep}
+        for entry in by_step:
+            if entry["step"] in kept_steps:
+                continue
+            os.remove(os.path.join(self.directory, entry["path"]))
+            if entry["replay"]:
+                shutil.rmtree(os.path.join(self.directory, entry["replay"]), ignore_errors=True)
+        return [e for e in by_step if e["step"] in kept_steps]
+
+    def latest(self):
+        return latest_checkpoint(self.directory)
+
+    def best(self):
+        with self._lock:
+            scored = [e for e in self.index if e["score"] is not None]
+        if not scored:
+            return None
+        return os.path.join(self.directory, max(scored, key=lambda e: e["score"])["path"])
+
+
+def latest_checkpoint(directory):
+    """Path of the newest checkpoint recorded in directory's index, or None."""
+    index = CheckpointManager._read_index(directory)
+    if not index:
+        return None
+    return os.path.join(directory, max(index, key=lambda e: e["step"])["path"])
+
+
+def load_checkpoint(path, map_location="cpu"):
+    """
+    Load a checkpoint file, or the latest one when path is a directory.
+    Replay arrays saved alongside it are attached to state["replay"] as read-only memmaps.
+    """
+    if os.path.isdir(path):
+        directory, path = path, latest_checkpoint(path)
+        if path is None:
+            raise FileNotFoundError(f"no checkpoints in {directory}")
+    state = torch.load(path, map_location=map_location, weights_only=False)
+    if "replay" in state:
+        step = os.path.basename(path)[len("ckpt_"):-len(".pt")]
+        replay_dir = os.path.join(os.path.dirname(path), f"replay_{step}")
+        for name in os.listdir(replay_dir):
+            state["replay"][name[:-len(".npy")]] = np.load(os.path.join(replay_dir, name), mmap_mode="r")
+    return state
@@ -0,0 +1,54 @@
+# config.py
+# Training hyperparameters and TrainConfig, kept free of torch so sweeps and other light tooling can build
+# and validate configs without paying for the torch import. dqn.py re-exports everything here.
+from dataclasses import dataclass, field
+
+from evaluate import EVAL_EPISODES
+
+# Hyperparams
+GAMMA = 0.99
+LR = 1e-3
+BATCH_SIZE = 64
+BUFFER_SIZE = 5000
+MIN_REPLAY = 500
+EPS_START = 1.0
+EPS_END = 0.05
+EPS_DECAY = 0.995
+TRAIN_EPISODES = 1000  # increase for better performance
+TARGET_UPDATE = 20
+CHECKPOINT_EVERY = 50  # episodes between full checkpoints when train() has a checkpoint_dir
+MODEL_PATH = "models/dqn_agent.pth"
+ENV_CONFIG = dict(lanes=5, npc_count=3, archetype="aggressive", max_steps=200)
+
+
+@dataclass
+class TrainConfig:
+    """
+    Hyperparameters for train(). Defaults are the module constants; env is passed to CarAvoidEnv.
+    curriculum: curriculum.Curriculum stages that override env, easiest first; None trains on env throughout.
+    checkpoint_replay: False leaves the replay buffer out of checkpoints; a resumed run then refills it.
+    """
+    episodes: int = TRAIN_EPISODES
+    gamma: float = GAMMA
+    lr: float = LR
+    batch_size: int = BATCH_SIZE
+    buffer_size: int = BUFFER_SIZE
+    min_replay: int = MIN_REPLAY
+    eps_start: float = EPS_START
+    eps_end: float = EPS_END
+    eps_decay: float = EPS_DECAY
+    target_update: int = TARGET_UPDATE
+    prioritized: bool = False
+    fused: bool = False
+    compile: bool = False
+    bf16: bool = False
+    updates_per_sample: int = 1
+    replay_ratio: float = 1.0
+    n_step: int = 1
+    checkpoint_every: int = CHECKPOINT_EVERY
+    checkpoint_replay: bool = True
+    eval_every: int = 0
+    eval_episodes: int = EVAL_EPISODES
+    target_score: float = None
+    env: dict = field(default_factory=lambda: dict(ENV_CONFIG))
+    curriculum: list = None
@@ -2,23 +2,33 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
-import random
 import numpy as np
-from collections import deque
 import os
-from env import CarAvoidEnv
-
-# Hyperparams
-GAMMA = 0.99
-LR = 1e-3
-BATCH_SIZE = 64
-BUFFER_SIZE = 5000
-MIN_REPLAY = 500
-EPS_START = 1.0
-EPS_END = 0.05
-EPS_DECAY = 0.995
-TRAIN_EPISODES = 1000  # increase for better performance
-TARGET_UPDATE = 20
+import argparse
+from collections import deque
+from dataclasses import asdict, replace
+from config import (GAMMA, LR, BATCH_SIZE, BUFFER_SIZE, MIN_REPLAY, EPS_START, EPS_END, EPS_DECAY, TRAIN_EPISODES,
+                    TARGET_UPDATE, CHECKPOINT_EVERY, MODEL_PATH, ENV_CONFIG, TrainConfig)
+from env import OBS_MODES, CarAvoidEnv, episode_seed
+from instrument import Instrumentation, NULL_INSTRUMENTATION
+from checkpoint import AsyncWriter, CheckpointManager, load_checkpoint, snapshot
+from evaluate import EVAL_EPISODES, evaluate, score
+from trajectory import TrajectoryReader, TrajectoryWriter, transition_fields
+from curriculum import Curriculum, load_stages
+
+# RNG stream ids for episode_seed(seed, stream, ...)
+EPISODE_STREAM, EXPLORE_STREAM, REPLAY_STREAM, CURRICULUM_STREAM = 0, 1, 2, 3
+
+# Actor/learner mode
+RING_SIZE = 4096  # transitions per actor shared-memory ring
+SYNC_EVERY = 50  # learner updates between weight publishes to actors
+TARGET_SYNC_UPDATES = 1000  # learner updates between target net syncs
+
+# Prioritized replay
+PER_ALPHA = 0.6
+PER_BETA_START = 0.4
+PER_BETA_FRAMES = 100_000
+PER_EPS = 1e-6
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -35,88 +45,767 @@ class Net(nn.Module):
     def forward(self, x):
         return self.net(x)
 
+def load_policy(path=MODEL_PATH, map_location="cpu"):
+    """Rebuild a Net from a saved state_dict, inferring its input/output sizes from the weights."""
+    state_dict = torch.load(path, map_location=map_location)
+    policy_net = Net(state_dict["net.0.weight"].shape[1], state_dict["net.4.weight"].shape[0])
+    policy_net.load_state_dict(state_dict)
+    return policy_net.eval()
+
 class ReplayBuffer:
-    def __init__(self, capacity):
-        self.buf = deque(maxlen=capacity)
+    """
+    Ring buffer over preallocated arrays: float32 states, int64 actions, float32 rewards, bool dones.
+    Each transition costs a fixed bytes_per_transition, so large capacities carry no Python object overhead.
+    """
+    def __init__(self, capacity, state_dim, pin_memory=False, seed=None):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.pos = 0
+        self.size = 0
+        self.pin_memory = pin_memory
+        self.rng = np.random.default_rng(seed)
+        self._batch = None
+        self._copy_done = None  # CUDA event of the last async copy out of the staging tensors
+
+    @property
+    def bytes_per_transition(self):
+        fields = (self.states, self.actions, self.rewards, self.next_states, self.dones)
+        return sum(f[0].nbytes if f.ndim > 1 else f.itemsize for f in fields)
+
     def push(self, s,a,r,ns,d):
-        self.buf.append((s,a,r,ns,d))
+        i = self.pos
+        self.states[i] = s
+        self.actions[i] = a
+        self.rewards[i] = r
+        self.next_states[i] = ns
+        self.dones[i] = d
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def push_many(self, s, a, r, ns, d):
+        n = len(a)
+        if n > self.capacity:
+            s, a, r, ns, d = s[-self.capacity:], a[-self.capacity:], r[-self.capacity:], ns[-self.capacity:], d[-self.capacity:]
+            n = self.capacity
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self.states[idx] = s
+        self.actions[idx] = a
+        self.rewards[idx] = r
+        self.next_states[idx] = ns
+        self.dones[idx] = d
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample_indices(self, n):
+        return self.rng.integers(0, self.size, n)
+
     def sample(self, n):
-        batch = random.sample(self.buf, n)
-        s,a,r,ns,d = map(np.array, zip(*batch))
-        return s, a, r, ns, d
+        return self.gather(self.sample_indices(n))
+
+    def gather(self, idx):
+        return self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], self.dones[idx]
+
+    def sample_tensors(self, n, device=None):
+        """
+        Sample straight into reusable (optionally pinned) torch tensors and move them to device.
+        The returned CPU tensors are overwritten by the next call, which first waits for any pending
+        non-blocking copy out of them to the GPU.
+        """
+        return self.gather_tensors(self.sample_indices(n), device)
+
+    def gather_tensors(self, idx, device=None):
+        if self._copy_done is not None:
+            self._copy_done.synchronize()
+            self._copy_done = None
+        batch = self._batch_buffers(len(idx))
+        fields = (self.states, self.actions, self.rewards, self.next_states, self.dones)
+        for field, (_, out) in zip(fields, batch):
+            np.take(field, idx, axis=0, out=out)
+        if device is None:
+            return tuple(t for t, _ in batch)
+        tensors = tuple(t.to(device, non_blocking=True) for t, _ in batch)
+        if torch.device(device).type == "cuda":
+            self._copy_done = torch.cuda.Event()
+            self._copy_done.record()
+        return tensors
+
+    def _batch_buffers(self, n):
+        if self._batch is None or len(self._batch[1][0]) != n:
+            state_dim = self.states.shape[1]
+            tensors = (
+                torch.empty((n, state_dim), dtype=torch.float32, pin_memory=self.pin_memory),
+                torch.empty(n, dtype=torch.int64, pin_memory=self.pin_memory),
+                torch.empty(n, dtype=torch.float32, pin_memory=self.pin_memory),
+                torch.empty((n, state_dim), dtype=torch.float32, pin_memory=self.pin_memory),
+                torch.empty(n, dtype=torch.bool, pin_memory=self.pin_memory),
+            )
+            self._batch = [(t, t.numpy()) for t in tensors]
+        return self._batch
+
     def __len__(self):
-        return len(self.buf)
+        return self.size
 
-def train():
-    env = CarAvoidEnv(lanes=5, npc_count=3, archetype="aggressive", max_steps=200)
-    n_actions = env.action_space()
-    state_dim = env.observation_space_dim()
+    def state_dict(self):
+        """Storage arrays (views, not copies) plus cursor and sampler state; see checkpoint.snapshot."""
+        return {"states": self.states, "actions": self.actions, "rewards": self.rewards,
+                "next_states": self.next_states, "dones": self.dones,
+                "pos": self.pos, "size": self.size, "rng": self.rng.bit_generator.state}
+
+    def load_state_dict(self, state):
+        for name in ("states", "actions", "rewards", "next_states", "dones"):
+            getattr(self, name)[:] = state[name]
+        self.pos = int(state["pos"])
+        self.size = int(state["size"])
+        self.rng.bit_generator.state = state["rng"]
+
+class SumTree:
+    """
+    Array-backed sum-tree with a parallel min-tree over leaf priorities.
+    Updates and prefix-sum lookups take a batch of indices/values and walk one tree level per NumPy call.
+    """
+    def __init__(self, capacity):
+        size = 1
+        while size < capacity:
+            size *= 2
+        self.size = size
+        self.sums = np.zeros(2 * size)
+        self.mins = np.full(2 * size, np.inf)
+
+    @property
+    def total(self):
+        return self.sums[1]
+
+    @property
+    def min(self):
+        return self.mins[1]
+
+    def get(self, idx):
+        return self.sums[idx + self.size]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx) + self.size
+        self.sums[nodes] = priorities
+        self.mins[nodes] = priorities
+        nodes = nodes // 2
+        while nodes[0] > 0:
+            left = 2 * nodes
+            self.sums[nodes] = self.sums[left] + self.sums[left + 1]
+            self.mins[nodes] = np.minimum(self.mins[left], self.mins[left + 1])
+            nodes = nodes // 2
+
+    def find(self, values):
+        """Leaf index whose cumulative priority range contains each value."""
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.size:
+            left = 2 * nodes
+            left_sum = self.sums[left]
+            go_right = values > left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.size
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized replay. New transitions get the max priority seen so far;
+    sampling is stratified over the sum-tree and beta anneals to 1 over beta_frames samples.
+    """
+    def __init__(self, capacity, state_dim, alpha=PER_ALPHA, beta_start=PER_BETA_START,
+                 beta_frames=PER_BETA_FRAMES, eps=PER_EPS, pin_memory=False, seed=None):
+        super().__init__(capacity, state_dim, pin_memory=pin_memory, seed=seed)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta_start = beta_start
+        self.beta_frames = beta_frames
+        self.eps = eps
+        self.max_priority = 1.0
+        self.frame = 0
+
+    @property
+    def beta(self):
+        return min(1.0, self.beta_start + self.frame * (1.0 - self.beta_start) / self.beta_frames)
+
+    def push(self, s,a,r,ns,d):
+        i = self.pos
+        super().push(s, a, r, ns, d)
+        self.tree.update(np.array([i]), self.max_priority ** self.alpha)
+
+    def push_many(self, s, a, r, ns, d):
+        n = min(len(a), self.capacity)
+        super().push_many(s, a, r, ns, d)
+        idx = (self.pos - n + np.arange(n)) % self.capacity
+        self.tree.update(idx, self.max_priority ** self.alpha)
+
+    def sample_indices(self, n):
+        segment = self.tree.total / n
+        values = (np.arange(n) + self.rng.random(n)) * segment
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def importance_weights(self, idx):
+        beta = self.beta
+        self.frame += 1
+        weights = (self.tree.get(idx) / self.tree.min) ** -beta
+        return weights.astype(np.float32)
+
+    def sample(self, n):
+        idx = self.sample_indices(n)
+        return (*self.gather(idx), self.importance_weights(idx), idx)
+
+    def sample_tensors(self, n, device=None):
+        """Like ReplayBuffer.sample_tensors, plus importance weights and the sampled indices."""
+        idx = self.sample_indices(n)
+        weights = torch.from_numpy(self.importance_weights(idx))
+        if device is not None:
+            weights = weights.to(device)
+        return (*self.gather_tensors(idx, device), weights, idx)
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
+
+    def state_dict(self):
+        state = super().state_dict()
+        state.update(tree_sums=self.tree.sums, tree_mins=self.tree.mins,
+                     max_priority=self.max_priority, frame=self.frame)
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.tree.sums[:] = state["tree_sums"]
+        self.tree.mins[:] = state["tree_mins"]
+        self.max_priority = float(state["max_priority"])
+        self.frame = int(state["frame"])
+
+class NStepAccumulator:
+    """
+    Builds n-step transitions as 1-step ones are pushed: (s_t, a_t, r_t + gamma r_t+1 + ... + gamma^(n-1) r_t+n-1,
+    s_t+n, done) goes to buffer once step t+n arrives. Only the last n steps are held, so nothing in the
+    buffer is rescanned. On done the held steps are flushed with their truncated returns; done masks their
+    bootstrap, so every stored transition is learned from with a gamma ** n target.
+    Every episode ends with done, so nothing is held between episodes. push_many takes one step of
+    per-NPC arrays (multi-agent) and emits them with buffer.push_many.
+    """
+    def __init__(self, buffer, n, gamma):
+        self.buffer = buffer
+        self.n = n
+        self.gamma = gamma
+        self.pending = deque()
+
+    def push(self, s, a, r, ns, d):
+        self._add(self.buffer.push, s, a, r, ns, d)
+
+    def push_many(self, s, a, r, ns, d):
+        self._add(self.buffer.push_many, s, a, r, ns, d)
+
+    def _add(self, emit, s, a, r, ns, d):
+        self.pending.append((s, a, r))
+        if len(self.pending) == self.n:
+            self._emit(emit, ns, d)
+        if np.any(d):
+            while self.pending:
+                self._emit(emit, ns, d)
+
+    def _emit(self, emit, ns, d):
+        ret = 0.0
+        for _, _, r in reversed(self.pending):
+            ret = r + self.gamma * ret
+        s, a, _ = self.pending.popleft()
+        emit(s, a, ret, ns, d)
+
+def make_buffer(state_dim, prioritized=False, seed=None, capacity=BUFFER_SIZE):
+    if prioritized:
+        return PrioritizedReplayBuffer(capacity, state_dim, pin_memory=device.type == "cuda", seed=seed)
+    return ReplayBuffer(capacity, state_dim, pin_memory=device.type == "cuda", seed=seed)
+
+def learn(policy_net, target_net, optimizer, buffer, instrument=NULL_INSTRUMENTATION, batch_size=BATCH_SIZE,
+          gamma=GAMMA):
+    """One gradient step on a sampled batch; importance-weighted when buffer is prioritized."""
+    prioritized = isinstance(buffer, PrioritizedReplayBuffer)
+    idx = buffer.sample_indices(batch_size)
+    instrument.lap("sample")
+    s_tensor, a_tensor, r_tensor, ns_tensor, d_tensor = buffer.gather_tensors(idx, device)
+    if prioritized:
+        weights = torch.from_numpy(buffer.importance_weights(idx)).to(device)
+    instrument.lap("tensors")
+
+    q_values = policy_net(s_tensor).gather(1, a_tensor.unsqueeze(1))
+    with torch.no_grad():
+        next_q = target_net(ns_tensor).max(1)[0].unsqueeze(1)
+        target = r_tensor.unsqueeze(1) + gamma * next_q * (~d_tensor).unsqueeze(1)
+
+    if prioritized:
+        td_error = target - q_values
+        loss = (weights.unsqueeze(1) * td_error.pow(2)).mean()
+        buffer.update_priorities(idx, td_error.detach().abs().squeeze(1).cpu().numpy())
+    else:
+        loss = nn.MSELoss()(q_values, target)
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+    instrument.lap("learn")
+
+def make_optimizer(policy_net, fused=False, lr=LR):
+    """Adam; fused=True uses the single-kernel implementation where this torch build has one."""
+    if fused:
+        try:
+            return optim.Adam(policy_net.parameters(), lr=lr, fused=True)
+        except (RuntimeError, TypeError):
+            pass
+    return optim.Adam(policy_net.parameters(), lr=lr)
+
+class FusedLearner:
+    """
+    Double-DQN learner for train(fused=True).
+    One policy_net forward over [states; next_states] gives both Q(s, a) and the argmax next action,
+    which target_net then evaluates. The loss step can be wrapped in torch.compile (compile=True) and run
+    under bf16 autocast (bf16=True, CPU or CUDA); the TD errors and loss are always reduced in float32.
+    Each update() gathers one megabatch of updates_per_sample * BATCH_SIZE transitions and takes
+    updates_per_sample gradient steps on consecutive slices of it. With prioritized replay each slice
+    gets its own importance weights, so beta anneals once per gradient step as in learn().
+    """
+    def __init__(self, policy_net, target_net, optimizer, compile=False, bf16=False, updates_per_sample=1,
+                 batch_size=BATCH_SIZE, gamma=GAMMA):
+        self.policy_net = policy_net
+        self.target_net = target_net
+        self.optimizer = optimizer
+        self.bf16 = bf16
+        self.updates_per_sample = updates_per_sample
+        self.batch_size = batch_size
+        self.gamma = gamma
+        self._loss = torch.compile(self._td_loss, dynamic=False) if compile else self._td_loss
+        self._ones = torch.ones(updates_per_sample * batch_size, device=device)
+
+    def _td_loss(self, s, a, r, ns, d, w):
+        n = s.shape[0]
+        with torch.autocast(device.type, dtype=torch.bfloat16, enabled=self.bf16):
+            q_all = self.policy_net(torch.cat((s, ns)))
+            with torch.no_grad():
+                next_a = q_all[n:].argmax(1, keepdim=True)
+                next_q = self.target_net(ns).gather(1, next_a).squeeze(1)
+        q = q_all[:n].gather(1, a.unsqueeze(1)).squeeze(1).float()
+        target = r + self.gamma * next_q.float() * (~d)
+        td_error = target - q
+        return (w * td_error.pow(2)).mean(), td_error.detach()
+
+    def update(self, buffer, instrument=NULL_INSTRUMENTATION):
+        prioritized = isinstance(buffer, PrioritizedReplayBuffer)
+        k, n = self.updates_per_sample, self.batch_size
+        idx = buffer.sample_indices(k * n)
+        instrument.lap("sample")
+        s, a, r, ns, d = buffer.gather_tensors(idx, device)
+        if prioritized:
+            weights = np.concatenate([buffer.importance_weights(idx[i:i + n]) for i in range(0, k * n, n)])
+            weights = torch.from_numpy(weights).to(device)
+        else:
+            weights = self._ones
+        instrument.lap("tensors")
+
+        td_errors = []
+        for i in range(0, k * n, n):
+            rows = slice(i, i + n)
+            loss, td_error = self._loss(s[rows], a[rows], r[rows], ns[rows], d[rows], weights[rows])
+            self.optimizer.zero_grad(set_to_none=True)
+            loss.backward()
+            self.optimizer.step()
+            td_errors.append(td_error)
+        if prioritized:
+            buffer.update_priorities(idx, torch.cat(td_errors).abs().cpu().numpy())
+        instrument.lap("learn")
+
+def act_multi_agent(policy_net, states, eps, rng):
+    """
+    ε-greedy moves for every NPC from one batched forward pass over their (npc_count, state_dim) observations;
+    each NPC explores independently with probability eps.
+    """
+    with torch.no_grad():
+        q_vals = policy_net(torch.as_tensor(states, dtype=torch.float32, device=device))
+    actions = q_vals.argmax(dim=1).cpu().numpy()
+    explore = rng.random(len(actions)) < eps
+    actions[explore] = rng.integers(q_vals.shape[1], size=int(explore.sum()))
+    return actions
+
+def evaluate_policy(state_dict, config, curriculum=None):
+    """
+    Greedy evaluation score of a policy state_dict on config.env over config.eval_episodes seeded episodes,
+    or with a curriculum on its current stage, averaged over the stage's archetypes.
+    """
+    env = curriculum.env_config() if curriculum else config.env
+    archetypes = tuple(curriculum.archetypes()) if curriculum else (env["archetype"],)
+    report, _ = evaluate({"policy": state_dict}, config.eval_episodes,
+                         archetypes=archetypes, configs=((env["lanes"], env["npc_count"]),),
+                         max_steps=env["max_steps"], obs_mode=env.get("obs_mode", "first"),
+                         multi_agent=env.get("multi_agent", False),
+                         speed_scale=env.get("speed_scale", 1.0))
+    return score(report["policy"])
+
+def curriculum_dims(env, curriculum):
+    """
+    (state_dim, n_actions) of a net that serves every curriculum stage, configuring env through them.
+    Single-agent nets are sized for the largest stage's actions; env.step clamps the NPC index of the rest.
+    """
+    dims = set()
+    for i in range(len(curriculum.stages)):
+        env.configure(**curriculum.settings(i))
+        n_actions = env.action_space()
+        dims.add((env.observation_space_dim(), n_actions[1] if env.multi_agent else n_actions))
+    state_dims = {state_dim for state_dim, _ in dims}
+    if len(state_dims) > 1:
+        raise ValueError(f"curriculum stages give observation sizes {sorted(state_dims)}; "
+                         "use obs_mode='first' or keep lanes and npc_count fixed")
+    return state_dims.pop(), max(n for _, n in dims)
+
+def make_update(policy_net, target_net, optimizer, config):
+    """(update(buffer, instrument), gradient updates per call) for config's learner, bootstrapping n_step ahead."""
+    gamma = config.gamma ** config.n_step
+    if config.fused:
+        learner = FusedLearner(policy_net, target_net, optimizer, compile=config.compile, bf16=config.bf16,
+                               updates_per_sample=config.updates_per_sample, batch_size=config.batch_size,
+                               gamma=gamma)
+        return learner.update, config.updates_per_sample
+
+    def update(buffer, instrument):
+        learn(policy_net, target_net, optimizer, buffer, instrument, config.batch_size, gamma)
+    return update, 1
+
+def train(config=None, model_path=MODEL_PATH, seed=None, instrument=None, checkpoint_dir=None, resume=None,
+          record=None, init_model=None, **overrides):
+    """
+    config: TrainConfig; keyword overrides replace its fields, e.g. train(prioritized=True, episodes=200).
+    With a seed, network init, exploration, replay sampling and every episode (reset with
+    episode_seed(seed, EPISODE_STREAM, ep)) are reproducible, so runs with the same seed match bit for bit on CPU.
+    instrument: optional instrument.Instrumentation that times each phase per episode.
+    fused: learn with FusedLearner (Double-DQN target, fused Adam); compile, bf16 and updates_per_sample
+    configure it. replay_ratio: gradient updates per env step once the buffer holds min_replay transitions
+    (0.25 updates every 4th step). n_step: transitions enter replay as n-step returns (NStepAccumulator).
+    checkpoint_dir: every checkpoint_every episodes and after the last one, write nets, optimizer, epsilon,
+    RNG and replay state there (see checkpoint.CheckpointManager). resume: a checkpoint file or directory
+    (its latest checkpoint) to continue from; it runs the remaining episodes up to `episodes` exactly as the
+    uninterrupted run would, unless the checkpoints left out replay (checkpoint_replay=False), in which case
+    the buffer starts empty again. The best-episode policy is written to model_path in the background either way.
+    eval_every: every eval_every episodes, score the policy greedily over eval_episodes seeded episodes of
+    the training env (evaluate.evaluate) and select model_path and best checkpoints by that instead of the
+    single training-episode reward. target_score: with eval_every, stop once an evaluation reaches it.
+    record: trajectory.TrajectoryWriter directory that every transition is also appended to, for reuse by
+    pretrain() or later runs. init_model: Net state_dict .pth to start the policy and target nets from.
+    curriculum (config field): stages of env difficulty (see curriculum.Curriculum). One env is reconfigured
+    in place at every reset with the current stage's settings and an archetype drawn from its mix; needs
+    eval_every, whose evaluations run on the current stage and promote to the next one. target_score then
+    only counts on the last stage, and model_path follows the best evaluation of the latest stage.
+    """
+    config = replace(config or TrainConfig(), **overrides)
+    instrument = instrument or NULL_INSTRUMENTATION
+    if seed is not None:
+        torch.manual_seed(seed)
+    rng = np.random.default_rng(episode_seed(seed, EXPLORE_STREAM))
+    curriculum = None
+    if config.curriculum:
+        if not config.eval_every:
+            raise ValueError("a curriculum is promoted by evaluations; set eval_every")
+        curriculum = Curriculum(config.curriculum, config.env)
+        env = CarAvoidEnv(**curriculum.env_config())
+        state_dim, n_actions = curriculum_dims(env, curriculum)
+    else:
+        env = CarAvoidEnv(**config.env)
+        n_actions = env.action_space()
+        if env.multi_agent:
+            # one shared net scores each NPC's observation row; replay holds one transition per NPC per step
+            _, n_actions = n_actions
+        state_dim = env.observation_space_dim()
 
     policy_net = Net(state_dim, n_actions).to(device)
     target_net = Net(state_dim, n_actions).to(device)
+    if init_model is not None:
+        policy_net.load_state_dict(torch.load(init_model, map_location=device))
     target_net.load_state_dict(policy_net.state_dict())
-    optimizer = optim.Adam(policy_net.parameters(), lr=LR)
-    buffer = ReplayBuffer(BUFFER_SIZE)
+    optimizer = make_optimizer(policy_net, fused=config.fused, lr=config.lr)
+    buffer = make_buffer(state_dim, config.prioritized, seed=episode_seed(seed, REPLAY_STREAM),
+                         capacity=config.buffer_size)
+    update, updates_per_call = make_update(policy_net, target_net, optimizer, config)
+    update_credit = 0.0
+    replay = NStepAccumulator(buffer, config.n_step, config.gamma) if config.n_step > 1 else buffer
 
-    eps = EPS_START
+    eps = config.eps_start
     best_score = -1e9
-    os.makedirs("models", exist_ok=True)
+    eval_score = None
+    rewards = []
+    start_ep = 1
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    if resume is not None:
+        ckpt = load_checkpoint(resume, map_location=device)
+        policy_net.load_state_dict(ckpt["policy"])
+        target_net.load_state_dict(ckpt["target"])
+        optimizer.load_state_dict(ckpt["optimizer"])
+        if "replay" in ckpt:
+            buffer.load_state_dict(ckpt["replay"])
+        rng.bit_generator.state = ckpt["explore_rng"]
+        env.rng.bit_generator.state = ckpt["env_rng"]
+        torch.set_rng_state(ckpt["torch_rng"])
+        eps, best_score, rewards = ckpt["eps"], ckpt["best_score"], ckpt["rewards"]
+        eval_score = ckpt["eval_score"]
+        update_credit = ckpt["update_credit"]
+        if curriculum:
+            curriculum.load_state_dict(ckpt["curriculum"])
+        start_ep = ckpt["episode"] + 1
+        print(f"Resumed from episode {ckpt['episode']}")
+    writer = CheckpointManager(checkpoint_dir) if checkpoint_dir else AsyncWriter()
+    recorder = None
+    if record:
+        recorder = TrajectoryWriter(record, transition_fields(state_dim),
+                                    attrs={"env": config.env, "curriculum": config.curriculum})
+    episodes = config.episodes
+
+    def save_checkpoint(ep, score):
+        state = {"episode": ep, "policy": policy_net.state_dict(), "target": target_net.state_dict(),
+                 "optimizer": optimizer.state_dict(), "eps": eps, "best_score": best_score,
+                 "eval_score": eval_score,
+                 "rewards": rewards, "update_credit": update_credit,
+                 "explore_rng": rng.bit_generator.state, "env_rng": env.rng.bit_generator.state,
+                 "torch_rng": torch.get_rng_state(), "config": asdict(config),
+                 "curriculum": curriculum.state_dict() if curriculum else None}
+        writer.save(ep, state, score=score, replay=buffer.state_dict() if config.checkpoint_replay else None)
 
-    for ep in range(1, TRAIN_EPISODES + 1):
-        state = env.reset()
+    instrument.begin()
+    for ep in range(start_ep, episodes + 1):
+        if curriculum:
+            archetype = curriculum.sample_archetype(np.random.default_rng(episode_seed(seed, CURRICULUM_STREAM, ep)))
+            env.configure(archetype=archetype, **curriculum.settings())
+        state = env.reset(seed=episode_seed(seed, EPISODE_STREAM, ep))
         episode_reward = 0.0
         done = False
+        instrument.lap("env_reset")
         while not done:
             # ε-greedy
-            if random.random() < eps:
-                action = random.randrange(n_actions)
+            if env.multi_agent:
+                action = act_multi_agent(policy_net, state, eps, rng)
+            elif rng.random() < eps:
+                action = int(rng.integers(n_actions))
             else:
                 with torch.no_grad():
                     s_t = torch.tensor(state, dtype=torch.float32).unsqueeze(0).to(device)
                     q_vals = policy_net(s_t)
                     action = int(torch.argmax(q_vals).item())
+            instrument.lap("act")
 
             next_state, reward, done, info = env.step(action)
-            buffer.push(state, action, reward, next_state, done)
+            instrument.lap("env_step")
+            if env.multi_agent:
+                dones = np.full(len(action), done)
+                replay.push_many(state, action, reward, next_state, dones)
+                if recorder:
+                    recorder.append_many(state=state, action=action, reward=reward, next_state=next_state, done=dones)
+                reward = float(reward.sum())
+            else:
+                replay.push(state, action, reward, next_state, done)
+                if recorder:
+                    recorder.append(state=state, action=action, reward=reward, next_state=next_state, done=done)
             state = next_state
             episode_reward += reward
+            instrument.lap("push")
 
             # learn
-            if len(buffer) >= MIN_REPLAY:
-                s_batch, a_batch, r_batch, ns_batch, d_batch = buffer.sample(BATCH_SIZE)
-                s_tensor = torch.tensor(s_batch, dtype=torch.float32).to(device)
-                a_tensor = torch.tensor(a_batch, dtype=torch.int64).unsqueeze(1).to(device)
-                r_tensor = torch.tensor(r_batch, dtype=torch.float32).unsqueeze(1).to(device)
-                ns_tensor = torch.tensor(ns_batch, dtype=torch.float32).to(device)
-                d_tensor = torch.tensor(d_batch, dtype=torch.float32).unsqueeze(1).to(device)
-
-                q_values = policy_net(s_tensor).gather(1, a_tensor)
-                with torch.no_grad():
-                    next_q = target_net(ns_tensor).max(1)[0].unsqueeze(1)
-                    target = r_tensor + GAMMA * next_q * (1 - d_tensor)
+            updates = 0
+            if len(buffer) >= config.min_replay:
+                update_credit += config.replay_ratio
+                while update_credit >= updates_per_call:
+                    update(buffer, instrument)
+                    update_credit -= updates_per_call
+                    updates += updates_per_call
+            instrument.step(updates)
 
-                loss = nn.MSELoss()(q_values, target)
-                optimizer.zero_grad()
-                loss.backward()
-                optimizer.step()
+        rewards.append(episode_reward)
 
         # decay eps
-        eps = max(EPS_END, eps * EPS_DECAY)
+        eps = max(config.eps_end, eps * config.eps_decay)
 
         # update target
-        if ep % TARGET_UPDATE == 0:
+        if ep % config.target_update == 0:
             target_net.load_state_dict(policy_net.state_dict())
+        instrument.lap("target_sync")
 
         # logging
         if ep % 10 == 0:
-            print(f"Ep {ep}/{TRAIN_EPISODES} reward={episode_reward:.3f} eps={eps:.3f}")
+            print(f"Ep {ep}/{episodes} reward={episode_reward:.3f} eps={eps:.3f}")
+
+        # evaluate
+        selection_score = episode_reward
+        if config.eval_every:
+            selection_score = None
+            if ep % config.eval_every == 0:
+                eval_score = evaluate_policy(policy_net.state_dict(), config, curriculum)
+                selection_score = eval_score
+                print(f"Ep {ep}/{episodes} eval reward={eval_score:.3f} over {config.eval_episodes} episodes")
+        instrument.lap("eval")
 
         # save model
-        if episode_reward > best_score:
-            best_score = episode_reward
-            torch.save(policy_net.state_dict(), "models/dqn_agent.pth")
+        if selection_score is not None and selection_score > best_score:
+            best_score = selection_score
+            writer.write(snapshot(policy_net.state_dict()), model_path)
+        reached = (config.eval_every and config.target_score is not None and selection_score is not None
+                   and selection_score >= config.target_score and (curriculum is None or curriculum.final))
+        if curriculum and selection_score is not None and curriculum.record(selection_score):
+            # scores of the easier stage don't compare, so the next stage's evaluations pick model_path afresh
+            best_score = -1e9
+            print(f"Ep {ep}/{episodes} curriculum stage {curriculum.stage + 1}/{len(curriculum.stages)}: "
+                  f"{curriculum.env_config()}")
+        if checkpoint_dir and (ep % config.checkpoint_every == 0 or ep == episodes or reached):
+            # None when this episode wasn't evaluated, so best-K never ranks by an older policy's score
+            save_checkpoint(ep, selection_score)
+        instrument.lap("save")
+        instrument.end_episode(ep, episode_reward, eps=eps)
+        if reached:
+            print(f"Reached target eval reward {config.target_score} at episode {ep}")
+            break
+
+    writer.close()
+    if recorder:
+        recorder.close()
+    instrument.close()
+    print(f"Training finished. Model saved to {model_path}")
+    return rewards
+
+def pretrain(dataset, config=None, model_path=MODEL_PATH, seed=None, passes=1, **overrides):
+    """
+    Offline DQN on a recorded trajectory dataset (see train(record=...)). Chunks stream from their memory
+    maps into a config.buffer_size replay buffer, so the dataset never has to fit in RAM; after each chunk
+    the learner makes replay_ratio updates per transition read, syncing the target net every
+    TARGET_SYNC_UPDATES updates. Saves the policy to model_path (a train(init_model=...) starting point)
+    and returns the number of updates.
+    """
+    config = replace(config or TrainConfig(), **overrides)
+    if seed is not None:
+        torch.manual_seed(seed)
+    reader = TrajectoryReader(dataset)
+    env = CarAvoidEnv(**config.env)
+    n_actions = env.action_space()
+    if env.multi_agent:
+        _, n_actions = n_actions
+    state_dim = env.observation_space_dim()
+    if reader.fields["state"][1] != (state_dim,):
+        raise ValueError(f"{dataset} holds {reader.fields['state'][1]} states, config.env gives ({state_dim},)")
+
+    policy_net = Net(state_dim, n_actions).to(device)
+    target_net = Net(state_dim, n_actions).to(device)
+    target_net.load_state_dict(policy_net.state_dict())
+    optimizer = make_optimizer(policy_net, fused=config.fused, lr=config.lr)
+    buffer = make_buffer(state_dim, config.prioritized, seed=episode_seed(seed, REPLAY_STREAM),
+                         capacity=config.buffer_size)
+    # datasets hold 1-step transitions, so targets bootstrap one step whatever config.n_step is
+    update, updates_per_call = make_update(policy_net, target_net, optimizer, replace(config, n_step=1))
+    update_credit = 0.0
+    updates = 0
+    for p in range(passes):
+        for chunk in reader.chunks(shuffle=True, seed=episode_seed(seed, REPLAY_STREAM, p)):
+            buffer.push_many(chunk["state"], chunk["action"], chunk["reward"], chunk["next_state"], chunk["done"])
+            if len(buffer) < config.min_replay:
+                continue
+            update_credit += len(chunk["action"]) * config.replay_ratio
+            while update_credit >= updates_per_call:
+                update(buffer, NULL_INSTRUMENTATION)
+                update_credit -= updates_per_call
+                updates += updates_per_call
+                if updates % TARGET_SYNC_UPDATES < updates_per_call:
+                    target_net.load_state_dict(policy_net.state_dict())
+        print(f"Pass {p + 1}/{passes}: {updates} updates over {len(reader)} transitions")
+    os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+    torch.save(policy_net.state_dict(), model_path)
+    print(f"Pretraining finished. Model saved to {model_path}")
+    return updates
 
-    print("Training finished. Model saved to models/dqn_agent.pth")
+def main():
+    parser = argparse.ArgumentParser(description="Train the DQN NPC agent on CarAvoidEnv")
+    parser.add_argument("--episodes", type=int, default=TRAIN_EPISODES)
+    parser.add_argument("--prioritized", action="store_true", help="use prioritized experience replay")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument("--metrics-log", help="write per-episode phase timings to this .csv or .jsonl file")
+    parser.add_argument("--profile", choices=["torch", "cprofile"], help="profile a window of env steps")
+    parser.add_argument("--profile-start", type=int, default=1000, help="env step at which profiling starts")
+    parser.add_argument("--profile-steps", type=int, default=200, help="number of env steps to profile")
+    parser.add_argument("--gamma", type=float, default=GAMMA)
+    parser.add_argument("--lr", type=float, default=LR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--buffer-size", type=int, default=BUFFER_SIZE)
+    parser.add_argument("--eps-decay", type=float, default=EPS_DECAY)
+    parser.add_argument("--target-update", type=int, default=TARGET_UPDATE, help="episodes between target net syncs")
+    parser.add_argument("--fused", action="store_true",
+                        help="Double-DQN learner with one fused policy forward and fused Adam")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the fused learner's loss step")
+    parser.add_argument("--bf16", action="store_true", help="run the fused learner's forward passes under bf16 autocast")
+    parser.add_argument("--updates-per-sample", type=int, default=1,
+                        help="gradient updates per sampled megabatch in the fused learner")
+    parser.add_argument("--replay-ratio", type=float, default=1.0,
+                        help="gradient updates per env step, e.g. 0.25 updates every 4th step")
+    parser.add_argument("--n-step", type=int, default=1, help="steps of reward summed into each replayed transition")
+    parser.add_argument("--checkpoint-dir", help="write resumable training checkpoints here")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help="episodes between checkpoints")
+    parser.add_argument("--no-checkpoint-replay", dest="checkpoint_replay", action="store_false",
+                        help="leave the replay buffer out of checkpoints; resuming then starts with an empty buffer")
+    parser.add_argument("--resume", help="checkpoint file, or directory to resume from its latest checkpoint")
+    parser.add_argument("--eval-every", type=int, default=0,
+                        help="episodes between greedy evaluations used to pick the saved model; 0 uses episode reward")
+    parser.add_argument("--eval-episodes", type=int, default=EVAL_EPISODES)
+    parser.add_argument("--target-score", type=float, help="with --eval-every, stop once an evaluation reaches this")
+    parser.add_argument("--multi-agent", action="store_true",
+                        help="every NPC acts each step from one shared net, with per-NPC observations and replay")
+    parser.add_argument("--npc-count", type=int, default=ENV_CONFIG["npc_count"])
+    parser.add_argument("--obs-mode", choices=OBS_MODES, default="first",
+                        help="observation layout (env.OBS_MODES); multi-agent runs need 'first'")
+    parser.add_argument("--curriculum", metavar="STAGES_JSON",
+                        help="grow env difficulty through the stages in this JSON file as evaluations improve "
+                             "(needs --eval-every; see curriculum.load_stages)")
+    parser.add_argument("--record", metavar="DIR", help="append every training transition to this trajectory dataset")
+    parser.add_argument("--pretrain", metavar="DIR",
+                        help="first train offline on this trajectory dataset, then continue online from that model")
+    parser.add_argument("--pretrain-passes", type=int, default=1)
+    parser.add_argument("--actors", type=int, default=0,
+                        help="number of actor processes; 0 trains serially in this process")
+    parser.add_argument("--total-steps", type=int, default=200_000, help="env steps to collect in actor mode")
+    parser.add_argument("--ring-size", type=int, default=RING_SIZE, help="per-actor shared-memory ring capacity")
+    parser.add_argument("--sync-every", type=int, default=SYNC_EVERY, help="learner updates between weight syncs to actors")
+    args = parser.parse_args()
+    if args.actors > 0:
+        if args.multi_agent or args.n_step != 1 or args.curriculum:
+            parser.error("--multi-agent, --n-step and --curriculum are not supported with --actors")
+        from actors import train_distributed
+        train_distributed(num_actors=args.actors, total_steps=args.total_steps, prioritized=args.prioritized,
+                          model_path=args.model_path, ring_size=args.ring_size, sync_every=args.sync_every,
+                          seed=args.seed, env_config=dict(ENV_CONFIG, npc_count=args.npc_count, obs_mode=args.obs_mode))
+    else:
+        instrument = None
+        if args.metrics_log:
+            instrument = Instrumentation(args.metrics_log, args.profile, args.profile_start, args.profile_steps)
+        elif args.profile:
+            parser.error("--profile needs --metrics-log")
+        if args.multi_agent and args.obs_mode != "first":
+            parser.error("--multi-agent needs --obs-mode first")
+        if not args.fused and (args.compile or args.bf16 or args.updates_per_sample != 1):
+            parser.error("--compile, --bf16 and --updates-per-sample need --fused")
+        curriculum = None
+        if args.curriculum:
+            if not args.eval_every:
+                parser.error("--curriculum needs --eval-every")
+            curriculum = load_stages(args.curriculum)
+        config = TrainConfig(episodes=args.episodes, gamma=args.gamma, lr=args.lr, batch_size=args.batch_size,
+                             buffer_size=args.buffer_size, eps_decay=args.eps_decay, target_update=args.target_update,
+                             prioritized=args.prioritized, fused=args.fused, compile=args.compile, bf16=args.bf16,
+                             updates_per_sample=args.updates_per_sample, replay_ratio=args.replay_ratio,
+                             n_step=args.n_step, target_score=args.target_score,
+                             checkpoint_every=args.checkpoint_every, checkpoint_replay=args.checkpoint_replay,
+                             eval_every=args.eval_every, eval_episodes=args.eval_episodes,
+                             env=dict(ENV_CONFIG, npc_count=args.npc_count, obs_mode=args.obs_mode,
+                                      multi_agent=args.multi_agent),
+                             curriculum=curriculum)
+        init_model = None
+        if args.pretrain:
+            pretrain(args.pretrain, config, model_path=args.model_path, seed=args.seed, passes=args.pretrain_passes)
+            init_model = args.model_path
+        train(config, model_path=args.model_path, seed=args.seed, instrument=instrument,
+              checkpoint_dir=args.checkpoint_dir, resume=args.resume, record=args.record, init_model=init_model)
 
 if __name__ == "__main__":
-    train()
+    main()
@@ -146,101 +146,276 @@
 
 
 import numpy as np
-import random
+
+PLAYER_Y = 0.9
+ARCHETYPE_CODES = {"aggressive": 1, "defensive": -1}
+RANDOM_BLOCK = 64  # steps of uniforms CarAvoidEnv draws per rng call
+SCALAR_MAX_NPCS = 24  # single-agent envs with at most this many NPCs step them in a plain loop over lists
+ARCHETYPE_DRIFT = {"aggressive": 0.2, "defensive": 0.15}  # per-step lane drift probability
+
+# Observation modes (lanes are normalized by lanes - 1):
+#   first:  [player, npc0 lane, npc0 y, npc0 speed, archetype]                  5
+#   all:    [player, archetype, (lane, y, speed) for every NPC by index]         2 + 3 * npc_count
+#   sorted: like all, NPCs ordered nearest-to-player first                       2 + 3 * npc_count
+#   grid:   [player, archetype, NPC count per (lane, depth bin) for y in [-1, 1)]  2 + lanes * grid_depth
+OBS_MODES = ("first", "all", "sorted", "grid")
+GRID_DEPTH = 8
+
+
+def episode_seed(seed, *key):
+    """Independent, reproducible seed for one episode/worker, derived from a run seed; None stays None."""
+    if seed is None:
+        return None
+    return np.random.SeedSequence([seed, *key])
+
+
+def obs_dim(mode, lanes, npc_count, grid_depth=GRID_DEPTH):
+    if mode == "first":
+        return 5
+    if mode in ("all", "sorted"):
+        return 2 + 3 * npc_count
+    if mode == "grid":
+        return 2 + lanes * grid_depth
+    raise ValueError(f"unknown obs_mode {mode!r}, expected one of {OBS_MODES}")
+
+
+def encode_obs(out, mode, player_lane, npc_lane, npc_y, npc_speed, lanes, archetype_code, grid_depth=GRID_DEPTH):
+    """
+    Write observations for a batch of envs into out, shape (num_envs, obs_dim(...)).
+    player_lane has shape (num_envs,); npc_lane/npc_y/npc_speed have shape (num_envs, npc_count).
+    Results land in out, but every mode except "first" computes them through temporary arrays.
+    """
+    scale = lanes - 1
+    if mode == "first":
+        out[:, 0] = player_lane / scale
+        out[:, 1] = npc_lane[:, 0] / scale
+        out[:, 2] = npc_y[:, 0]
+        out[:, 3] = npc_speed[:, 0]
+        out[:, 4] = archetype_code
+        return out
+
+    out[:, 0] = player_lane / scale
+    out[:, 1] = archetype_code
+    num_envs, npc_count = npc_lane.shape
+    if mode == "grid":
+        grid = out[:, 2:].reshape(num_envs, lanes, grid_depth)
+        grid[:] = 0.0
+        depth = np.floor((npc_y + 1.0) * (grid_depth / 2.0)).astype(np.int64)
+        visible = (depth >= 0) & (depth < grid_depth)
+        rows = np.broadcast_to(np.arange(num_envs)[:, None], npc_lane.shape)
+        np.add.at(grid, (rows[visible], npc_lane[visible], depth[visible]), 1.0)
+        return out
+
+    if mode == "sorted":
+        distance = np.abs(npc_lane - player_lane[:, None]) + np.abs(npc_y - PLAYER_Y)
+        order = np.argsort(distance, axis=1, kind="stable")
+        npc_lane = np.take_along_axis(npc_lane, order, axis=1)
+        npc_y = np.take_along_axis(npc_y, order, axis=1)
+        npc_speed = np.take_along_axis(npc_speed, order, axis=1)
+    npcs = out[:, 2:].reshape(num_envs, npc_count, 3)
+    npcs[:, :, 0] = npc_lane / scale
+    npcs[:, :, 1] = npc_y
+    npcs[:, :, 2] = npc_speed
+    return out
+
 
 class CarAvoidEnv:
     """
     Minimal gym-like environment for car avoidance training.
-    Observation: [player_x_norm, npc_x_norm, npc_y_norm, npc_speed_norm, archetype_code]
+    Observation: [player_x_norm, npc_x_norm, npc_y_norm, npc_speed_norm, archetype_code] by default;
+    obs_mode selects one of OBS_MODES.
     Action: discrete 3 actions for NPC movement: [stay (0), move_left (1), move_right (2)]
     The agent controls NPC behavior (i.e., learns how to move lane to collide with player).
+    All randomness comes from self.rng; reset(seed=...) restarts it so episodes replay bit-identically.
+    Observations are written into a preallocated buffer; with copy_obs=False reset/step return that
+    buffer itself, which the next call overwrites. Only the "first" layout (and multi_agent) is filled
+    without any temporary arrays; "all", "sorted" and "grid" go through encode_obs, which allocates a few
+    small temporaries per call (the sort order, grid bins) before writing into the buffer.
+    multi_agent: every NPC acts each step. Observations have shape (npc_count, 5), one "first"-layout row
+    per NPC as if it were NPC 0; step takes one move per NPC (action_space() is (npc_count, 3)) and returns
+    per-NPC rewards: the reward design applied to each NPC's own distance, with the collision penalty
+    charged to the NPCs that hit the player.
+    speed_scale multiplies NPC spawn speeds. configure() changes difficulty without a new instance.
+    npc_lane/npc_y/npc_speed return array copies of the NPC state. Internally, single-agent envs with up
+    to SCALAR_MAX_NPCS NPCs keep that state in lists and step it one NPC at a time, which is cheaper than
+    numpy calls at that size; both paths draw the same random numbers, so seeded episodes are identical
+    (tests/test_env.py checks this).
     """
-    def __init__(self, width=400, lanes=5, npc_count=3, archetype="neutral", max_steps=300):
+    def __init__(self, width=400, lanes=5, npc_count=3, archetype="neutral", max_steps=300, seed=None,
+                 obs_mode="first", grid_depth=GRID_DEPTH, copy_obs=True, multi_agent=False, speed_scale=1.0):
         self.width = width
         self.lanes = lanes
         self.lane_width = width / lanes
         self.npc_count = npc_count
         self.archetype = archetype  # "aggressive", "defensive", "neutral"
         self.max_steps = max_steps
+        self.obs_mode = obs_mode
+        self.grid_depth = grid_depth
+        self.copy_obs = copy_obs
+        self.multi_agent = multi_agent
+        self.speed_scale = speed_scale
+        if multi_agent and obs_mode != "first":
+            raise ValueError(f"multi_agent observations use the 'first' layout per NPC, got obs_mode={obs_mode!r}")
+        self._obs = np.zeros(self._obs_shape(), dtype=np.float32)
+        self._archetype_code = ARCHETYPE_CODES.get(archetype, 0)
+        self.rng = np.random.default_rng(seed)
 
         self.reset()
 
-    def reset(self):
+    def _obs_shape(self):
+        if self.multi_agent:
+            return (self.npc_count, 5)
+        return (obs_dim(self.obs_mode, self.lanes, self.npc_count, self.grid_depth),)
+
+    def configure(self, lanes=None, npc_count=None, archetype=None, speed_scale=None, max_steps=None):
+        """
+        Change difficulty in place, keeping this instance and its rng; takes effect at the next reset().
+        The observation buffer is reallocated only when its shape changes.
+        """
+        if lanes is not None:
+            self.lanes = lanes
+            self.lane_width = self.width / lanes
+        if npc_count is not None:
+            self.npc_count = npc_count
+        if archetype is not None:
+            self.archetype = archetype
+            self._archetype_code = ARCHETYPE_CODES.get(archetype, 0)
+        if speed_scale is not None:
+            self.speed_scale = speed_scale
+        if max_steps is not None:
+            self.max_steps = max_steps
+        if self._obs.shape != self._obs_shape():
+            self._obs = np.zeros(self._obs_shape(), dtype=np.float32)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        rng = self.rng
+        n = self.npc_count
         self.player_lane = self.lanes // 2
         self.player_pos = np.array([self.player_lane, 0.9])  # lane, y (0 top, 1 bottom)
-        self.npcs = []
-        for i in range(self.npc_count):
-            lane = random.randrange(self.lanes)
-            y = random.uniform(-1.0, -0.2) - i * 0.3
-            speed = random.uniform(0.01, 0.03)
-            self.npcs.append([lane, y, speed])
+        self._player = self.player_lane  # int mirror of player_pos[0] for the hot path
+        # NPC state as parallel (lane, y, speed) arrays so per-step work is vectorized over NPCs,
+        # or as lists for few NPCs (see the npc_* properties for the public view)
+        self._npc_lane = rng.integers(0, self.lanes, n)
+        self._npc_y = rng.uniform(-1.0, -0.2, n) - np.arange(n) * 0.3
+        self._npc_speed = rng.uniform(0.01, 0.03, n) * self.speed_scale
+        self._scalar = not self.multi_agent and n <= SCALAR_MAX_NPCS
+        if self._scalar:
+            self._npc_lane = self._npc_lane.tolist()
+            self._npc_y = self._npc_y.tolist()
+            self._npc_speed = self._npc_speed.tolist()
+        self._block_row = RANDOM_BLOCK
         self.steps = 0
         self.score = 0
-        self.last_distance = self._min_distance()
+        self.last_distance = self._distances() if self.multi_agent else self._min_distance()
         return self._get_obs()
 
+    def _draw_block(self):
+        # Uniforms for RANDOM_BLOCK steps at once: 2 for the player, then drift and direction per NPC
+        n = self.npc_count
+        u = self.rng.random((RANDOM_BLOCK, 2 + 2 * n))
+        self._player_u = u[:, :2].tolist()
+        self._drift = u[:, 2:2 + n] < ARCHETYPE_DRIFT.get(self.archetype, 0.0)
+        self._dodge_left = u[:, 2 + n:] < 0.5
+        if self._scalar:
+            self._drift = self._drift.tolist()
+            self._dodge_left = self._dodge_left.tolist()
+        self._block_row = 0
+
     def step(self, action):
         """
         action: integer in [0..(3*npcs-1)] or we can assume agent controls single NPC index + move
         For simplicity: action is (npc_index * 3) + move where move: 0 stay,1 left,2 right
+        multi_agent: action is an int array of npc_count moves, applied to all NPCs at once.
         """
+        if self._scalar:
+            return self._step_scalar(action)
         self.steps += 1
-        npc_index = action // 3
-        move = action % 3
-
-        npc_index = min(npc_index, self.npc_count - 1)
-        if move == 1:
-            self.npcs[npc_index][0] = max(0, self.npcs[npc_index][0] - 1)
-        elif move == 2:
-            self.npcs[npc_index][0] = min(self.lanes - 1, self.npcs[npc_index][0] + 1)
+        lanes = self.lanes
+        npc_lane = self._npc_lane
+        if self._block_row == RANDOM_BLOCK:
+            self._draw_block()
+        row = self._block_row
+        self._block_row += 1
+        if self.multi_agent:
+            moves = np.asarray(action)
+            npc_lane += moves == 2
+            npc_lane -= moves == 1
+            np.clip(npc_lane, 0, lanes - 1, out=npc_lane)
+        else:
+            npc_index = action // 3
+            move = action % 3
+
+            npc_index = min(npc_index, self.npc_count - 1)
+            if move == 1:
+                npc_lane[npc_index] = max(0, npc_lane[npc_index] - 1)
+            elif move == 2:
+                npc_lane[npc_index] = min(lanes - 1, npc_lane[npc_index] + 1)
 
         # Player stochastic movement (adds unpredictability)
-        if random.random() < 0.6:
-            if random.random() < 0.5 and self.player_pos[0] > 0:
-                self.player_pos[0] -= 1
-            elif self.player_pos[0] < self.lanes - 1:
-                self.player_pos[0] += 1
+        u_move, u_left = self._player_u[row]
+        player = self._player
+        if u_move < 0.6:
+            if u_left < 0.5 and player > 0:
+                player -= 1
+            elif player < lanes - 1:
+                player += 1
+            self._player = player
+            self.player_pos[0] = player
 
         done = False
         reward = 0.0
 
         # --- REWARD DESIGN IMPLEMENTATION ---
-        min_dist = self._min_distance()
-
-        if min_dist < self.last_distance:
-            reward += 1.0   # NPC gets closer → +1
-        elif 0.3 < min_dist <= 0.6:
-            reward += 0.5   # Maintains moderate distance → +0.5
-        elif min_dist > 0.6:
-            reward -= 0.5   # Moves too far away → -0.5
+        if self.multi_agent:
+            # Same design per NPC, on its own distance to the player
+            min_dist = self._distances()
+            last = self.last_distance
+            reward = np.select([min_dist < last, (min_dist > 0.3) & (min_dist <= 0.6), min_dist > 0.6],
+                               [1.0, 0.5, -0.5], 0.0)
+        else:
+            min_dist = self._min_distance()
+
+            if min_dist < self.last_distance:
+                reward += 1.0   # NPC gets closer → +1
+            elif 0.3 < min_dist <= 0.6:
+                reward += 0.5   # Maintains moderate distance → +0.5
+            elif min_dist > 0.6:
+                reward -= 0.5   # Moves too far away → -0.5
 
         reward += 0.1  # Player survives → +0.1
         # --- END REWARD DESIGN ---
 
         # Update NPC behavior
-        for npc in self.npcs:
-            npc[1] += npc[2]  # Move downward
-
-            # Archetype behavioral bias
-            if self.archetype == "aggressive" and random.random() < 0.2:
-                if npc[0] < self.player_pos[0]:
-                    npc[0] = min(self.lanes - 1, npc[0] + 1)
-                elif npc[0] > self.player_pos[0]:
-                    npc[0] = max(0, npc[0] - 1)
-            elif self.archetype == "defensive" and random.random() < 0.15:
-                if npc[0] == self.player_pos[0]:
-                    npc[0] += random.choice([-1, 1])
-                    npc[0] = max(0, min(self.lanes - 1, npc[0]))
-
-            # Check collision when NPC reaches bottom
-            if npc[1] >= 1.0:
-                if npc[0] == int(self.player_pos[0]):
-                    reward -= 100.0  # Big penalty for collision
-                    done = True
-                # Respawn NPC
-                npc[1] = random.uniform(-1.0, -0.2)
-                npc[0] = random.randrange(self.lanes)
-                npc[2] = random.uniform(0.01, 0.04)
+        self._npc_y += self._npc_speed  # Move downward
+
+        # Archetype behavioral bias: aggressive NPCs step toward the player's lane,
+        # defensive NPCs sharing it step aside
+        if self.archetype == "aggressive":
+            np.add(npc_lane, np.sign(player - npc_lane), out=npc_lane, where=self._drift[row])
+        elif self.archetype == "defensive":
+            dodge = self._drift[row] & (npc_lane == player)
+            if dodge.any():
+                npc_lane[dodge] += np.where(self._dodge_left[row][dodge], -1, 1)
+                np.clip(npc_lane, 0, lanes - 1, out=npc_lane)
+
+        # Check collision when NPCs reach the bottom, then respawn them
+        collisions = 0
+        if self._npc_y.max() >= 1.0:
+            arrived = np.flatnonzero(self._npc_y >= 1.0)
+            hit = arrived[npc_lane[arrived] == player]
+            collisions = len(hit)
+            if collisions:
+                if self.multi_agent:
+                    reward[hit] -= 100.0
+                else:
+                    reward -= 100.0 * collisions  # Big penalty for collision
+                done = True
+            k = len(arrived)
+            self._npc_y[arrived] = self.rng.uniform(-1.0, -0.2, k)
+            npc_lane[arrived] = self.rng.integers(0, lanes, k)
+            self._npc_speed[arrived] = self.rng.uniform(0.01, 0.04, k) * self.speed_scale
 
         self.last_distance = min_dist
 
@@ -248,24 +423,286 @@ class CarAvoidEnv:
             done = True
 
         obs = self._get_obs()
-        return obs, reward, done, {"score": self.score}
+        return obs, reward, done, {"score": self.score, "collisions": collisions}
+
+    def _step_scalar(self, action):
+        # step() for few NPCs held in lists; same order of operations and random draws as the array path
+        self.steps += 1
+        lanes = self.lanes
+        npc_lane, npc_y, npc_speed = self._npc_lane, self._npc_y, self._npc_speed
+        if self._block_row == RANDOM_BLOCK:
+            self._draw_block()
+        row = self._block_row
+        self._block_row += 1
+
+        npc_index = min(action // 3, self.npc_count - 1)
+        move = action % 3
+        if move == 1:
+            npc_lane[npc_index] = max(0, npc_lane[npc_index] - 1)
+        elif move == 2:
+            npc_lane[npc_index] = min(lanes - 1, npc_lane[npc_index] + 1)
+
+        u_move, u_left = self._player_u[row]
+        player = self._player
+        if u_move < 0.6:
+            if u_left < 0.5 and player > 0:
+                player -= 1
+            elif player < lanes - 1:
+                player += 1
+            self._player = player
+            self.player_pos[0] = player
+
+        done = False
+        reward = 0.0
+        min_dist = self._min_distance()
+        if min_dist < self.last_distance:
+            reward += 1.0
+        elif 0.3 < min_dist <= 0.6:
+            reward += 0.5
+        elif min_dist > 0.6:
+            reward -= 0.5
+        reward += 0.1
+
+        drift = self._drift[row]
+        aggressive = self.archetype == "aggressive"
+        defensive = self.archetype == "defensive"
+        arrived = []
+        for i in range(self.npc_count):
+            y = npc_y[i] + npc_speed[i]
+            npc_y[i] = y
+            if drift[i]:
+                lane = npc_lane[i]
+                if aggressive:
+                    npc_lane[i] = lane + (lane < player) - (lane > player)
+                elif defensive and lane == player:
+                    npc_lane[i] = max(0, min(lanes - 1, lane + (-1 if self._dodge_left[row][i] else 1)))
+            if y >= 1.0:
+                arrived.append(i)
+
+        collisions = 0
+        if arrived:
+            collisions = sum(npc_lane[i] == player for i in arrived)
+            if collisions:
+                reward -= 100.0 * collisions
+                done = True
+            k = len(arrived)
+            ys = self.rng.uniform(-1.0, -0.2, k).tolist()
+            new_lanes = self.rng.integers(0, lanes, k).tolist()
+            speeds = (self.rng.uniform(0.01, 0.04, k) * self.speed_scale).tolist()
+            for j, i in enumerate(arrived):
+                npc_y[i], npc_lane[i], npc_speed[i] = ys[j], new_lanes[j], speeds[j]
+
+        self.last_distance = min_dist
+        if self.steps >= self.max_steps:
+            done = True
+        return self._get_obs(), reward, done, {"score": self.score, "collisions": collisions}
 
     def _get_obs(self):
-        npc0 = self.npcs[0]
-        archetype_code = 0
-        if self.archetype == "aggressive": archetype_code = 1
-        if self.archetype == "defensive": archetype_code = -1
-        return np.array([self.player_pos[0] / (self.lanes - 1),
-                         npc0[0] / (self.lanes - 1),
-                         npc0[1],
-                         npc0[2],
-                         archetype_code], dtype=np.float32)
+        obs = self._obs
+        if self.multi_agent:
+            scale = self.lanes - 1
+            obs[:, 0] = self._player / scale
+            obs[:, 1] = self._npc_lane / scale
+            obs[:, 2] = self._npc_y
+            obs[:, 3] = self._npc_speed
+            obs[:, 4] = self._archetype_code
+        elif self.obs_mode == "first":
+            scale = self.lanes - 1
+            obs[0] = self._player / scale
+            obs[1] = self._npc_lane[0] / scale
+            obs[2] = self._npc_y[0]
+            obs[3] = self._npc_speed[0]
+            obs[4] = self._archetype_code
+        else:
+            encode_obs(obs[None], self.obs_mode, np.array([self._player]), np.asarray(self._npc_lane)[None],
+                       np.asarray(self._npc_y)[None], np.asarray(self._npc_speed)[None], self.lanes,
+                       self._archetype_code, self.grid_depth)
+        return obs.copy() if self.copy_obs else obs
 
     def action_space(self):
-        return self.npc_count * 3
+        return (self.npc_count, 3) if self.multi_agent else self.npc_count * 3
 
     def observation_space_dim(self):
-        return 5
+        """Length of one observation row: the whole observation, or one NPC's in multi_agent mode."""
+        return self._obs.shape[-1]
+
+    @property
+    def npc_lane(self):
+        """Lane of every NPC, as a new int64 array."""
+        return np.array(self._npc_lane)
+
+    @property
+    def npc_y(self):
+        return np.array(self._npc_y)
+
+    @property
+    def npc_speed(self):
+        return np.array(self._npc_speed)
+
+    def npc_distances(self):
+        """Lane difference plus vertical gap from every NPC to the player."""
+        return np.abs(self.npc_lane - self.player_pos[0]) + np.abs(self.npc_y - self.player_pos[1])
+
+    def nearest_npc(self):
+        """(index, distance) of the NPC closest to the player; a scan over all NPCs."""
+        distances = self.npc_distances()
+        i = int(distances.argmin())
+        return i, float(distances[i])
+
+    def npcs_in_lane(self, lane):
+        """Indices of NPCs in `lane`, nearest to the bottom first; a scan over all NPCs."""
+        idx = np.flatnonzero(self.npc_lane == lane)
+        return idx[np.argsort(-self.npc_y[idx])]
+
+    def _distances(self):
+        return np.abs(self._npc_lane - self._player) + np.abs(self._npc_y - PLAYER_Y)
 
     def _min_distance(self):
-        return min([abs(n[0] - self.player_pos[0]) + abs(n[1] - self.player_pos[1]) for n in self.npcs])
+        if self._scalar:
+            player = self._player
+            return min(abs(lane - player) + abs(y - PLAYER_Y) for lane, y in zip(self._npc_lane, self._npc_y))
+        return float(self._distances().min())
+
+
+class VecCarAvoidEnv:
+    """
+    Batched CarAvoidEnv: steps num_envs independent episodes in one vectorized call.
+    State lives in arrays: player_lane (num_envs,), npc_lane/npc_y/npc_speed (num_envs, npc_count).
+    Rewards follow CarAvoidEnv.step. Finished envs are reset automatically; the observation
+    they ended on is written to final_obs for the rows where done is True, and returned as info["final_obs"].
+    obs_mode/copy_obs behave as in CarAvoidEnv, with one (num_envs, obs_dim) buffer each for obs and
+    final_obs: copy_obs=False returns the buffers themselves, which the next step overwrites.
+    """
+    def __init__(self, num_envs, lanes=5, npc_count=3, archetype="neutral", max_steps=300, seed=None,
+                 obs_mode="first", grid_depth=GRID_DEPTH, copy_obs=True):
+        self.num_envs = num_envs
+        self.lanes = lanes
+        self.npc_count = npc_count
+        self.archetype = archetype
+        self.max_steps = max_steps
+        self.obs_mode = obs_mode
+        self.grid_depth = grid_depth
+        self.copy_obs = copy_obs
+        self.rng = np.random.default_rng(seed)
+        self.obs = np.zeros((num_envs, obs_dim(obs_mode, lanes, npc_count, grid_depth)), dtype=np.float32)
+
+        self.player_lane = np.zeros(num_envs, dtype=np.int64)
+        self.npc_lane = np.zeros((num_envs, npc_count), dtype=np.int64)
+        self.npc_y = np.zeros((num_envs, npc_count))
+        self.npc_speed = np.zeros((num_envs, npc_count))
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.last_distance = np.zeros(num_envs)
+        self.final_obs = np.zeros_like(self.obs)
+
+        self._rows = np.arange(num_envs)
+        self._spawn_offset = np.arange(npc_count) * 0.3
+        self._archetype_code = ARCHETYPE_CODES.get(archetype, 0)
+
+        self.reset()
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_envs(self._rows)
+        self._write_obs()
+        return self.obs.copy() if self.copy_obs else self.obs
+
+    def step(self, actions):
+        """
+        actions: int array of shape (num_envs,), same encoding as CarAvoidEnv.step.
+        Returns (obs, reward, done, info) stacked over envs.
+        """
+        actions = np.asarray(actions)
+        lanes = self.lanes
+        player = self.player_lane
+        rng = self.rng
+        self.steps += 1
+
+        npc_index = np.minimum(actions // 3, self.npc_count - 1)
+        move = actions % 3
+        moved = self.npc_lane[self._rows, npc_index]
+        moved += move == 2
+        moved -= move == 1
+        np.clip(moved, 0, lanes - 1, out=moved)
+        self.npc_lane[self._rows, npc_index] = moved
+
+        # Player stochastic movement
+        r = rng.random((2, self.num_envs))
+        moving = r[0] < 0.6
+        left = moving & (r[1] < 0.5) & (player > 0)
+        right = moving & ~left & (player < lanes - 1)
+        player += right
+        player -= left
+
+        min_dist = self._min_distance(self._rows)
+        reward = np.select(
+            [min_dist < self.last_distance, (min_dist > 0.3) & (min_dist <= 0.6), min_dist > 0.6],
+            [1.0, 0.5, -0.5],
+            0.0,
+        )
+        reward += 0.1
+
+        # Update NPC behavior
+        self.npc_y += self.npc_speed
+        if self.archetype == "aggressive":
+            drift = rng.random(self.npc_lane.shape) < 0.2
+            self.npc_lane += drift * np.sign(player[:, None] - self.npc_lane)
+        elif self.archetype == "defensive":
+            drift = (rng.random(self.npc_lane.shape) < 0.15) & (self.npc_lane == player[:, None])
+            self.npc_lane += drift * rng.choice((-1, 1), self.npc_lane.shape)
+            np.clip(self.npc_lane, 0, lanes - 1, out=self.npc_lane)
+
+        arrived = self.npc_y >= 1.0
+        crashed = arrived & (self.npc_lane == player[:, None])
+        reward -= 100.0 * crashed.sum(axis=1)
+        done = crashed.any(axis=1)
+
+        n_arrived = np.count_nonzero(arrived)
+        if n_arrived:
+            self.npc_y[arrived] = rng.uniform(-1.0, -0.2, n_arrived)
+            self.npc_lane[arrived] = rng.integers(0, lanes, n_arrived)
+            self.npc_speed[arrived] = rng.uniform(0.01, 0.04, n_arrived)
+
+        self.last_distance = min_dist
+        done |= self.steps >= self.max_steps
+
+        self._write_obs()
+        if done.any():
+            finished = np.flatnonzero(done)
+            self.final_obs[finished] = self.obs[finished]
+            self._reset_envs(finished)
+            self._write_obs(finished)
+        if self.copy_obs:
+            return self.obs.copy(), reward, done, {"final_obs": self.final_obs.copy()}
+        return self.obs, reward, done, {"final_obs": self.final_obs}
+
+    def _reset_envs(self, idx):
+        n = len(idx)
+        shape = (n, self.npc_count)
+        self.player_lane[idx] = self.lanes // 2
+        self.npc_lane[idx] = self.rng.integers(0, self.lanes, shape)
+        self.npc_y[idx] = self.rng.uniform(-1.0, -0.2, shape) - self._spawn_offset
+        self.npc_speed[idx] = self.rng.uniform(0.01, 0.03, shape)
+        self.steps[idx] = 0
+        self.last_distance[idx] = self._min_distance(idx)
+
+    def _write_obs(self, idx=None):
+        if idx is None:
+            encode_obs(self.obs, self.obs_mode, self.player_lane, self.npc_lane, self.npc_y, self.npc_speed,
+                       self.lanes, self._archetype_code, self.grid_depth)
+            return
+        rows = np.empty((len(idx), self.obs.shape[1]), dtype=np.float32)
+        npcs = slice(0, 1) if self.obs_mode == "first" else slice(None)  # "first" only reads NPC 0
+        encode_obs(rows, self.obs_mode, self.player_lane[idx], self.npc_lane[idx, npcs], self.npc_y[idx, npcs],
+                   self.npc_speed[idx, npcs], self.lanes, self._archetype_code, self.grid_depth)
+        self.obs[idx] = rows
+
+    def action_space(self):
+        return self.npc_count * 3
+
+    def observation_space_dim(self):
+        return self.obs.shape[1]
+
+    def _min_distance(self, idx):
+        lane_diff = np.abs(self.npc_lane[idx] - self.player_lane[idx, None])
+        return (lane_diff + np.abs(self.npc_y[idx] - PLAYER_Y)).min(axis=1)
@@ -0,0 +1,173 @@
+# evaluate.py
+# Greedy evaluation of saved policies over seeded CarAvoidEnv episodes per archetype and lane/NPC
+# configuration, spread over a process pool. Workers run NumpyPolicy, so they never import torch.
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from env import OBS_MODES, CarAvoidEnv, episode_seed
+from numpy_policy import NumpyPolicy
+
+EVAL_EPISODES = 100
+EVAL_SEED = 1234
+ARCHETYPES = ("aggressive", "defensive", "neutral")
+CONFIGS = ((5, 3),)  # (lanes, npc_count)
+MAX_STEPS = 200
+CHUNK = 25  # episodes per pool task
+
+
+def load_state_dict(path):
+    """Policy weights from a Net .pth, or from a checkpoint.CheckpointManager .pt file."""
+    import torch
+
+    state = torch.load(path, map_location="cpu", weights_only=False)
+    return state.get("policy", state)
+
+
+def state_dict_arrays(state_dict):
+    return {k: v.detach().cpu().numpy() if hasattr(v, "detach") else np.asarray(v) for k, v in state_dict.items()}
+
+
+def run_episodes(weights, archetype, lanes, npc_count, episodes, seed, key=(), max_steps=MAX_STEPS,
+                 obs_mode="first", multi_agent=False, speed_scale=1.0):
+    """
+    Greedy episodes; episode i is reset with episode_seed(seed, *key, i) for i in episodes.
+    weights: Net state_dict as NumPy arrays. Returns (rewards, collided, lengths) arrays.
+    multi_agent: every NPC acts from one batched forward pass; an episode's reward sums over NPCs.
+    speed_scale: NPC speed multiplier, as in CarAvoidEnv.
+    """
+    keys = [k[:-len(".weight")] for k in weights if k.endswith(".weight")]
+    policy = NumpyPolicy([weights[k + ".weight"] for k in keys], [weights[k + ".bias"] for k in keys])
+    env = CarAvoidEnv(lanes=lanes, npc_count=npc_count, archetype=archetype, max_steps=max_steps,
+                      obs_mode=obs_mode, copy_obs=False, multi_agent=multi_agent, speed_scale=speed_scale)
+    act = policy.act_batch if multi_agent else policy.act
+    if policy.state_dim != env.observation_space_dim():
+        raise ValueError(f"policy expects {policy.state_dim}-dim observations, env gives {env.observation_space_dim()}")
+    rewards, collided, lengths = [], [], []
+    for i in episodes:
+        state = env.reset(seed=episode_seed(seed, *key, i))
+        total = 0.0
+        hit = False
+        done = False
+        while not done:
+            state, reward, done, info = env.step(act(state))
+            total += float(np.sum(reward))
+            hit = hit or info["collisions"] > 0
+        rewards.append(total)
+        collided.append(hit)
+        lengths.append(env.steps)
+    return np.array(rewards), np.array(collided), np.array(lengths)
+
+
+def _run_worker(args):
+    cell, weights, archetype, lanes, npc_count, episodes, seed, key, max_steps, *env_options = args
+    return cell, run_episodes(weights, archetype, lanes, npc_count, episodes, seed, key, max_steps, *env_options)
+
+
+def summarize(rewards, collided, lengths):
+    n = len(rewards)
+    std = rewards.std(ddof=1) if n > 1 else 0.0
+    return {"episodes": n, "mean_reward": float(rewards.mean()), "ci95": float(1.96 * std / np.sqrt(n)),
+            "collision_rate": float(collided.mean()), "mean_length": float(lengths.mean())}
+
+
+def evaluate(policies, episodes=EVAL_EPISODES, archetypes=ARCHETYPES, configs=CONFIGS, seed=EVAL_SEED,
+             workers=1, pool=None, max_steps=MAX_STEPS, obs_mode="first", multi_agent=False, speed_scale=1.0):
+    """
+    policies: {name: state_dict} (torch tensors or NumPy arrays). Every policy sees the same seeded
+    episodes per (archetype, lanes, npc_count), so results are directly comparable.
+    obs_mode must be the one the policies were trained with (see env.OBS_MODES).
+    Returns {name: {(archetype, lanes, npc_count): summary}} and the wall time in seconds.
+    """
+    jobs = []
+    for name, state_dict in policies.items():
+        weights = state_dict_arrays(state_dict)
+        for lanes, npc_count in configs:
+            for a, archetype in enumerate(ARCHETYPES):
+                if archetype not in archetypes:
+                    continue
+                for start in range(0, episodes, CHUNK):
+                    chunk = range(start, min(start + CHUNK, episodes))
+                    # each cell gets its own episode stream, the same for every policy
+                    jobs.append(((name, archetype, lanes, npc_count), weights, archetype, lanes, npc_count,
+                                 chunk, seed, (lanes, npc_count, a), max_steps, obs_mode, multi_agent, speed_scale))
+
+    start = time.perf_counter()
+    if pool is not None:
+        results = pool.map(_run_worker, jobs)
+    elif workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(_run_worker, jobs)
+    else:
+        results = [_run_worker(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    merged = {}
+    for key, arrays in results:
+        merged.setdefault(key, []).append(arrays)
+    report = {}
+    for (name, *cell), parts in merged.items():
+        report.setdefault(name, {})[tuple(cell)] = summarize(*(np.concatenate(p) for p in zip(*parts)))
+    return report, elapsed
+
+
+def score(summaries):
+    """Single number for checkpoint selection: mean reward averaged over evaluated cells."""
+    return float(np.mean([s["mean_reward"] for s in summaries.values()]))
+
+
+def print_report(report, elapsed):
+    total = 0
+    print(f"{'policy':24s} {'archetype':10s} {'lanes':>5s} {'npcs':>4s} {'reward':>16s} {'collide':>7s} {'length':>6s}")
+    for name, cells in report.items():
+        for (archetype, lanes, npc_count), s in cells.items():
+            total += s["episodes"]
+            print(f"{name:24s} {archetype:10s} {lanes:5d} {npc_count:4d} "
+                  f"{s['mean_reward']:8.2f} ± {s['ci95']:5.2f} {s['collision_rate']:7.1%} {s['mean_length']:6.1f}")
+    print(f"{total} episodes in {elapsed:.2f}s ({total / elapsed:.0f} episodes/sec)")
+
+
+def checkpoint_paths(path):
+    """A .pth/.pt file as-is, or every checkpoint listed in a checkpoint directory's index."""
+    if not os.path.isdir(path):
+        return [path]
+    from checkpoint import CheckpointManager
+
+    return [os.path.join(path, e["path"]) for e in sorted(CheckpointManager._read_index(path), key=lambda e: e["step"])]
+
+
+def parse_config(text):
+    lanes, npc_count = text.lower().split("x")
+    return int(lanes), int(npc_count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate saved policies greedily over seeded episodes")
+    parser.add_argument("models", nargs="+", help=".pth models, checkpoint .pt files or checkpoint directories")
+    parser.add_argument("--episodes", type=int, default=EVAL_EPISODES, help="episodes per archetype and config")
+    parser.add_argument("--archetypes", nargs="+", choices=ARCHETYPES, default=list(ARCHETYPES))
+    parser.add_argument("--configs", nargs="+", type=parse_config, default=list(CONFIGS),
+                        help="lane/NPC configurations as LANESxNPCS, e.g. 5x3 10x10")
+    parser.add_argument("--seed", type=int, default=EVAL_SEED)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--obs-mode", choices=OBS_MODES, default="first", help="observation layout the policies use")
+    parser.add_argument("--multi-agent", action="store_true", help="policies drive every NPC from per-NPC observations")
+    parser.add_argument("--select", metavar="PATH", help="save the best-scoring policy's state_dict here")
+    args = parser.parse_args()
+
+    paths = [p for model in args.models for p in checkpoint_paths(model)]
+    policies = {p: load_state_dict(p) for p in paths}
+    report, elapsed = evaluate(policies, args.episodes, args.archetypes, args.configs, args.seed, args.workers,
+                               obs_mode=args.obs_mode, multi_agent=args.multi_agent)
+    print_report(report, elapsed)
+    if len(report) > 1 or args.select:
+        best = max(report, key=lambda name: score(report[name]))
+        print(f"Best: {best} (mean reward {score(report[best]):.2f})")
+        if args.select:
+            import torch
+
+            torch.save(policies[best], args.select)
+            print(f"Saved to {args.select}")
@@ -0,0 +1,188 @@
+# inference_server.py
+# Batched CPU inference for a trained Net: requests from many games/NPCs are collected for up to
+# max_latency_ms (or max_batch_size requests) and answered with one forward pass.
+import argparse
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+from dqn import load_policy, MODEL_PATH
+
+MAX_BATCH_SIZE = 256
+MAX_LATENCY_MS = 2.0
+SOCKET_PATH = "/tmp/car_npc_policy.sock"
+
+
+class InferenceServer:
+    """
+    In-process batching server. submit(obs) returns a Future resolving to the argmax action;
+    act(obs) blocks for it. Use as a context manager or call start()/stop().
+    A batch that fails sets the exception on its futures and the server keeps serving.
+    """
+    def __init__(self, policy_net, max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_LATENCY_MS):
+        self.policy_net = policy_net.eval()
+        self.state_dim = policy_net.net[0].in_features
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.requests = queue.SimpleQueue()
+        self._inputs = torch.zeros((max_batch_size, self.state_dim))
+        self._inputs_np = self._inputs.numpy()
+        self._latencies = deque(maxlen=100_000)
+        self._batch_sizes = deque(maxlen=100_000)
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="inference-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.requests.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, obs):
+        obs = np.asarray(obs, dtype=np.float32)
+        if obs.shape != (self.state_dim,):
+            raise ValueError(f"expected an observation of shape ({self.state_dim},), got {obs.shape}")
+        future = Future()
+        self.requests.put((time.perf_counter(), obs, future))
+        return future
+
+    def act(self, obs):
+        return self.submit(obs).result()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[0] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self.requests.get_nowait() if timeout <= 0 else self.requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self.requests.put(None)  # seen again by _run after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            n = len(batch)
+            try:
+                for i, (_, obs, _) in enumerate(batch):
+                    self._inputs_np[i] = obs
+                with torch.inference_mode():
+                    actions = self.policy_net(self._inputs[:n]).argmax(dim=1).tolist()
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            for (submitted, _, future), action in zip(batch, actions):
+                future.set_result(action)
+            with self._stats_lock:
+                self._latencies.extend(finished - submitted for submitted, _, _ in batch)
+                self._batch_sizes.append(n)
+
+    def metrics(self):
+        """Latency percentiles (ms) and batch fill over the recent request window."""
+        with self._stats_lock:
+            latencies = np.array(self._latencies)
+            batch_sizes = np.array(self._batch_sizes)
+        if not len(latencies):
+            return {"requests": 0, "batches": 0}
+        return {
+            "requests": len(latencies),
+            "batches": len(batch_sizes),
+            "mean_batch": float(batch_sizes.mean()),
+            "batch_fill": float(batch_sizes.mean() / self.max_batch_size),
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        }
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+class _PolicyHandler(socketserver.BaseRequestHandler):
+    # Wire format: client sends state_dim little-endian float32s, server replies with one int32 action
+    def handle(self):
+        server = self.server.inference
+        size = server.state_dim * 4
+        while True:
+            data = _recv_exact(self.request, size)
+            if data is None:
+                return
+            action = server.act(np.frombuffer(data, dtype="<f4"))
+            self.request.sendall(struct.pack("<i", action))
+
+
+def serve_unix(inference, path=SOCKET_PATH):
+    """Expose an InferenceServer on a Unix socket; call serve_forever() on the result."""
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socketserver.ThreadingUnixStreamServer(path, _PolicyHandler)
+    server.daemon_threads = True
+    server.inference = inference
+    return server
+
+
+class PolicyClient:
+    def __init__(self, path=SOCKET_PATH):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+
+    def act(self, obs):
+        self.sock.sendall(np.asarray(obs, dtype="<f4").tobytes())
+        return struct.unpack("<i", _recv_exact(self.sock, 4))[0]
+
+    def close(self):
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve batched DQN policy actions over a Unix socket")
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-latency-ms", type=float, default=MAX_LATENCY_MS)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    inference = InferenceServer(load_policy(args.model_path), args.max_batch_size, args.max_latency_ms)
+    with inference, serve_unix(inference, args.socket) as server:
+        print(f"Serving {args.model_path} on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(args.socket)
+    print(inference.metrics())
@@ -0,0 +1,138 @@
+# instrument.py
+# Opt-in per-phase timing for training loops. Callers mark the end of each phase with lap(name);
+# the disabled NULL_INSTRUMENTATION makes every hook a no-op method call.
+import cProfile
+import csv
+import json
+import os
+import pstats
+import time
+
+PHASES = ("env_reset", "act", "env_step", "push", "sample", "tensors", "learn", "target_sync", "eval", "save")
+
+
+class NullInstrumentation:
+    enabled = False
+
+    def begin(self):
+        pass
+
+    def lap(self, name):
+        pass
+
+    def step(self, updates):
+        pass
+
+    def end_episode(self, episode, reward, **extra):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class StepCounter(NullInstrumentation):
+    """Counts env steps and nothing else, for sample-efficiency benchmarks."""
+    def __init__(self):
+        self.steps = 0
+
+    def step(self, updates):
+        self.steps += 1
+
+
+class Instrumentation:
+    """
+    Wall time per phase, env steps and updates, written as one row per episode to log_path
+    (.csv for CSV, anything else for JSONL). profile="torch" or "cprofile" wraps env steps
+    [profile_start, profile_start + profile_steps) and writes the result next to the log.
+    """
+    enabled = True
+
+    def __init__(self, log_path, profile=None, profile_start=1000, profile_steps=200):
+        if profile not in (None, "torch", "cprofile"):
+            raise ValueError(f"unknown profiler {profile!r}")
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self.log_path = log_path
+        self._file = open(log_path, "w", newline="")
+        self._writer = None
+        self.profile = profile
+        self.profile_start = profile_start
+        self.profile_stop = profile_start + profile_steps
+        self._profiler = None
+        self.total_steps = 0
+        self.total_updates = 0
+        self._reset_episode()
+
+    def _reset_episode(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.steps = 0
+        self.updates = 0
+        self._episode_start = self._last = time.perf_counter()
+
+    def begin(self):
+        """Restart the clocks, e.g. after setup work that should not count toward the first episode."""
+        self._reset_episode()
+
+    def lap(self, name):
+        """Charge the time since the previous lap to phase `name`."""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def step(self, updates):
+        """Count one env step and the gradient updates made after it."""
+        self.steps += 1
+        self.updates += updates
+        self.total_steps += 1
+        self.total_updates += updates
+        if self.profile:
+            if self.total_steps == self.profile_start:
+                self._start_profiler()
+            elif self.total_steps == self.profile_stop:
+                self._stop_profiler()
+
+    def end_episode(self, episode, reward, **extra):
+        wall = time.perf_counter() - self._episode_start
+        row = {"episode": episode, "reward": reward, "steps": self.steps, "updates": self.updates,
+               "wall_s": wall, "env_steps_per_s": self.steps / wall, "updates_per_s": self.updates / wall}
+        row.update({f"{name}_s": seconds for name, seconds in self.phases.items()})
+        row.update(extra)
+        if self.log_path.endswith(".csv"):
+            if self._writer is None:
+                self._writer = csv.DictWriter(self._file, fieldnames=list(row), extrasaction="ignore")
+                self._writer.writeheader()
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+        self._reset_episode()
+
+    def _start_profiler(self):
+        if self.profile == "torch":
+            import torch.profiler
+            self._profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True)
+            self._profiler.__enter__()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _stop_profiler(self):
+        if self._profiler is None:
+            return
+        base = os.path.splitext(self.log_path)[0]
+        if self.profile == "torch":
+            self._profiler.__exit__(None, None, None)
+            self._profiler.export_chrome_trace(base + ".trace.json")
+            print(self._profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=15))
+        else:
+            self._profiler.disable()
+            self._profiler.dump_stats(base + ".prof")
+            pstats.Stats(self._profiler).sort_stats("tottime").print_stats(15)
+        self._profiler = None
+
+    def close(self):
+        self._stop_profiler()
+        self._file.close()
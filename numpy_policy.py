@@ -0,0 +1,133 @@
+# numpy_policy.py
+# Pure-NumPy forward pass for the DQN Net (Linear-ReLU-Linear-ReLU-Linear), for low-latency
+# single-sample action selection without importing torch.
+import argparse
+
+import numpy as np
+
+NPZ_PATH = "models/dqn_agent.npz"
+
+
+def quantize_int8(weight):
+    """Symmetric per-output-row int8 quantization; returns (int8 weights, float32 row scales)."""
+    scale = np.abs(weight).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.round(weight / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+def export_npz(model_path, npz_path=NPZ_PATH, int8=False):
+    """Dump a saved Net state_dict to .npz (w0/b0, w1/b1, ...), optionally with int8 weights."""
+    import torch
+
+    state_dict = torch.load(model_path, map_location="cpu")
+    weights = [k for k in state_dict if k.endswith(".weight")]
+    arrays = {}
+    for i, key in enumerate(weights):
+        w = state_dict[key].numpy().astype(np.float32)
+        if int8:
+            arrays[f"w{i}_q"], arrays[f"w{i}_scale"] = quantize_int8(w)
+        else:
+            arrays[f"w{i}"] = w
+        arrays[f"b{i}"] = state_dict[key[:-len("weight")] + "bias"].numpy().astype(np.float32)
+    np.savez(npz_path, **arrays)
+    return npz_path
+
+
+class NumpyPolicy:
+    """
+    Q-values from float32 weights with ReLU between layers. forward/act reuse preallocated
+    per-layer buffers, so the returned array is overwritten by the next call.
+    int8 exports are dequantized once at load time; compute stays float32.
+    """
+    def __init__(self, weights, biases):
+        # always copy: state_dict arrays may share memory with weights a learner keeps updating in place
+        self.weights = [np.array(w, dtype=np.float32, copy=True) for w in weights]
+        self.biases = [np.array(b, dtype=np.float32, copy=True) for b in biases]
+        self._buffers = [np.empty(len(b), dtype=np.float32) for b in self.biases]
+        self.state_dim = self.weights[0].shape[1]
+        self.n_actions = len(self.biases[-1])
+
+    @classmethod
+    def load(cls, path=NPZ_PATH):
+        data = np.load(path)
+        weights, biases = [], []
+        i = 0
+        while f"b{i}" in data:
+            if f"w{i}_q" in data:
+                weights.append(data[f"w{i}_q"].astype(np.float32) * data[f"w{i}_scale"][:, None])
+            else:
+                weights.append(data[f"w{i}"])
+            biases.append(data[f"b{i}"])
+            i += 1
+        return cls(weights, biases)
+
+    @classmethod
+    def from_state_dict(cls, state_dict):
+        keys = [k[:-len(".weight")] for k in state_dict if k.endswith(".weight")]
+        return cls([state_dict[k + ".weight"].detach().cpu().numpy() for k in keys],
+                   [state_dict[k + ".bias"].detach().cpu().numpy() for k in keys])
+
+    def forward(self, obs):
+        x = obs
+        last = len(self.weights) - 1
+        for i, (w, b, out) in enumerate(zip(self.weights, self.biases, self._buffers)):
+            np.dot(w, x, out=out)
+            out += b
+            if i < last:
+                np.maximum(out, 0.0, out=out)
+            x = out
+        return x
+
+    def forward_batch(self, obs):
+        x = np.asarray(obs, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            x = x @ w.T
+            x += b
+            if i < last:
+                np.maximum(x, 0.0, out=x)
+        return x
+
+    def act(self, obs):
+        return int(self.forward(np.asarray(obs, dtype=np.float32)).argmax())
+
+    def act_batch(self, obs):
+        return self.forward_batch(obs).argmax(axis=1)
+
+
+def rollout(policy, episodes=10, **env_kwargs):
+    """Greedy CarAvoidEnv episodes driven by a NumpyPolicy; returns per-episode rewards."""
+    from env import CarAvoidEnv
+
+    env = CarAvoidEnv(**env_kwargs)
+    rewards = []
+    for _ in range(episodes):
+        state = env.reset()
+        total = 0.0
+        done = False
+        while not done:
+            state, reward, done, _ = env.step(policy.act(state))
+            total += reward
+        rewards.append(total)
+    return rewards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Net weights to .npz or roll out a NumPy policy")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="dump a .pth state_dict to .npz")
+    export.add_argument("model_path", nargs="?", default="models/dqn_agent.pth")
+    export.add_argument("npz_path", nargs="?", default=NPZ_PATH)
+    export.add_argument("--int8", action="store_true", help="store int8 weights with per-row scales")
+    run = sub.add_parser("rollout", help="run greedy CarAvoidEnv episodes without torch")
+    run.add_argument("npz_path", nargs="?", default=NPZ_PATH)
+    run.add_argument("--episodes", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Exported to {export_npz(args.model_path, args.npz_path, args.int8)}")
+    else:
+        rewards = rollout(NumpyPolicy.load(args.npz_path), args.episodes,
+                          lanes=5, npc_count=3, archetype="aggressive", max_steps=200)
+        print(f"mean reward over {len(rewards)} episodes: {np.mean(rewards):.3f}")
@@ -1,15 +1,24 @@
+import argparse
+import json
+import os
 import pygame
-import random
 import sys
+import time
+
 import numpy as np
 
-# --- Window setup ---
-pygame.init()
-WIDTH, HEIGHT = 400, 600
-LANE_COUNT = 4
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("🚗 Car Avoid Game - Player Attack NPC")
-clock = pygame.time.Clock()
+from qtable import QTable
+from sim import GameSim, WIDTH, HEIGHT, LANE_COUNT, LANE_WIDTH, PLAYER_Y, FPS, CAR_H, GAME_FIELDS
+
+# --- Window, assets and game state: created by setup() / main(), not at import ---
+screen = None
+clock = None
+atlas = None
+sprite_frames = None
+road_surface = None
+dash_strip = None
+sim = None
+lane_offset = 0
 
 # --- Colors ---
 ROAD_COLOR = (40, 40, 40)
@@ -22,88 +31,96 @@ GRAY = (50, 50, 50)
 WHITE = (255, 255, 255)
 OVERLAY = (0, 0, 0, 180)
 
-# --- Fonts ---
-font = pygame.font.SysFont("Arial", 26, bold=True)
-big_font = pygame.font.SysFont("Arial", 56, bold=True)
-
-# --- Player setup ---
-player_img = pygame.image.load("assets/player_car.png").convert_alpha()
-player_img = pygame.transform.scale(player_img, (50, 90))
-player_x = WIDTH // 2 - 25
-player_y = HEIGHT - 150
-player_speed = 6
-player_lives = 3
-
-# --- Coins (defensive NPC) ---
-coin_img = pygame.image.load("assets/coins.png").convert_alpha()
-coin_img = pygame.transform.scale(coin_img, (50, 90))
-coins = []
-for _ in range(4):
-    lane = random.randint(0, LANE_COUNT - 1)
-    coin_x = lane * (WIDTH // LANE_COUNT) + (WIDTH // LANE_COUNT // 2 - 25)
-    coin_y = random.randint(-800, -100)
-    coin_speed = random.uniform(4, 6)
-    coins.append([coin_x, coin_y, coin_speed])
-
-# --- Enemy NPCs (attacking) ---
-enemy_img = pygame.image.load("assets/enemy_car.png").convert_alpha()
-enemy_img = pygame.transform.scale(enemy_img, (50, 90))
-enemies = []
-for _ in range(3):
-    lane = random.randint(0, LANE_COUNT - 1)
-    enemy_x = lane * (WIDTH // LANE_COUNT) + (WIDTH // LANE_COUNT // 2 - 25)
-    enemy_y = random.randint(-800, -100)
-    enemy_speed = random.uniform(5, 7)
-    enemies.append([enemy_x, enemy_y, enemy_speed])
-
-# --- Game variables ---
-score = 0
-level = 1
-lane_offset = 0
-game_over = False
-
-# --- Q-Learning Setup for coins ---
-actions = ["move_left", "move_right", "accelerate", "decelerate"]
-alpha = 0.1
-gamma = 0.9
-epsilon = 0.2
-Q = {}
-
-def get_state(player_x, npc_x):
-    player_lane = player_x // (WIDTH // LANE_COUNT)
-    npc_lane = npc_x // (WIDTH // LANE_COUNT)
-    return (player_lane, npc_lane)
-
-def choose_action(state):
-    if state not in Q:
-        Q[state] = [0] * len(actions)
-    if random.random() < epsilon:
-        return random.choice(range(len(actions)))
-    return np.argmax(Q[state])
-
-def update_Q(state, action_idx, reward, next_state):
-    if next_state not in Q:
-        Q[next_state] = [0] * len(actions)
-    Q[state][action_idx] += alpha * (reward + gamma * max(Q[next_state]) - Q[state][action_idx])
-
-def perform_npc_action(npc, action_idx):
-    action = actions[action_idx]
-    lane_width = WIDTH // LANE_COUNT
-    move_step = 5
-    if action == "move_left":
-        npc[0] -= move_step
-        if npc[0] < 0: npc[0] = 0
-    elif action == "move_right":
-        npc[0] += move_step
-        if npc[0] > WIDTH - 50: npc[0] = WIDTH - 50
-    elif action == "accelerate":
-        npc[1] += min(npc[2] + 3, HEIGHT - 50)
-    elif action == "decelerate":
-        npc[1] += max(1, npc[2] - 2)
-    else:
-        npc[1] += npc[2]
-    npc[0] = int(npc[0])
-    npc[1] = int(npc[1])
+# --- Fonts: built on first use from the font files resolved into the asset cache ---
+FONTS = {"hud": ("Arial", 26, True), "big": ("Arial", 56, True), "small": ("Arial", 16, False)}
+font_files = {}
+fonts = {}
+
+def resolve_font(name, size, bold):
+    """(font file or None, fake bold) that pygame.font.SysFont picks; the lookup scans the system fonts."""
+    return pygame.font.SysFont(name, size, bold, constructor=lambda path, size, bold, italic: [path, bold])
+
+def get_font(key):
+    if key not in fonts:
+        path, fake_bold = font_files.get(key) or resolve_font(*FONTS[key])
+        if path is not None and not os.path.exists(path):
+            path, fake_bold = resolve_font(*FONTS[key])
+        fonts[key] = pygame.font.Font(path, FONTS[key][1])
+        fonts[key].set_bold(fake_bold)
+    return fonts[key]
+
+# --- Sprites: one atlas of pre-scaled images cropped to their visible pixels ---
+SPRITE_SIZE = (50, 90)
+ATLAS_ALIGN = 4
+SPRITES = {"player": "assets/player_car.png", "coin": "assets/coins.png", "enemy": "assets/enemy_car.png"}
+
+def build_atlas(paths, size=SPRITE_SIZE):
+    """
+    Scale each image once, crop it to its non-transparent bounding box and pack the crops side by side
+    in one display-format atlas. Returns (atlas, {name: (area, (dx, dy))}): blitting `area` of the atlas
+    at a sprite's position + (dx, dy) draws the same pixels as blitting the whole scaled image there,
+    without blending its fully transparent border.
+    """
+    scaled = {name: pygame.transform.scale(pygame.image.load(path).convert_alpha(), size)
+              for name, path in paths.items()}
+    crops = {name: image.get_bounding_rect() for name, image in scaled.items()}
+    # Frames are padded to whole ATLAS_ALIGN-pixel columns: odd-width alpha blits miss pygame's fast path
+    widths = {name: -(-c.width // ATLAS_ALIGN) * ATLAS_ALIGN for name, c in crops.items()}
+    atlas = pygame.Surface((sum(widths.values()), max(c.height for c in crops.values())), pygame.SRCALPHA)
+    frames = {}
+    x = 0
+    for name, image in scaled.items():
+        crop = crops[name]
+        atlas.blit(image.subsurface(crop), (x, 0), special_flags=pygame.BLEND_RGBA_ADD)
+        frames[name] = (pygame.Rect(x, 0, widths[name], crop.height), crop.topleft)
+        x += widths[name]
+    return atlas.convert_alpha(), frames
+
+# --- Asset cache: the atlas as a raw RGBA .npy (memory-mapped on load) plus frames and font files in .json ---
+ASSET_CACHE = "assets/cache/sprites.npy"
+ASSET_CACHE_VERSION = 1
+
+def asset_key(paths, size):
+    """Changes whenever a source image, the sprite size or the atlas layout does."""
+    sources = [[name, path, os.stat(path).st_size, os.stat(path).st_mtime_ns] for name, path in paths.items()]
+    return [ASSET_CACHE_VERSION, list(size), ATLAS_ALIGN, sources]
+
+def load_assets(paths=SPRITES, size=SPRITE_SIZE, cache=ASSET_CACHE):
+    """
+    Sprite atlas, its frames and the resolved font files. Loaded from the cache when its key matches the
+    source images, otherwise built from the PNGs (and system font scan) and written back for the next launch.
+    """
+    meta_path = os.path.splitext(cache)[0] + ".json"
+    key = asset_key(paths, size)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["key"] == key:
+            pixels = np.load(cache, mmap_mode="r")
+            image = pygame.image.frombuffer(pixels, pixels.shape[1::-1], "RGBA")
+            frames = {name: (pygame.Rect(area), tuple(offset)) for name, (area, offset) in meta["frames"].items()}
+            return image.convert_alpha(), frames, meta["fonts"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    image, frames = build_atlas(paths, size)
+    files = {name: resolve_font(*spec) for name, spec in FONTS.items()}
+    pixels = np.frombuffer(pygame.image.tobytes(image, "RGBA"), np.uint8)
+    pixels = pixels.reshape(image.get_height(), image.get_width(), 4)
+    meta = {"key": key, "frames": {name: [list(area), list(offset)] for name, (area, offset) in frames.items()},
+            "fonts": files}
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        # pixels first: the .json is what makes a cache entry valid
+        with open(f"{cache}.tmp", "wb") as f:
+            np.save(f, pixels)
+        os.replace(f"{cache}.tmp", cache)
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+    except OSError:
+        pass  # read-only install: build from the PNGs on every launch
+    return image, frames, files
 
 # --- Helper Functions ---
 def draw_road():
@@ -123,128 +140,232 @@ def draw_road():
                          (lane_width * 2 - 2, y + lane_offset),
                          (lane_width * 2 - 2, y + 20 + lane_offset), 4)
 
+# --- Cached rendering: static road surface, scrolling dash strip, dirty rects ---
+DASH_COLUMN = pygame.Rect(LANE_WIDTH * 2 - 5, 0, 7, HEIGHT)
+
+def build_road():
+    road = pygame.Surface((WIDTH, HEIGHT)).convert()
+    road.fill((30, 30, 30))
+    for y in range(HEIGHT):
+        color_val = max(0, min(ROAD_COLOR[0] + y // 20, 60))
+        pygame.draw.line(road, (color_val, color_val, color_val), (0, y), (WIDTH, y))
+    pygame.draw.rect(road, GRAY, (0, 0, 12, HEIGHT))
+    pygame.draw.rect(road, GRAY, (WIDTH - 12, 0, 12, HEIGHT))
+    for i in range(1, LANE_COUNT):
+        pygame.draw.line(road, LANE_COLOR, (i * LANE_WIDTH, 0), (i * LANE_WIDTH, HEIGHT), 3)
+    return road
+
+def build_dash_strip():
+    # Dashes every 40px, tall enough to cover the column at any scroll offset
+    strip = pygame.Surface((DASH_COLUMN.width, HEIGHT + 80), pygame.SRCALPHA)
+    x = LANE_WIDTH * 2 - 2 - DASH_COLUMN.x
+    for y in range(0, HEIGHT + 80, 40):
+        pygame.draw.line(strip, WHITE, (x, y), (x, y + 20), 4)
+    return strip.convert_alpha()
+
+FULL_REDRAW_RECTS = 64
+
+dirty_rects = []
+
+def draw_road_cached():
+    """Restore last frame's sprite areas from the cached road and scroll the dashes. Returns changed rects."""
+    global lane_offset
+    for rect in dirty_rects:
+        screen.blit(road_surface, rect, rect)
+    lane_offset = (lane_offset + 8) % 40
+    screen.blit(road_surface, DASH_COLUMN, DASH_COLUMN)
+    screen.blit(dash_strip, (DASH_COLUMN.x, lane_offset - 40))
+    return [DASH_COLUMN]
+
+text_cache = {}
+
+def render_text(key, text, color, font_key="hud"):
+    # Re-render only when the text for this HUD slot changes
+    cached = text_cache.get(key)
+    if cached is None or cached[0] != text:
+        cached = (text, get_font(font_key).render(text, True, color))
+        text_cache[key] = cached
+    return cached[1]
+
 def draw_hud():
     panel_width = 150
     panel_height = 40
-    pygame.draw.rect(screen, GRAY, (15, 15, panel_width, panel_height), border_radius=8)
-    pygame.draw.rect(screen, GRAY, (WIDTH - panel_width - 15, 15, panel_width, panel_height), border_radius=8)
-    score_text = font.render(f"Score: {score}", True, TEXT_COLOR)
-    level_text = font.render(f"Level: {level}", True, TEXT_COLOR)
-    lives_text = font.render(f"Lives: {player_lives}", True, YELLOW)
-    screen.blit(score_text, (25, 20))
-    screen.blit(level_text, (WIDTH - panel_width, 20))
-    screen.blit(lives_text, (25, 60))
+    rects = [
+        pygame.draw.rect(screen, GRAY, (15, 15, panel_width, panel_height), border_radius=8),
+        pygame.draw.rect(screen, GRAY, (WIDTH - panel_width - 15, 15, panel_width, panel_height), border_radius=8),
+    ]
+    score_text = render_text("score", f"Score: {sim.score}", TEXT_COLOR)
+    level_text = render_text("level", f"Level: {sim.level}", TEXT_COLOR)
+    lives_text = render_text("lives", f"Lives: {sim.player_lives}", YELLOW)
+    rects.append(screen.blit(score_text, (25, 20)))
+    rects.append(screen.blit(level_text, (WIDTH - panel_width, 20)))
+    rects.append(screen.blit(lives_text, (25, 60)))
+    return rects
+
+def sprite_blits(name, xs, ys):
+    """(atlas, position, area) blit items for sprites at whole-pixel positions xs, ys."""
+    area, (dx, dy) = sprite_frames[name]
+    return [(atlas, pos, area) for pos in zip((xs.astype(int) + dx).tolist(), (ys.astype(int) + dy).tolist())]
+
+def draw_sprites():
+    """Draw the player and every NPC with one Surface.blits call; returns the drawn rects."""
+    area, (dx, dy) = sprite_frames["player"]
+    batch = [(atlas, (sim.player_x + dx, PLAYER_Y + dy), area)]
+    batch += sprite_blits("coin", sim.coin_x, sim.coin_y)
+    batch += sprite_blits("enemy", sim.enemy_x, sim.enemy_y)
+    return screen.blits(batch)
+
+frame_ms = 0.0
+
+def draw_stats():
+    # Refresh the overlay text a few times a second so it stays readable
+    if sim.frames % 15 == 0 or "stats" not in text_cache:
+        text = f"FPS {clock.get_fps():5.1f}  frame {frame_ms:5.2f} ms"
+        text_cache["stats"] = (text, get_font("small").render(text, True, WHITE, GRAY))
+    return screen.blit(text_cache["stats"][1], (15, HEIGHT - 30))
 
 def draw_game_over():
     overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     overlay.fill(OVERLAY)
     screen.blit(overlay, (0, 0))
-    over_text = big_font.render("GAME OVER", True, RED)
-    score_text = font.render(f"Final Score: {score}", True, WHITE)
-    restart_text = font.render("Press [R] to Restart", True, YELLOW)
+    over_text = get_font("big").render("GAME OVER", True, RED)
+    score_text = get_font("hud").render(f"Final Score: {sim.score}", True, WHITE)
+    restart_text = get_font("hud").render("Press [R] to Restart", True, YELLOW)
     screen.blit(over_text, (WIDTH // 2 - over_text.get_width() // 2, HEIGHT // 2 - 100))
     screen.blit(score_text, (WIDTH // 2 - score_text.get_width() // 2, HEIGHT // 2 - 20))
     screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 40))
 
-def reset_game():
-    global player_x, player_lives, score, level, coins, enemies, game_over
-    player_x = WIDTH // 2 - 25
-    player_lives = 3
-    score = 0
-    level = 1
-    game_over = False
-    coins.clear()
-    enemies.clear()
-    for _ in range(4):
-        lane = random.randint(0, LANE_COUNT - 1)
-        coin_x = lane * (WIDTH // LANE_COUNT) + (WIDTH // LANE_COUNT // 2 - 25)
-        coin_y = random.randint(-800, -100)
-        coin_speed = random.uniform(4, 6)
-        coins.append([coin_x, coin_y, coin_speed])
-    for _ in range(3):
-        lane = random.randint(0, LANE_COUNT - 1)
-        enemy_x = lane * (WIDTH // LANE_COUNT) + (WIDTH // LANE_COUNT // 2 - 25)
-        enemy_y = random.randint(-800, -100)
-        enemy_speed = random.uniform(5, 7)
-        enemies.append([enemy_x, enemy_y, enemy_speed])
+def render_legacy(show_stats=False):
+    draw_road()
+    draw_sprites()
+    draw_hud()
+    if show_stats:
+        draw_stats()
+    pygame.display.flip()
+
+def render_cached(show_stats=False, full_redraw=False):
+    global dirty_rects
+    # With a crowd on screen, one road blit and a flip beat restoring and updating every sprite rect
+    full_redraw = full_redraw or sim.coin_count + sim.enemy_count > FULL_REDRAW_RECTS
+    if full_redraw:
+        screen.blit(road_surface, (0, 0))
+        dirty_rects = []
+    changed = draw_road_cached()
+    # Collected on flip() frames too: the next frame restores the road under them
+    drawn = draw_sprites() + draw_hud()
+    if show_stats:
+        drawn.append(draw_stats())
+    if full_redraw:
+        pygame.display.flip()
+    else:
+        pygame.display.update(dirty_rects + changed + drawn)
+    dirty_rects = drawn
+
+def run_stress(entities, frames, show_stats=False):
+    """
+    Spawn `entities` coins and enemies scattered over the screen (respawning just above it, player
+    never dies) and run `frames` uncapped frames, reporting sim and render time per frame.
+    """
+    global sim
+    coins = entities // 2
+    sim = GameSim(seed=0, coin_count=coins, enemy_count=entities - coins, respawn_y=(-CAR_H, 0))
+    sim.coin_y[:] = sim.rng.integers(-CAR_H, HEIGHT, coins)
+    sim.enemy_y[:] = sim.rng.integers(-CAR_H, HEIGHT, entities - coins)
+    sim.player_lives = float("inf")
+    render_cached(show_stats, full_redraw=True)
+    sim_ms, render_ms, on_screen = [], [], []
+    for frame in range(frames):
+        pygame.event.pump()
+        start = time.perf_counter()
+        sim.step((frame // 60) % 3 - 1)
+        stepped = time.perf_counter()
+        render_cached(show_stats)
+        done = time.perf_counter()
+        sim_ms.append((stepped - start) * 1000.0)
+        render_ms.append((done - stepped) * 1000.0)
+        on_screen.append(int(((sim.coin_y > -CAR_H) & (sim.coin_y < HEIGHT)).sum()
+                             + ((sim.enemy_y > -CAR_H) & (sim.enemy_y < HEIGHT)).sum()))
+    frame_times = sorted(s + r for s, r in zip(sim_ms, render_ms))
+    mean = sum(frame_times) / frames
+    p99 = frame_times[min(frames - 1, int(frames * 0.99))]
+    print(f"{entities} entities ({sum(on_screen) / frames:.0f} on screen on average), {frames} frames")
+    print(f"sim {sum(sim_ms) / frames:.2f} ms  render {sum(render_ms) / frames:.2f} ms  "
+          f"frame {mean:.2f} ms (p99 {p99:.2f} ms) -> {1000.0 / mean:.0f} FPS uncapped")
+    print(f"{'holds' if p99 <= 1000.0 / FPS else 'misses'} {FPS} FPS at p99")
+
+def setup():
+    """Open the window and build what is drawn into it. Only the display and font modules are initialized."""
+    global screen, clock, atlas, sprite_frames, road_surface, dash_strip
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("🚗 Car Avoid Game - Player Attack NPC")
+    clock = pygame.time.Clock()
+    atlas, sprite_frames, files = load_assets()
+    font_files.update(files)
+    road_surface = build_road()
+    dash_strip = build_dash_strip()
 
 # --- Main Game Loop ---
-running = True
-while running:
-    clock.tick(60)
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-
-    keys = pygame.key.get_pressed()
-    if not game_over:
-        # Player movement
-        if keys[pygame.K_LEFT] and player_x > 20:
-            player_x -= player_speed
-        if keys[pygame.K_RIGHT] and player_x < WIDTH - 70:
-            player_x += player_speed
-
-        player_rect = pygame.Rect(player_x, player_y, 50, 90)
-
-        # Move coins (defensive NPCs) with Q-Learning
-        for coin in coins:
-            state = get_state(player_x, coin[0])
-            action_idx = choose_action(state)
-            perform_npc_action(coin, action_idx)
-            reward = 0
-            if abs(player_x - coin[0]) > 50:
-                reward += 1
-            coin_rect = pygame.Rect(coin[0], coin[1], 50, 90)
-            if coin_rect.colliderect(player_rect):
-                reward -= 1
-            next_state = get_state(player_x, coin[0])
-            update_Q(state, action_idx, reward, next_state)
-            if coin[1] > HEIGHT:
-                coin[1] = random.randint(-600, -100)
-                coin[0] = random.randint(0, LANE_COUNT - 1) * (WIDTH // LANE_COUNT) + (WIDTH // LANE_COUNT // 2 - 25)
-                coin[2] = random.uniform(4 + level*0.3, 6 + level*0.5)
-
-        # Player collects coins → score +1
-        for coin in coins:
-            coin_rect = pygame.Rect(coin[0], coin[1], 50, 90)
-            if player_rect.colliderect(coin_rect):
-                score += 1
-                coin[1] = random.randint(-800, -100)
-                coin[0] = random.randint(0, LANE_COUNT - 1) * (WIDTH // LANE_COUNT) + (WIDTH // LANE_COUNT // 2 - 25)
-                coin[2] = random.uniform(4 + level*0.3, 6 + level*0.5)
-                break
-
-        # Move enemies (attacking NPCs)
-        for enemy in enemies:
-            enemy[1] += enemy[2]
-            if enemy[1] > HEIGHT:
-                enemy[1] = random.randint(-800, -100)
-                enemy[0] = random.randint(0, LANE_COUNT - 1) * (WIDTH // LANE_COUNT) + (WIDTH // LANE_COUNT // 2 - 25)
-                enemy[2] = random.uniform(5, 7)
-            enemy_rect = pygame.Rect(enemy[0], enemy[1], 50, 90)
-            if player_rect.colliderect(enemy_rect):
-                player_lives -= 1
-                enemy[1] = random.randint(-800, -100)
-                if player_lives <= 0:
-                    game_over = True
-
-        # Level up every 20 points
-        if score >= level * 20:
-            level += 1
-
-        # Draw
-        draw_road()
-        screen.blit(player_img, (player_x, player_y))
-        for coin in coins:
-            screen.blit(coin_img, (coin[0], coin[1]))
-        for enemy in enemies:
-            screen.blit(enemy_img, (enemy[0], enemy[1]))
-        draw_hud()
+def main():
+    global sim, frame_ms
+    parser = argparse.ArgumentParser(description="Car Avoid Game")
+    parser.add_argument("--legacy-render", action="store_true",
+                        help="redraw the whole road and flip the full window every frame")
+    parser.add_argument("--fps", action="store_true", help="show an FPS / frame-time overlay")
+    parser.add_argument("--q-path", default="models/coin_q.npy",
+                        help="coin Q-table loaded at start and saved on exit")
+    parser.add_argument("--stress", type=int, metavar="N",
+                        help="benchmark N on-screen coins and enemies instead of playing, then exit")
+    parser.add_argument("--frames", type=int, default=600, help="frames to run in --stress mode")
+    parser.add_argument("--record", metavar="DIR",
+                        help="append this session's coin transitions and player input to a trajectory dataset")
+    args = parser.parse_args()
+    setup()
+    if args.stress:
+        run_stress(args.stress, args.frames, args.fps)
+        pygame.quit()
+        return
+    # --- Game state (player, coins, enemies, coin Q-table) ---
+    recorder = None
+    if args.record:
+        from trajectory import TrajectoryWriter
 
-    else:
-        draw_game_over()
-        if keys[pygame.K_r]:
-            reset_game()
+        recorder = TrajectoryWriter(args.record, GAME_FIELDS, attrs={"source": "play"})
+    q_table = QTable.load(args.q_path, mmap=True) if os.path.exists(args.q_path) else None
+    sim = GameSim(q_table=q_table, recorder=recorder)
 
-    pygame.display.flip()
+    running = True
+    full_redraw = True
+    while running:
+        clock.tick(FPS)
+        frame_start = time.perf_counter()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                sim.q.save(args.q_path)
+                if recorder:
+                    recorder.close()
+                pygame.quit()
+                sys.exit()
+
+        keys = pygame.key.get_pressed()
+        if not sim.game_over:
+            sim.step(keys[pygame.K_RIGHT] - keys[pygame.K_LEFT])
+
+            # Draw
+            if args.legacy_render:
+                render_legacy(args.fps)
+            else:
+                render_cached(args.fps, full_redraw)
+                full_redraw = False
+
+        else:
+            draw_game_over()
+            if keys[pygame.K_r]:
+                sim.reset()
+                full_redraw = True
+            pygame.display.flip()
+        frame_ms = (time.perf_counter() - frame_start) * 1000.0
+
+if __name__ == "__main__":
+    main()
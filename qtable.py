@@ -0,0 +1,80 @@
+# qtable.py
+# Dense tabular Q-learning for the play.py coin NPCs.
+import os
+
+import numpy as np
+
+DENSE_UPDATE_MAX = 4096  # tables up to this many cells reduce duplicate updates with a full-size bincount
+SMALL_BATCH_MAX = 32  # batches up to this size average repeated (state, action) pairs in plain Python
+
+
+class QTable:
+    """
+    Q-values in a preallocated (n_states, n_actions) float32 array.
+    choose_actions/update take arrays of states so every NPC is handled in one vectorized call.
+    Tables persist as .npy; load(mmap=True) maps the file so updates are written straight back to it.
+    """
+    def __init__(self, n_states, n_actions, alpha=0.1, gamma=0.9, epsilon=0.2, seed=None, values=None):
+        self.n_states = n_states
+        self.n_actions = n_actions
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        if values is None:
+            values = np.zeros((n_states, n_actions), dtype=np.float32)
+        self.values = values
+
+    def choose_actions(self, states):
+        """Epsilon-greedy action per state."""
+        n = len(states)
+        actions = self.values[states].argmax(axis=1)
+        explore = self.rng.random(n) < self.epsilon
+        k = np.count_nonzero(explore)
+        if k:
+            actions[explore] = self.rng.integers(0, self.n_actions, k)
+        return actions
+
+    def update(self, states, actions, rewards, next_states):
+        """
+        One TD(0) step per (state, action); transitions hitting the same pair apply their mean TD error,
+        so hundreds of NPCs sharing a state move it no further than one would.
+        """
+        target = rewards + self.gamma * self.values[next_states].max(axis=1)
+        td = target - self.values[states, actions]
+        flat = self.values.reshape(-1)
+        if len(td) <= SMALL_BATCH_MAX:
+            sums, counts = {}, {}
+            for state, action, err in zip(states.tolist(), actions.tolist(), td.tolist()):
+                cell = state * self.n_actions + action
+                if cell in sums:
+                    sums[cell] += err
+                    counts[cell] += 1
+                else:
+                    sums[cell] = err
+                    counts[cell] = 1
+            for cell, total in sums.items():
+                flat[cell] = flat.item(cell) + self.alpha * total / counts[cell]
+            return
+        cells = states * self.n_actions + actions
+        if flat.size <= DENSE_UPDATE_MAX:
+            counts = np.bincount(cells, minlength=flat.size)
+            hit = counts > 0
+            flat[hit] += self.alpha * np.bincount(cells, weights=td, minlength=flat.size)[hit] / counts[hit]
+            return
+        cells, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        flat[cells] += self.alpha * (np.bincount(inverse, weights=td) / counts)
+
+    def save(self, path):
+        if isinstance(self.values, np.memmap) and os.path.abspath(self.values.filename) == os.path.abspath(path):
+            self.values.flush()
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.save(path, self.values)
+
+    @classmethod
+    def load(cls, path, mmap=False, **kwargs):
+        values = np.load(path, mmap_mode="r+" if mmap else None)
+        if values.dtype != np.float32 or values.ndim != 2:
+            raise ValueError(f"{path} is not a (n_states, n_actions) float32 Q-table")
+        return cls(*values.shape, values=values, **kwargs)
@@ -0,0 +1,426 @@
+# sim.py
+# Headless, fixed-timestep simulation of the play.py game: player, Q-learning coins and enemy cars.
+# No pygame dependency, so it can run far faster than real time for offline NPC tuning.
+import argparse
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from qtable import QTable
+
+WIDTH, HEIGHT = 400, 600
+LANE_COUNT = 4
+LANE_WIDTH = WIDTH // LANE_COUNT
+CAR_W, CAR_H = 50, 90
+FPS = 60  # simulation steps per game-second
+PLAYER_Y = HEIGHT - 150
+PLAYER_SPEED = 6
+PLAYER_LIVES = 3
+COIN_COUNT = 4
+ENEMY_COUNT = 3
+BROAD_PHASE_MIN = 64  # below this many sprites a direct vectorized overlap test beats building the grid
+SCALAR_MAX_ENTITIES = 16  # up to this many coins + enemies, step() loops over them in plain Python
+
+# --- Q-Learning Setup for coins ---
+ACTIONS = ["move_left", "move_right", "accelerate", "decelerate"]
+NPC_MOVE_X = np.array([-5.0, 5.0, 0.0, 0.0])  # sideways step per action
+_NPC_MOVE_X = NPC_MOVE_X.tolist()
+ALPHA = 0.1
+GAMMA = 0.9
+EPSILON = 0.2
+# Coin Q-learning transitions as GameSim(recorder=...) writes them, one row per coin per frame
+GAME_FIELDS = {"state": ("int16", ()), "action": ("int8", ()), "reward": ("float32", ()),
+               "next_state": ("int16", ()), "player_input": ("int8", ())}
+
+
+def lane_x(lane):
+    return lane * LANE_WIDTH + (LANE_WIDTH // 2 - 25)
+
+
+def overlaps(ax, ay, bx, by):
+    # Same test as pygame.Rect(ax, ay, 50, 90).colliderect(pygame.Rect(bx, by, 50, 90))
+    ax, ay, bx, by = int(ax), int(ay), int(bx), int(by)
+    return ax < bx + CAR_W and bx < ax + CAR_W and ay < by + CAR_H and by < ay + CAR_H
+
+
+def overlaps_many(xs, ys, bx, by):
+    """Vectorized overlaps() of every (xs[i], ys[i]) sprite against the one at (bx, by); xs must be whole."""
+    ys = np.trunc(ys)
+    return (xs < bx + CAR_W) & (xs > bx - CAR_W) & (ys < by + CAR_H) & (ys > by - CAR_H)
+
+
+class LaneGrid:
+    """
+    Uniform broad-phase grid: one column per lane, rows CAR_H tall, plus one row above and one below
+    the screen. build() buckets sprite top-left corners with a single argsort; query() returns the
+    indices of sprites in the cells a CAR_W x CAR_H sprite at (x, y) could overlap, which callers
+    then narrow down with overlaps_many.
+    """
+    def __init__(self, cell_w=LANE_WIDTH, cell_h=CAR_H):
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.cols = -(-WIDTH // cell_w)
+        self.rows = -(-HEIGHT // cell_h) + 2
+        self.order = np.zeros(0, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.int64)
+
+    def build(self, xs, ys):
+        col = np.clip(xs // self.cell_w, 0, self.cols - 1)
+        row = np.clip(ys // self.cell_h + 1, 0, self.rows - 1)
+        keys = (col * self.rows + row).astype(np.int64)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def query(self, x, y):
+        c0 = min(max((x - CAR_W + 1) // self.cell_w, 0), self.cols - 1)
+        c1 = min(max((x + CAR_W - 1) // self.cell_w, 0), self.cols - 1)
+        r0 = min(max((y - CAR_H + 1) // self.cell_h + 1, 0), self.rows - 1)
+        r1 = min(max((y + CAR_H - 1) // self.cell_h + 1, 0), self.rows - 1)
+        bounds = np.arange(int(c0), int(c1) + 1) * self.rows
+        starts = np.searchsorted(self.keys, bounds + r0)
+        ends = np.searchsorted(self.keys, bounds + r1, side="right")
+        return np.concatenate([self.order[s:e] for s, e in zip(starts.tolist(), ends.tolist())])
+
+
+class GameSim:
+    """
+    Game state and rules from play.py. One step() is one 1/FPS frame.
+    player_input: -1 moves left, 1 moves right, 0 stays.
+    Coins and enemies live in float arrays (coin_x, coin_y, coin_speed, enemy_x, ...) so movement,
+    respawns and collisions are resolved in vectorized passes; collisions with the player go through a
+    LaneGrid broad-phase. Games of up to SCALAR_MAX_ENTITIES entities, the default seven included, run
+    about twice as fast stepped one entity at a time over lists, so _step_scalar does that with the same
+    rules and random draws (tests/test_sim.py plays both paths against each other).
+    q holds coin action values for state player_lane * LANE_COUNT + coin_lane.
+    respawn_y: (low, high) y range for every spawn instead of the game's off-screen ranges.
+    recorder: optional trajectory.TrajectoryWriter with GAME_FIELDS; each frame's coin transitions and
+    the player's input are appended to it.
+    """
+    def __init__(self, seed=None, alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON, q_table=None,
+                 coin_count=COIN_COUNT, enemy_count=ENEMY_COUNT, respawn_y=None, recorder=None):
+        self.rng = np.random.default_rng(seed)
+        if q_table is None:
+            q_table = QTable(LANE_COUNT * LANE_COUNT, len(ACTIONS), alpha, gamma, epsilon, seed=seed)
+        self.q = q_table
+        self.coin_count = coin_count
+        self.enemy_count = enemy_count
+        self.respawn_y = respawn_y
+        self.recorder = recorder
+        self.grid = LaneGrid()
+        self.frames = 0
+        self.reset()
+
+    def _spawn_y(self, low, high, n):
+        if self.respawn_y is not None:
+            low, high = self.respawn_y
+        return self.rng.integers(low, high, n, endpoint=True).astype(np.float64)
+
+    def _spawn_x(self, n):
+        return lane_x(self.rng.integers(0, LANE_COUNT, n)).astype(np.float64)
+
+    def reset(self):
+        self.player_x = WIDTH // 2 - 25
+        self.player_lives = PLAYER_LIVES
+        self.score = 0
+        self.level = 1
+        self.game_over = False
+        rng = self.rng
+        n, m = self.coin_count, self.enemy_count
+        self.coin_x, self.coin_y, self.coin_speed = self._spawn_x(n), self._spawn_y(-800, -100, n), rng.uniform(4, 6, n)
+        self.enemy_x, self.enemy_y, self.enemy_speed = self._spawn_x(m), self._spawn_y(-800, -100, m), rng.uniform(5, 7, m)
+
+    @property
+    def seconds(self):
+        return self.frames / FPS
+
+    def coin_states(self):
+        player_lane = self.player_x // LANE_WIDTH
+        coin_lanes = (self.coin_x // LANE_WIDTH).astype(np.int64)
+        return player_lane * LANE_COUNT + np.minimum(coin_lanes, LANE_COUNT - 1)
+
+    def perform_npc_actions(self, actions):
+        """Apply one ACTIONS index per coin: move 5px sideways, or fall faster/slower than coin_speed."""
+        x, y, speed = self.coin_x, self.coin_y, self.coin_speed
+        x += NPC_MOVE_X[actions]
+        np.clip(x, 0, WIDTH - 50, out=x)
+        y += np.choose(actions, (0.0, 0.0, np.minimum(speed + 3, HEIGHT - 50), np.maximum(1, speed - 2)))
+        np.trunc(y, out=y)
+
+    def _touching(self, xs, ys):
+        """Indices of sprites overlapping the player, via the broad-phase grid for crowds."""
+        if len(xs) < BROAD_PHASE_MIN:
+            return np.flatnonzero(overlaps_many(xs, ys, self.player_x, PLAYER_Y))
+        self.grid.build(xs, ys)
+        candidates = self.grid.query(self.player_x, PLAYER_Y)
+        return candidates[overlaps_many(xs[candidates], ys[candidates], self.player_x, PLAYER_Y)]
+
+    def step(self, player_input=0):
+        """Advance one frame. Returns (coins_collected, lives_lost) for this frame."""
+        if self.game_over:
+            return 0, 0
+        if self.coin_count + self.enemy_count <= SCALAR_MAX_ENTITIES:
+            return self._step_scalar(player_input)
+        self.frames += 1
+        rng = self.rng
+        level = self.level
+
+        # Player movement
+        if player_input < 0 and self.player_x > 20:
+            self.player_x -= PLAYER_SPEED
+        if player_input > 0 and self.player_x < WIDTH - 70:
+            self.player_x += PLAYER_SPEED
+        player_x = self.player_x
+
+        # Move coins (defensive NPCs) with Q-Learning
+        states = self.coin_states()
+        actions = self.q.choose_actions(states)
+        self.perform_npc_actions(actions)
+        rewards = (np.abs(player_x - self.coin_x) > 50).astype(np.float32)
+        touching = self._touching(self.coin_x, self.coin_y)
+        rewards[touching] -= 1
+        next_states = self.coin_states()
+        self.q.update(states, actions, rewards, next_states)
+        if self.recorder is not None:
+            self.recorder.append_many(state=states, action=actions, reward=rewards, next_state=next_states,
+                                      player_input=np.full(len(states), player_input))
+        off = np.flatnonzero(self.coin_y > HEIGHT)
+        if len(off):
+            self.coin_y[off] = self._spawn_y(-600, -100, len(off))
+            self.coin_x[off] = self._spawn_x(len(off))
+            self.coin_speed[off] = rng.uniform(4 + level * 0.3, 6 + level * 0.5, len(off))
+
+        # Player collects coins → score +1 (at most one per frame). Coins respawned above are now
+        # off-screen, so the overlap test from the Q-learning pass still holds.
+        collected = 0
+        if len(touching):
+            i = touching.min()
+            self.score += 1
+            collected = 1
+            self.coin_y[i] = self._spawn_y(-800, -100, 1)[0]
+            self.coin_x[i] = self._spawn_x(1)[0]
+            self.coin_speed[i] = rng.uniform(4 + level * 0.3, 6 + level * 0.5)
+
+        # Move enemies (attacking NPCs)
+        self.enemy_y += self.enemy_speed
+        off = np.flatnonzero(self.enemy_y > HEIGHT)
+        if len(off):
+            self.enemy_y[off] = self._spawn_y(-800, -100, len(off))
+            self.enemy_x[off] = self._spawn_x(len(off))
+            self.enemy_speed[off] = rng.uniform(5, 7, len(off))
+        hit = self._touching(self.enemy_x, self.enemy_y)
+        hits = len(hit)
+        if hits:
+            self.player_lives -= hits
+            self.enemy_y[hit] = self._spawn_y(-800, -100, hits)
+            if self.player_lives <= 0:
+                self.game_over = True
+
+        # Level up every 20 points
+        if self.score >= self.level * 20:
+            self.level += 1
+        return collected, hits
+
+
+    def _step_scalar(self, player_input):
+        # step() for a few entities: per-entity loops over lists, written back to the arrays at the end
+        self.frames += 1
+        rng = self.rng
+        level = self.level
+        if player_input < 0 and self.player_x > 20:
+            self.player_x -= PLAYER_SPEED
+        if player_input > 0 and self.player_x < WIDTH - 70:
+            self.player_x += PLAYER_SPEED
+        player_x = self.player_x
+        base_state = player_x // LANE_WIDTH * LANE_COUNT
+        coin_x, coin_y, coin_speed = self.coin_x.tolist(), self.coin_y.tolist(), self.coin_speed.tolist()
+
+        def touches(x, y):
+            y = math.trunc(y)
+            return player_x - CAR_W < x < player_x + CAR_W and PLAYER_Y - CAR_H < y < PLAYER_Y + CAR_H
+
+        # Move coins (defensive NPCs) with Q-Learning
+        states = np.array([base_state + min(int(x // LANE_WIDTH), LANE_COUNT - 1) for x in coin_x])
+        actions = self.q.choose_actions(states)
+        rewards, touching, next_states = [], [], []
+        for i, action in enumerate(actions.tolist()):
+            x = min(max(coin_x[i] + _NPC_MOVE_X[action], 0), WIDTH - 50)
+            y, speed = coin_y[i], coin_speed[i]
+            if action == 2:
+                y += min(speed + 3, HEIGHT - 50)
+            elif action == 3:
+                y += max(1, speed - 2)
+            coin_x[i], coin_y[i] = x, math.trunc(y)
+            reward = 1.0 if abs(player_x - x) > 50 else 0.0
+            if touches(x, coin_y[i]):
+                touching.append(i)
+                reward -= 1
+            rewards.append(reward)
+            next_states.append(base_state + min(int(x // LANE_WIDTH), LANE_COUNT - 1))
+        rewards = np.array(rewards, dtype=np.float32)
+        next_states = np.array(next_states)
+        self.q.update(states, actions, rewards, next_states)
+        if self.recorder is not None:
+            self.recorder.append_many(state=states, action=actions, reward=rewards, next_state=next_states,
+                                      player_input=np.full(len(states), player_input))
+        off = [i for i, y in enumerate(coin_y) if y > HEIGHT]
+        if off:
+            k = len(off)
+            ys, xs = self._spawn_y(-600, -100, k).tolist(), self._spawn_x(k).tolist()
+            speeds = rng.uniform(4 + level * 0.3, 6 + level * 0.5, k).tolist()
+            for j, i in enumerate(off):
+                coin_y[i], coin_x[i], coin_speed[i] = ys[j], xs[j], speeds[j]
+
+        # Player collects coins (at most one per frame)
+        collected = 0
+        if touching:
+            i = touching[0]
+            self.score += 1
+            collected = 1
+            coin_y[i] = float(self._spawn_y(-800, -100, 1)[0])
+            coin_x[i] = float(self._spawn_x(1)[0])
+            coin_speed[i] = rng.uniform(4 + level * 0.3, 6 + level * 0.5)
+        self.coin_x[:], self.coin_y[:], self.coin_speed[:] = coin_x, coin_y, coin_speed
+
+        # Move enemies (attacking NPCs)
+        enemy_x, enemy_speed = self.enemy_x.tolist(), self.enemy_speed.tolist()
+        enemy_y = [y + speed for y, speed in zip(self.enemy_y.tolist(), enemy_speed)]
+        off = [i for i, y in enumerate(enemy_y) if y > HEIGHT]
+        if off:
+            k = len(off)
+            ys, xs, speeds = self._spawn_y(-800, -100, k).tolist(), self._spawn_x(k).tolist(), rng.uniform(5, 7, k)
+            for j, i in enumerate(off):
+                enemy_y[i], enemy_x[i], enemy_speed[i] = ys[j], xs[j], float(speeds[j])
+        hit = [i for i in range(len(enemy_y)) if touches(enemy_x[i], enemy_y[i])]
+        hits = len(hit)
+        if hits:
+            self.player_lives -= hits
+            for i, y in zip(hit, self._spawn_y(-800, -100, hits).tolist()):
+                enemy_y[i] = y
+            if self.player_lives <= 0:
+                self.game_over = True
+        self.enemy_x[:], self.enemy_y[:], self.enemy_speed[:] = enemy_x, enemy_y, enemy_speed
+
+        if self.score >= self.level * 20:
+            self.level += 1
+        return collected, hits
+
+
+class RandomPlayer:
+    """Holds a random direction for a random number of frames."""
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.direction = 0
+        self.hold = 0
+
+    def __call__(self, sim):
+        if self.hold <= 0:
+            self.direction = self.rng.choice((-1, 0, 1))
+            self.hold = self.rng.randint(5, 40)
+        self.hold -= 1
+        return self.direction
+
+
+def scripted_player(sim):
+    """Steer toward the lowest on-screen coin, away from an enemy closing in on the player's lane."""
+    x = sim.player_x
+    closing = ((PLAYER_Y - 2 * CAR_H < sim.enemy_y) & (sim.enemy_y < PLAYER_Y + CAR_H)
+               & (np.abs(sim.enemy_x - x) < CAR_W))
+    if closing.any():
+        enemy_x = sim.enemy_x[np.argmax(closing)]
+        return 1 if enemy_x <= x and x < WIDTH - 70 else -1
+    visible = (0 <= sim.coin_y) & (sim.coin_y < PLAYER_Y)
+    if not visible.any():
+        return 0
+    target = sim.coin_x[visible][np.argmax(sim.coin_y[visible])]
+    if abs(target - x) < PLAYER_SPEED:
+        return 0
+    return 1 if target > x else -1
+
+
+def run_headless(seconds, player="random", seed=None, q_path=None, record=None):
+    """
+    Simulate `seconds` of game time as fast as possible, restarting after each game over.
+    With q_path, the coin Q-table is loaded from (if present) and saved back to that .npy file.
+    record: trajectory dataset directory the coin transitions are appended to.
+    """
+    q_table = QTable.load(q_path, seed=seed) if q_path and os.path.exists(q_path) else None
+    recorder = None
+    if record:
+        from trajectory import TrajectoryWriter
+
+        recorder = TrajectoryWriter(record, GAME_FIELDS, attrs={"source": f"sim:{player}"})
+    sim = GameSim(seed=seed, q_table=q_table, recorder=recorder)
+    policy = RandomPlayer(seed) if player == "random" else scripted_player
+    frames = int(seconds * FPS)
+    games = coins = hits = 0
+    for _ in range(frames):
+        if sim.game_over:
+            games += 1
+            sim.reset()
+        collected, lost = sim.step(policy(sim))
+        coins += collected
+        hits += lost
+    if q_path:
+        sim.q.save(q_path)
+    if recorder:
+        recorder.close()
+    return {"frames": frames, "games": games, "coins": coins, "hits": hits}
+
+
+def _run_worker(args):
+    return run_headless(*args)
+
+
+def pretrain_q(q_table, dataset, passes=1, batch_size=4096):
+    """Replay recorded coin transitions (GAME_FIELDS, e.g. from play.py --record) through q_table.update."""
+    from trajectory import TrajectoryReader
+
+    reader = TrajectoryReader(dataset)
+    for p in range(passes):
+        for batch in reader.batches(batch_size, shuffle=True, seed=p):
+            q_table.update(batch["state"].astype(np.int64), batch["action"].astype(np.int64), batch["reward"],
+                           batch["next_state"].astype(np.int64))
+    return len(reader) * passes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the car game headless at unlimited speed")
+    parser.add_argument("--seconds", type=float, default=600.0, help="game-seconds to simulate per worker")
+    parser.add_argument("--player", choices=["random", "scripted"], default="random")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--q-path", help="coin Q-table .npy to load and save (single worker only)")
+    parser.add_argument("--record", metavar="DIR", help="append coin transitions to this trajectory dataset")
+    parser.add_argument("--pretrain", metavar="DIR",
+                        help="update the --q-path Q-table from a recorded dataset (e.g. play.py --record) and exit")
+    parser.add_argument("--passes", type=int, default=1, help="passes over the --pretrain dataset")
+    args = parser.parse_args()
+    if (args.q_path or args.record) and args.workers > 1:
+        parser.error("--q-path and --record need --workers 1")
+    if args.pretrain:
+        if not args.q_path:
+            parser.error("--pretrain needs --q-path")
+        q = QTable.load(args.q_path) if os.path.exists(args.q_path) else QTable(LANE_COUNT * LANE_COUNT, len(ACTIONS))
+        start = time.perf_counter()
+        rows = pretrain_q(q, args.pretrain, args.passes)
+        q.save(args.q_path)
+        print(f"{rows} transitions in {time.perf_counter() - start:.2f}s; Q-table saved to {args.q_path}")
+        raise SystemExit
+
+    jobs = [(args.seconds, args.player, args.seed + i, args.q_path, args.record) for i in range(args.workers)]
+    start = time.perf_counter()
+    if args.workers > 1:
+        with Pool(args.workers) as pool:
+            results = pool.map(_run_worker, jobs)
+    else:
+        results = [_run_worker(jobs[0])]
+    elapsed = time.perf_counter() - start
+
+    total = {k: sum(r[k] for r in results) for k in results[0]}
+    sim_seconds = total["frames"] / FPS
+    print(f"{sim_seconds:.0f} game-seconds in {elapsed:.2f}s ({sim_seconds / elapsed:.0f} game-s per wall-s)")
+    print(f"games={total['games']} coins={total['coins']} hits={total['hits']}")
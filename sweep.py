@@ -0,0 +1,198 @@
+# sweep.py
+# Hyperparameter sweeps over config.TrainConfig. Trials run concurrently in a process pool whose workers are
+# each pinned to their own CPUs; grid or random search, optionally with successive halving, which stops the
+# worst trials early and resumes the rest from their checkpoints with a larger episode budget.
+import argparse
+import ast
+import csv
+import math
+import multiprocessing as mp
+import os
+import time
+from contextlib import redirect_stdout
+from dataclasses import fields
+
+import numpy as np
+
+SWEEP_DIR = "sweeps/latest"
+ETA = 3  # successive halving keeps the best 1/ETA of trials per rung
+TRAIN_SEED = 0
+
+
+def parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_param(text):
+    """
+    NAME=V1,V2,... is a categorical choice; NAME=uniform:LO:HI, loguniform:LO:HI or int:LO:HI is a
+    distribution for random search. NAME must be a TrainConfig field.
+    """
+    from config import TrainConfig
+
+    name, _, spec = text.partition("=")
+    if name not in {f.name for f in fields(TrainConfig)}:
+        raise argparse.ArgumentTypeError(f"{name!r} is not a TrainConfig field")
+    kind, _, bounds = spec.partition(":")
+    if kind in ("uniform", "loguniform", "int") and bounds:
+        lo, hi = (parse_value(b) for b in bounds.split(":"))
+        return name, (kind, lo, hi)
+    return name, [parse_value(v) for v in spec.split(",")]
+
+
+def grid(space):
+    trials = [{}]
+    for name, spec in space.items():
+        if not isinstance(spec, list):
+            raise ValueError(f"grid search needs a list of values for {name}, got {spec[0]}:{spec[1]}:{spec[2]}")
+        trials = [dict(t, **{name: v}) for t in trials for v in spec]
+    return trials
+
+
+def sample(space, n, seed=None):
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(n):
+        params = {}
+        for name, spec in space.items():
+            if isinstance(spec, list):
+                params[name] = spec[rng.integers(len(spec))]
+                continue
+            kind, lo, hi = spec
+            if kind == "uniform":
+                params[name] = float(rng.uniform(lo, hi))
+            elif kind == "loguniform":
+                params[name] = float(math.exp(rng.uniform(math.log(lo), math.log(hi))))
+            else:
+                params[name] = int(rng.integers(lo, hi + 1))
+        trials.append(params)
+    return trials
+
+
+def _init_worker(slots, cpus_per_trial):
+    """Pin this pool worker to its own block of cpus_per_trial CPUs and size torch's thread pool to it."""
+    import torch
+
+    with slots.get_lock():
+        slot = slots.value
+        slots.value += 1
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        first = slot * cpus_per_trial % len(cpus)
+        os.sched_setaffinity(0, cpus[first:first + cpus_per_trial] or cpus)
+    torch.set_num_threads(cpus_per_trial)
+
+
+def run_trial(job):
+    """Train (or resume) one trial up to `episodes`, then score its final policy with a greedy evaluation."""
+    from checkpoint import load_checkpoint
+    from config import TrainConfig
+    from dqn import evaluate_policy, train
+
+    trial_id, params, episodes, sweep_dir, seed = job
+    trial_dir = os.path.join(sweep_dir, f"trial_{trial_id:03d}")
+    os.makedirs(trial_dir, exist_ok=True)
+    config = TrainConfig(**dict(params, episodes=episodes, checkpoint_every=episodes))
+    resume = trial_dir if os.path.exists(os.path.join(trial_dir, "index.json")) else None
+    start = time.perf_counter()
+    with open(os.path.join(trial_dir, "train.log"), "a") as log, redirect_stdout(log):
+        rewards = train(config, model_path=os.path.join(trial_dir, "best.pth"), seed=seed,
+                        checkpoint_dir=trial_dir, resume=resume)
+    score = evaluate_policy(load_checkpoint(trial_dir)["policy"], config)
+    return {"trial": trial_id, "episodes": episodes, "score": score,
+            "train_reward": float(np.mean(rewards[-10:])), "seconds": time.perf_counter() - start, **params}
+
+
+def rungs(min_episodes, max_episodes, eta):
+    budgets = [min_episodes]
+    while budgets[-1] * eta < max_episodes:
+        budgets.append(budgets[-1] * eta)
+    if budgets[-1] != max_episodes:
+        budgets.append(max_episodes)
+    return budgets
+
+
+def run_sweep(trials, pool, sweep_dir, max_episodes, min_episodes=None, eta=ETA, seed=TRAIN_SEED, table=None):
+    """
+    Run every trial to max_episodes, or with min_episodes as successive halving: run all to min_episodes,
+    keep the best 1/eta by score, resume those to eta times the budget, and so on up to max_episodes.
+    Returns one row per trial, the latest result for each; stopped trials have status "stopped".
+    """
+    budgets = rungs(min_episodes, max_episodes, eta) if min_episodes else [max_episodes]
+    alive = list(range(len(trials)))
+    results = {}
+    for r, budget in enumerate(budgets):
+        jobs = [(i, trials[i], budget, sweep_dir, seed) for i in alive]
+        for row in pool.imap_unordered(run_trial, jobs):
+            results[row["trial"]] = dict(row, status="running")
+        alive.sort(key=lambda i: results[i]["score"], reverse=True)
+        if r < len(budgets) - 1:
+            for i in alive[max(1, len(alive) // eta):]:
+                results[i]["status"] = "stopped"
+            alive = alive[:max(1, len(alive) // eta)]
+        print(f"rung {r}: {budget} episodes, best score {results[alive[0]]['score']:.2f} (trial {alive[0]})")
+        if table:
+            write_table(results.values(), table)
+    for i in alive:
+        results[i]["status"] = "completed"
+    rows = sorted(results.values(), key=lambda row: (row["status"] != "completed", -row["score"]))
+    if table:
+        write_table(rows, table)
+    return rows
+
+
+def write_table(rows, path):
+    rows = list(rows)
+    columns = ["trial", "status", "episodes", "score", "train_reward", "seconds"]
+    columns += sorted({k for row in rows for k in row} - set(columns))
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def print_table(rows, limit=20):
+    params = sorted({k for row in rows for k in row} - {"trial", "status", "episodes", "score", "train_reward", "seconds"})
+    print(f"{'trial':>5s} {'status':9s} {'episodes':>8s} {'score':>8s} {'train':>8s} {'secs':>7s}  params")
+    for row in rows[:limit]:
+        values = " ".join(f"{k}={row[k]:.4g}" if isinstance(row[k], float) else f"{k}={row[k]}" for k in params)
+        print(f"{row['trial']:5d} {row['status']:9s} {row['episodes']:8d} {row['score']:8.2f} "
+              f"{row['train_reward']:8.2f} {row['seconds']:7.1f}  {values}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep over config.TrainConfig")
+    parser.add_argument("--param", type=parse_param, action="append", required=True,
+                        help="NAME=V1,V2,... or NAME=uniform|loguniform|int:LO:HI; repeat per parameter")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--trials", type=int, default=16, help="number of random-search trials")
+    parser.add_argument("--episodes", type=int, default=300, help="episode budget of trials that run to the end")
+    parser.add_argument("--min-episodes", type=int,
+                        help="enable successive halving, starting every trial with this many episodes")
+    parser.add_argument("--eta", type=int, default=ETA, help="successive halving keeps 1/eta of trials per rung")
+    parser.add_argument("--cpus-per-trial", type=int, default=1)
+    parser.add_argument("--workers", type=int, help="concurrent trials (default: CPUs // cpus-per-trial)")
+    parser.add_argument("--seed", type=int, default=0, help="random-search seed")
+    parser.add_argument("--train-seed", type=int, default=TRAIN_SEED, help="seed shared by every trial's training run")
+    parser.add_argument("--out", default=SWEEP_DIR, help="directory for trial checkpoints, logs and results.csv")
+    args = parser.parse_args()
+
+    space = dict(args.param)
+    trials = grid(space) if args.search == "grid" else sample(space, args.trials, args.seed)
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    workers = args.workers or max(1, cpus // args.cpus_per_trial)
+    os.makedirs(args.out, exist_ok=True)
+    table = os.path.join(args.out, "results.csv")
+    print(f"{len(trials)} trials on {workers} workers x {args.cpus_per_trial} CPUs")
+
+    ctx = mp.get_context("spawn")
+    start = time.perf_counter()
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(ctx.Value("i", 0), args.cpus_per_trial)) as pool:
+        rows = run_sweep(trials, pool, args.out, args.episodes, args.min_episodes, args.eta, args.train_seed, table)
+    print_table(rows)
+    print(f"Done in {time.perf_counter() - start:.1f}s; results in {table}")
@@ -0,0 +1,66 @@
+# tests/test_actors.py
+# Actors read the learner's shared weights under the weights_version seqlock.
+import os
+import sys
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from actors import read_weights
+from dqn import Net
+
+
+class Version:
+    def __init__(self, value):
+        self.value = value
+
+
+class PublishingNet(Net):
+    """Shared net whose learner publishes new weights while the first read is in progress."""
+    def __init__(self, version, publishes):
+        super().__init__(5, 9)
+        self.version = version
+        self.publishes = publishes
+        self.reads = 0
+
+    def state_dict(self, *args, **kwargs):
+        self.reads += 1
+        state = super().state_dict(*args, **kwargs)
+        if self.publishes:
+            self.publishes -= 1
+            self.version.value += 1  # learner starts copying
+            with torch.no_grad():
+                for p in self.parameters():
+                    p.add_(1.0)
+            self.version.value += 1
+        return state
+
+
+def test_read_retries_when_weights_change_during_the_read():
+    version = Version(2)
+    net = PublishingNet(version, publishes=1)
+    got, policy = read_weights(net, version)
+    assert (got, net.reads) == (4, 2)
+    obs = np.random.default_rng(0).uniform(-1, 1, (8, 5)).astype(np.float32)
+    with torch.no_grad():
+        expected = net(torch.from_numpy(obs)).numpy()
+    np.testing.assert_allclose(policy.forward_batch(obs), expected, rtol=1e-5)
+
+
+def test_read_waits_out_an_odd_version():
+    version = Version(3)
+    net = PublishingNet(version, publishes=0)
+
+    class Finishing:
+        reads = 0
+
+        @property
+        def value(self):
+            Finishing.reads += 1
+            if Finishing.reads > 2:
+                version.value = 4
+            return version.value
+
+    got, _ = read_weights(net, Finishing())
+    assert got == 4 and net.reads == 1
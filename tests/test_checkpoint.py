@@ -0,0 +1,89 @@
+# tests/test_checkpoint.py
+# CheckpointManager retention and atomic writes, and dqn.train resuming exactly where it stopped.
+import os
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import checkpoint
+import dqn
+from checkpoint import CheckpointManager, atomic_save, load_checkpoint
+
+SMALL_RUN = dict(min_replay=32, batch_size=16, checkpoint_every=3, env=dict(dqn.ENV_CONFIG, max_steps=60))
+
+
+def replay(step):
+    return {"states": np.full((4, 2), step, dtype=np.float32), "pos": step}
+
+
+def test_prune_keeps_last_n_and_best_k(tmp_path):
+    manager = CheckpointManager(str(tmp_path), keep_last=2, keep_best=2)
+    scores = {1: 5.0, 2: 1.0, 3: 9.0, 4: None, 5: 2.0, 6: 0.0}
+    for step, score in scores.items():
+        manager.save(step, {"step": step}, score=score, replay=replay(step))
+    manager.close()
+
+    kept = [1, 3, 5, 6]  # best two by score, then the last two
+    assert [e["step"] for e in manager.index] == kept
+    assert [e["step"] for e in CheckpointManager._read_index(str(tmp_path))] == kept
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ["index.json"] + [f"ckpt_{s:08d}.pt" for s in kept] + [f"replay_{s:08d}" for s in kept])
+    assert manager.best() == str(tmp_path / "ckpt_00000003.pt")
+    assert manager.latest() == str(tmp_path / "ckpt_00000006.pt")
+
+    state = load_checkpoint(str(tmp_path))
+    assert state["step"] == 6 and state["replay"]["pos"] == 6
+    assert isinstance(state["replay"]["states"], np.memmap)
+    np.testing.assert_array_equal(state["replay"]["states"], replay(6)["states"])
+
+
+def test_failed_write_leaves_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "model.pth")
+    atomic_save({"version": 1}, path)
+
+    def broken_save(obj, f):
+        with open(f, "wb") as out:
+            out.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(checkpoint.torch, "save", broken_save)
+    writer = checkpoint.AsyncWriter()
+    writer.write({"version": 2}, path)
+    with pytest.raises(RuntimeError, match="background checkpoint write failed"):
+        writer.wait()
+    writer.close()
+    monkeypatch.undo()
+    assert torch.load(path) == {"version": 1}
+
+
+def final_policy(directory):
+    return load_checkpoint(str(directory))["policy"]
+
+
+@pytest.mark.parametrize("prioritized", [False, True])
+def test_resumed_run_matches_uninterrupted(tmp_path, prioritized):
+    config = dict(SMALL_RUN, prioritized=prioritized)
+    full = dqn.train(episodes=6, seed=0, model_path=str(tmp_path / "full.pth"),
+                     checkpoint_dir=str(tmp_path / "full"), **config)
+    dqn.train(episodes=3, seed=0, model_path=str(tmp_path / "split.pth"), checkpoint_dir=str(tmp_path / "split"),
+              **config)
+    resumed = dqn.train(episodes=6, seed=0, model_path=str(tmp_path / "split.pth"),
+                        checkpoint_dir=str(tmp_path / "split"), resume=str(tmp_path / "split"), **config)
+
+    assert resumed == full
+    for name, weights in final_policy(tmp_path / "full").items():
+        torch.testing.assert_close(final_policy(tmp_path / "split")[name], weights, rtol=0, atol=0)
+
+
+def test_checkpoints_without_replay(tmp_path):
+    directory = tmp_path / "ckpt"
+    dqn.train(episodes=3, seed=0, model_path=str(tmp_path / "m.pth"), checkpoint_dir=str(directory),
+              checkpoint_replay=False, **SMALL_RUN)
+    assert not [name for name in os.listdir(directory) if name.startswith("replay_")]
+    assert "replay" not in load_checkpoint(str(directory))
+    rewards = dqn.train(episodes=5, seed=0, model_path=str(tmp_path / "m.pth"), checkpoint_dir=str(directory),
+                        resume=str(directory), checkpoint_replay=False, **SMALL_RUN)
+    assert len(rewards) == 5
@@ -0,0 +1,184 @@
+# tests/test_dqn.py
+# Prioritized replay, n-step returns and dqn.train's learner bookkeeping.
+import os
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dqn
+from instrument import NullInstrumentation
+
+STATE_DIM = 3
+SMALL_RUN = dict(episodes=2, min_replay=32, batch_size=16, env=dict(dqn.ENV_CONFIG, max_steps=60))
+
+
+class UpdateCounter(NullInstrumentation):
+    def __init__(self):
+        self.steps = 0
+        self.updates = 0
+
+    def step(self, updates):
+        self.steps += 1
+        self.updates += updates
+
+
+@pytest.mark.parametrize("replay_ratio", [0.25, 1.0, 3.0])
+@pytest.mark.parametrize("fused, updates_per_sample", [(False, 1), (True, 2)])
+def test_logged_updates_match_gradient_steps(tmp_path, monkeypatch, replay_ratio, fused, updates_per_sample):
+    performed = []
+    if fused:
+        update = dqn.FusedLearner.update
+        monkeypatch.setattr(dqn.FusedLearner, "update",
+                            lambda self, *a, **k: (performed.append(self.updates_per_sample), update(self, *a, **k)))
+    else:
+        learn = dqn.learn
+        monkeypatch.setattr(dqn, "learn", lambda *a, **k: (performed.append(1), learn(*a, **k)))
+    counter = UpdateCounter()
+    dqn.train(model_path=str(tmp_path / "model.pth"), seed=0, instrument=counter, replay_ratio=replay_ratio,
+              fused=fused, updates_per_sample=updates_per_sample, **SMALL_RUN)
+
+    learning_steps = counter.steps - (SMALL_RUN["min_replay"] - 1)
+    assert counter.updates == sum(performed)
+    assert abs(counter.updates - learning_steps * replay_ratio) < updates_per_sample
+
+
+def transitions(start, n):
+    """n distinguishable transitions: state rows and actions count up from start."""
+    ids = np.arange(start, start + n)
+    states = np.repeat(ids[:, None], STATE_DIM, axis=1).astype(np.float32)
+    return states, ids, ids.astype(np.float32), states + 0.5, ids % 2 == 0
+
+
+@pytest.mark.parametrize("capacity", [8, 13])
+def test_sum_tree_totals_follow_updates(capacity):
+    rng = np.random.default_rng(0)
+    tree = dqn.SumTree(capacity)
+    leaves = np.zeros(capacity)
+    for _ in range(20):
+        idx = rng.choice(capacity, rng.integers(1, capacity + 1), replace=False)
+        leaves[idx] = rng.uniform(0.1, 10.0, len(idx))
+        tree.update(idx, leaves[idx])
+        assert tree.total == pytest.approx(leaves.sum())
+        assert tree.min == leaves[leaves > 0].min()
+        np.testing.assert_array_equal(tree.get(np.arange(capacity)), leaves)
+    # find() maps each cumulative value to the leaf whose range holds it
+    bounds = np.cumsum(leaves)
+    np.testing.assert_array_equal(tree.find(bounds - 1e-6), np.arange(capacity))
+
+
+def test_sampling_frequency_tracks_priority():
+    buffer = dqn.PrioritizedReplayBuffer(8, STATE_DIM, alpha=0.6, seed=0)
+    buffer.push_many(*transitions(0, 8))
+    td_errors = np.array([0.1, 0.5, 1.0, 2.0, 4.0, 0.0, 8.0, 1.0])
+    buffer.update_priorities(np.arange(8), td_errors)
+    expected = (np.abs(td_errors) + buffer.eps) ** buffer.alpha
+    expected /= expected.sum()
+    counts = np.bincount(np.concatenate([buffer.sample_indices(256) for _ in range(400)]), minlength=8)
+    np.testing.assert_allclose(counts / counts.sum(), expected, atol=0.01)
+
+
+def test_importance_weights_anneal_beta_per_call():
+    buffer = dqn.PrioritizedReplayBuffer(8, STATE_DIM, beta_start=0.4, beta_frames=10, seed=0)
+    buffer.push_many(*transitions(0, 8))
+    buffer.update_priorities(np.arange(8), np.arange(1.0, 9.0))
+    idx = np.arange(8)
+    weights = buffer.importance_weights(idx)
+    assert weights.max() == 1.0 and weights.argmax() == 0
+    assert buffer.beta == pytest.approx(0.46)
+
+
+def test_fused_learner_anneals_beta_per_gradient_step():
+    torch.manual_seed(0)
+    policy_net, target_net = dqn.Net(STATE_DIM, 4), dqn.Net(STATE_DIM, 4)
+    optimizer = torch.optim.Adam(policy_net.parameters())
+    buffer = dqn.PrioritizedReplayBuffer(64, STATE_DIM, seed=0)
+    states, actions, rewards, next_states, dones = transitions(0, 64)
+    buffer.push_many(states, actions % 4, rewards, next_states, dones)
+    learner = dqn.FusedLearner(policy_net, target_net, optimizer, updates_per_sample=3, batch_size=8)
+    learner.update(buffer)
+    learner.update(buffer)
+    assert buffer.frame == 6
+
+
+def test_push_many_wraps_and_overwrites_oldest():
+    buffer = dqn.PrioritizedReplayBuffer(5, STATE_DIM, seed=0)
+    buffer.push_many(*transitions(0, 3))
+    buffer.update_priorities(np.arange(3), np.array([3.0, 1.0, 2.0]))
+    top = buffer.max_priority ** buffer.alpha
+    buffer.push_many(*transitions(3, 4))  # ids 3..6: slots 3, 4, then 0, 1
+    assert (buffer.pos, len(buffer)) == (2, 5)
+    np.testing.assert_array_equal(buffer.actions, [5, 6, 2, 3, 4])
+    np.testing.assert_array_equal(buffer.states[:, 0], [5, 6, 2, 3, 4])
+    np.testing.assert_array_equal(buffer.next_states[:, 0], [5.5, 6.5, 2.5, 3.5, 4.5])
+    np.testing.assert_array_equal(buffer.dones, [False, True, True, False, True])
+    # overwritten and new slots get the max priority; slot 2 keeps its own
+    leaves = buffer.tree.get(np.arange(5))
+    np.testing.assert_allclose(leaves[[0, 1, 3, 4]], top)
+    assert leaves[2] == pytest.approx((2.0 + buffer.eps) ** buffer.alpha)
+    assert buffer.tree.total == pytest.approx(leaves.sum())
+    # more than capacity in one call keeps only the newest
+    buffer.push_many(*transitions(10, 7))
+    np.testing.assert_array_equal(np.sort(buffer.actions), np.arange(12, 17))
+    assert buffer.actions[(buffer.pos - 1) % 5] == 16
+
+
+class Recorder:
+    """Stands in for a replay buffer and keeps what the accumulator emits."""
+    def __init__(self):
+        self.pushed = []
+
+    def push(self, s, a, r, ns, d):
+        self.pushed.append((s, a, r, ns, d))
+
+    push_many = push
+
+
+def run_episode(acc, rewards):
+    for t, r in enumerate(rewards):
+        acc.push(t, 0, r, t + 1, t == len(rewards) - 1)
+
+
+def test_n_step_returns_over_an_episode():
+    buffer = Recorder()
+    acc = dqn.NStepAccumulator(buffer, n=3, gamma=0.5)
+    run_episode(acc, [1.0, 2.0, 3.0, 4.0, 5.0])
+    states, _, returns, next_states, dones = zip(*buffer.pushed)
+    assert states == (0, 1, 2, 3, 4)
+    assert returns == pytest.approx((2.75, 4.5, 6.25, 6.5, 5.0))
+    # full windows bootstrap from s_t+3; the window closed by done and the flushed tail end at the terminal state
+    assert next_states == (3, 4, 5, 5, 5)
+    assert dones == (False, False, True, True, True)
+    assert not acc.pending
+
+
+def test_n_step_short_episode_is_flushed_truncated():
+    buffer = Recorder()
+    acc = dqn.NStepAccumulator(buffer, n=3, gamma=0.5)
+    run_episode(acc, [1.0, 2.0])
+    assert buffer.pushed == [(0, 0, 2.0, 2, True), (1, 0, 2.0, 2, True)]
+    # nothing carries over into the next episode
+    buffer.pushed.clear()
+    run_episode(acc, [4.0, 4.0, 4.0, 4.0])
+    assert [(s, r) for s, _, r, _, _ in buffer.pushed] == [(0, 7.0), (1, 7.0), (2, 6.0), (3, 4.0)]
+
+
+def test_n_step_push_many_keeps_per_npc_returns():
+    buffer = Recorder()
+    acc = dqn.NStepAccumulator(buffer, n=2, gamma=0.5)
+    acc.push_many("s0", "a0", np.array([1.0, -1.0]), "s1", np.array([False, False]))
+    assert not buffer.pushed
+    acc.push_many("s1", "a1", np.array([2.0, 4.0]), "s2", np.array([False, False]))
+    s, a, r, ns, d = buffer.pushed[0]
+    assert (s, a, ns) == ("s0", "a0", "s2")
+    np.testing.assert_allclose(r, [2.0, 1.0])
+
+
+def test_n_step_learner_bootstraps_with_gamma_to_the_n(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(dqn, "learn", lambda *args, **kwargs: seen.update(gamma=args[-1]))
+    update, _ = dqn.make_update(None, None, None, dqn.TrainConfig(gamma=0.9, n_step=3))
+    update(None, None)
+    assert seen["gamma"] == pytest.approx(0.9 ** 3)
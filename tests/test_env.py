@@ -0,0 +1,81 @@
+# tests/test_env.py
+# CarAvoidEnv's list path for few NPCs against its array path, and VecCarAvoidEnv's returned buffers.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import env as env_module
+from env import OBS_MODES, CarAvoidEnv, VecCarAvoidEnv
+
+ARCHETYPES = ("neutral", "aggressive", "defensive")
+
+
+def rollout(monkeypatch, scalar_max, episodes=3, **config):
+    monkeypatch.setattr(env_module, "SCALAR_MAX_NPCS", scalar_max)
+    env = CarAvoidEnv(**config)
+    rng = np.random.default_rng(1)
+    trace = []
+    for episode in range(episodes):
+        obs = env.reset(seed=episode)
+        assert env._scalar == (scalar_max > 0)
+        trace.append((obs, None, None))
+        done = False
+        while not done:
+            obs, reward, done, info = env.step(int(rng.integers(env.action_space())))
+            trace.append((obs, reward, done))
+    return trace
+
+
+@pytest.mark.parametrize("archetype", ARCHETYPES)
+@pytest.mark.parametrize("obs_mode", OBS_MODES)
+@pytest.mark.parametrize("npc_count", [1, 4])
+def test_scalar_and_array_paths_match(monkeypatch, archetype, obs_mode, npc_count):
+    config = dict(lanes=5, npc_count=npc_count, archetype=archetype, obs_mode=obs_mode, max_steps=150,
+                  speed_scale=1.5)
+    scalar = rollout(monkeypatch, 24, **config)
+    array = rollout(monkeypatch, 0, **config)
+    assert len(scalar) == len(array)
+    for (obs_s, reward_s, done_s), (obs_a, reward_a, done_a) in zip(scalar, array):
+        np.testing.assert_array_equal(obs_s, obs_a)
+        assert reward_s == reward_a
+        assert done_s == done_a
+
+
+@pytest.mark.parametrize("scalar_max", [24, 0])
+def test_npc_state_is_an_array_copy(monkeypatch, scalar_max):
+    monkeypatch.setattr(env_module, "SCALAR_MAX_NPCS", scalar_max)
+    env = CarAvoidEnv(npc_count=3, seed=0)
+    lanes, y, speed = env.npc_lane, env.npc_y, env.npc_speed
+    assert (lanes.dtype, y.dtype, speed.dtype) == (np.int64, np.float64, np.float64)
+    env.step(0)
+    assert not np.array_equal(env.npc_y, y)
+    lanes[:] = -1
+    assert (env.npc_lane >= 0).all()
+
+
+def run_to_timeout(env):
+    """Step until every env hits max_steps; returns that step's obs and info."""
+    for _ in range(env.max_steps):
+        obs, reward, done, info = env.step(np.zeros(env.num_envs, dtype=np.int64))
+    assert done.all()
+    return obs, info
+
+
+def test_vec_final_obs_is_copied_with_copy_obs():
+    env = VecCarAvoidEnv(8, max_steps=3, seed=0)
+    _, info = run_to_timeout(env)
+    kept = info["final_obs"]
+    before = kept.copy()
+    _, later = run_to_timeout(env)
+    assert later["final_obs"] is not kept
+    assert not np.array_equal(later["final_obs"], before)
+    np.testing.assert_array_equal(kept, before)
+
+
+def test_vec_buffers_are_reused_without_copy_obs():
+    env = VecCarAvoidEnv(8, max_steps=3, seed=0, copy_obs=False)
+    obs, info = run_to_timeout(env)
+    assert obs is env.obs and info["final_obs"] is env.final_obs
@@ -0,0 +1,59 @@
+# tests/test_numpy_policy.py
+# NumpyPolicy (float32 and int8 exports) against the torch Net it was exported from.
+import os
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dqn import Net
+from numpy_policy import NumpyPolicy, export_npz
+
+STATE_DIM, N_ACTIONS = 5, 9
+
+
+@pytest.fixture
+def net():
+    torch.manual_seed(0)
+    return Net(STATE_DIM, N_ACTIONS).eval()
+
+
+@pytest.fixture
+def obs():
+    return np.random.default_rng(0).uniform(-1, 1, (256, STATE_DIM)).astype(np.float32)
+
+
+def expected_q(net, obs):
+    with torch.no_grad():
+        return net(torch.from_numpy(obs)).numpy()
+
+
+@pytest.mark.parametrize("int8, atol, rtol", [(False, 1e-5, 0.0), (True, 1e-4, 0.02)])
+def test_export_matches_net(tmp_path, net, obs, int8, atol, rtol):
+    model_path = tmp_path / "net.pth"
+    torch.save(net.state_dict(), model_path)
+    policy = NumpyPolicy.load(export_npz(model_path, str(tmp_path / "net.npz"), int8=int8))
+    expected = expected_q(net, obs)
+    tol = atol + rtol * np.abs(expected).max()
+
+    np.testing.assert_allclose(policy.forward_batch(obs), expected, rtol=0, atol=tol)
+    single = np.stack([policy.forward(row).copy() for row in obs])
+    np.testing.assert_allclose(single, expected, rtol=0, atol=tol)
+    if not int8:
+        assert [policy.act(row) for row in obs] == expected.argmax(axis=1).tolist()
+
+
+def test_from_state_dict_matches_net(net, obs):
+    policy = NumpyPolicy.from_state_dict(net.state_dict())
+    np.testing.assert_allclose(policy.forward_batch(obs), expected_q(net, obs), rtol=0, atol=1e-5)
+
+
+def test_from_state_dict_copies_weights(net, obs):
+    policy = NumpyPolicy.from_state_dict(net.state_dict())
+    before = policy.forward_batch(obs).copy()
+    with torch.no_grad():
+        for p in net.parameters():
+            p.add_(1.0)  # a learner updating shared weights in place
+    np.testing.assert_array_equal(policy.forward_batch(obs), before)
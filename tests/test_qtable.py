@@ -0,0 +1,53 @@
+# tests/test_qtable.py
+# QTable.update's three reductions (small batch, dense bincount, np.unique) against a plain mean-TD update.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import qtable
+from qtable import QTable
+
+N_STATES, N_ACTIONS = 6, 4
+PATHS = {"small": (64, 4096), "dense": (0, 4096), "unique": (0, 0)}  # SMALL_BATCH_MAX, DENSE_UPDATE_MAX
+
+
+def batch(seed, n):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(N_STATES, N_ACTIONS)).astype(np.float32)
+    # few states so (state, action) pairs repeat
+    states, actions = rng.integers(0, 3, n), rng.integers(0, 2, n)
+    return values, states, actions, rng.normal(size=n).astype(np.float32), rng.integers(0, N_STATES, n)
+
+
+def expected(values, states, actions, rewards, next_states, alpha=0.1, gamma=0.9):
+    target = rewards + np.float32(gamma) * values[next_states].max(axis=1)
+    td = (target - values[states, actions]).astype(np.float64)
+    out = values.astype(np.float64)
+    for pair in set(zip(states.tolist(), actions.tolist())):
+        hit = (states == pair[0]) & (actions == pair[1])
+        out[pair] += alpha * td[hit].mean()
+    return out
+
+
+def update(monkeypatch, path, values, *transitions):
+    small, dense = PATHS[path]
+    monkeypatch.setattr(qtable, "SMALL_BATCH_MAX", small)
+    monkeypatch.setattr(qtable, "DENSE_UPDATE_MAX", dense)
+    q = QTable(N_STATES, N_ACTIONS, alpha=0.1, gamma=0.9, values=values.copy())
+    q.update(*transitions)
+    return q.values
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n", [1, 7, 40])
+def test_update_paths_agree(monkeypatch, seed, n):
+    values, *transitions = batch(seed, n)
+    assert len(set(zip(transitions[0].tolist(), transitions[1].tolist()))) < n or n == 1
+    results = {path: update(monkeypatch, path, values, *transitions) for path in PATHS}
+    np.testing.assert_array_equal(results["small"], results["dense"])
+    for path, result in results.items():
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, expected(values, *transitions), rtol=1e-6, atol=1e-6, err_msg=path)
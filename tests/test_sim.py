@@ -0,0 +1,38 @@
+# tests/test_sim.py
+# GameSim's per-entity path for small games against its array path: same seed, same game.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sim
+from sim import GameSim, RandomPlayer, scripted_player
+
+
+def play(monkeypatch, scalar_max, seed, coin_count, enemy_count, player, frames=3000):
+    monkeypatch.setattr(sim, "SCALAR_MAX_ENTITIES", scalar_max)
+    game = GameSim(seed=seed, coin_count=coin_count, enemy_count=enemy_count)
+    policy = RandomPlayer(seed) if player == "random" else scripted_player
+    trace = []
+    for _ in range(frames):
+        result = game.step(policy(game))
+        # tolist() compares values, so the -0.0 numpy's trunc can leave in a coin's y equals 0.0
+        trace.append((result, game.score, game.player_lives, game.level, game.player_x,
+                      [a.tolist() for a in (game.coin_x, game.coin_y, game.coin_speed,
+                                            game.enemy_x, game.enemy_y, game.enemy_speed)],
+                      game.q.values.tolist()))
+        if game.game_over:
+            break
+    return trace
+
+
+@pytest.mark.parametrize("coin_count, enemy_count", [(4, 3), (1, 1), (10, 6)])
+@pytest.mark.parametrize("player", ["random", "scripted"])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_scalar_and_array_paths_match(monkeypatch, seed, coin_count, enemy_count, player):
+    assert coin_count + enemy_count <= sim.SCALAR_MAX_ENTITIES
+    scalar = play(monkeypatch, sim.SCALAR_MAX_ENTITIES, seed, coin_count, enemy_count, player)
+    array = play(monkeypatch, 0, seed, coin_count, enemy_count, player)
+    assert len(scalar) == len(array)
+    assert scalar == array
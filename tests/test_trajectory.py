@@ -0,0 +1,65 @@
+# tests/test_trajectory.py
+# TrajectoryWriter -> TrajectoryReader round trips through the chunked .npy format.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trajectory import TrajectoryReader, TrajectoryWriter, transition_fields
+
+STATE_DIM, CHUNK = 3, 7
+
+
+def rows(n, seed):
+    rng = np.random.default_rng(seed)
+    return {"state": rng.normal(size=(n, STATE_DIM)).astype(np.float32), "action": rng.integers(0, 9, n),
+            "reward": rng.normal(size=n).astype(np.float32),
+            "next_state": rng.normal(size=(n, STATE_DIM)).astype(np.float32), "done": rng.random(n) < 0.2}
+
+
+def write(directory, data, split):
+    """append() the first `split` rows one by one, append_many() the rest in uneven pieces."""
+    with TrajectoryWriter(directory, transition_fields(STATE_DIM), chunk_size=CHUNK, attrs={"source": "test"}) as w:
+        for i in range(split):
+            w.append(**{name: column[i] for name, column in data.items()})
+        n = len(data["action"])
+        for start, stop in ((split, split + 12), (split + 12, split + 13), (split + 13, n)):
+            w.append_many(**{name: column[start:stop] for name, column in data.items()})
+
+
+def read_all(reader):
+    chunks = list(reader.chunks())
+    return {name: np.concatenate([c[name] for c in chunks]) for name in reader.fields}
+
+
+def test_round_trip_with_partial_last_chunk(tmp_path):
+    data = rows(30, seed=0)
+    write(str(tmp_path), data, split=5)
+
+    reader = TrajectoryReader(str(tmp_path))
+    assert reader.chunk_rows == [7, 7, 7, 7, 2]
+    assert len(reader) == 30 and reader.attrs == {"source": "test"}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    back = read_all(reader)
+    for name, column in data.items():
+        assert back[name].dtype == column.dtype
+        np.testing.assert_array_equal(back[name], column)
+    batches = list(reader.batches(4))
+    np.testing.assert_array_equal(np.concatenate([b["action"] for b in batches]), data["action"])
+    shuffled = np.concatenate([b["action"] for b in reader.batches(4, shuffle=True, seed=0)])
+    np.testing.assert_array_equal(np.sort(shuffled), np.sort(data["action"]))
+
+
+def test_reopened_writer_appends(tmp_path):
+    first, second = rows(9, seed=1), rows(10, seed=2)
+    write(str(tmp_path), first, split=2)
+    write(str(tmp_path), second, split=0)
+    reader = TrajectoryReader(str(tmp_path))
+    assert reader.chunk_rows == [7, 2, 7, 3]
+    back = read_all(reader)
+    for name in first:
+        np.testing.assert_array_equal(back[name], np.concatenate([first[name], second[name]]))
+    with pytest.raises(ValueError):
+        TrajectoryWriter(str(tmp_path), transition_fields(STATE_DIM + 1))
@@ -0,0 +1,194 @@
+# trajectory.py
+# Columnar trajectory datasets: one fixed-dtype .npy per field per chunk, listed in meta.json. Writers hand
+# full chunks to a background thread; readers memory-map chunks so datasets larger than RAM stream through.
+import json
+import os
+import queue
+import shutil
+import threading
+
+import numpy as np
+
+CHUNK_SIZE = 8192  # rows per chunk
+MAX_PENDING = 4  # full chunks queued for the writer thread before append blocks
+META_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+
+def transition_fields(state_dim, state_dtype="float32"):
+    """Fields of CarAvoidEnv transitions as stored by dqn.train(record=...)."""
+    return {"state": (state_dtype, (state_dim,)), "action": ("int64", ()), "reward": ("float32", ()),
+            "next_state": (state_dtype, (state_dim,)), "done": ("bool", ())}
+
+
+def _read_meta(directory):
+    path = os.path.join(directory, META_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_meta(directory, meta):
+    tmp = os.path.join(directory, f"{META_NAME}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(directory, META_NAME))
+
+
+class TrajectoryWriter:
+    """
+    Appends rows to the dataset in directory. fields: {name: (dtype, shape)} with shape the per-row shape.
+    Rows collect in preallocated chunk_size columns; a full chunk goes to a background thread that writes
+    chunk_<n>/<field>.npy and then records it in meta.json, so the dataset on disk is always readable up to
+    its last finished chunk. An existing dataset with the same fields is appended to.
+    Errors raised by the writer thread are re-raised on the next append/close.
+    """
+    def __init__(self, directory, fields, chunk_size=CHUNK_SIZE, attrs=None):
+        self.directory = directory
+        self.fields = {name: (np.dtype(dtype).str, tuple(shape)) for name, (dtype, shape) in fields.items()}
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+        meta = _read_meta(directory)
+        if meta is None:
+            meta = {"version": FORMAT_VERSION, "fields": {k: [d, list(s)] for k, (d, s) in self.fields.items()},
+                    "attrs": attrs or {}, "chunks": []}
+            _write_meta(directory, meta)
+        elif {k: (d, tuple(s)) for k, (d, s) in meta["fields"].items()} != self.fields:
+            raise ValueError(f"{directory} holds a dataset with fields {meta['fields']}, not {self.fields}")
+        self.meta = meta
+        self._next_chunk = len(meta["chunks"])
+        self._columns = self._new_columns()
+        self._rows = 0
+        self._error = None
+        self._queue = queue.Queue(MAX_PENDING)
+        self._thread = threading.Thread(target=self._run, name="trajectory-writer", daemon=True)
+        self._thread.start()
+
+    def _new_columns(self):
+        return {name: np.empty((self.chunk_size, *shape), dtype) for name, (dtype, shape) in self.fields.items()}
+
+    def append(self, **row):
+        """Add one row; every field must be given."""
+        i = self._rows
+        for name, column in self._columns.items():
+            column[i] = row[name]
+        self._rows = i + 1
+        if self._rows == self.chunk_size:
+            self._flush()
+
+    def append_many(self, **columns):
+        """Add len(columns[field]) rows at once, e.g. one per NPC."""
+        n = len(columns[next(iter(self.fields))])
+        start = 0
+        while start < n:
+            take = min(n - start, self.chunk_size - self._rows)
+            for name, column in self._columns.items():
+                column[self._rows:self._rows + take] = columns[name][start:start + take]
+            self._rows += take
+            start += take
+            if self._rows == self.chunk_size:
+                self._flush()
+
+    def _flush(self):
+        self._raise_error()
+        if self._rows == 0:
+            return
+        columns = {name: column[:self._rows] for name, column in self._columns.items()}
+        self._queue.put((self._next_chunk, columns))
+        self._next_chunk += 1
+        self._columns = self._new_columns()
+        self._rows = 0
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write_chunk(*item)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write_chunk(self, index, columns):
+        name = f"chunk_{index:06d}"
+        final = os.path.join(self.directory, name)
+        tmp = f"{final}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for field, column in columns.items():
+            np.save(os.path.join(tmp, f"{field}.npy"), column)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+        self.meta["chunks"].append({"name": name, "rows": len(next(iter(columns.values())))})
+        _write_meta(self.directory, self.meta)
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("background trajectory write failed") from error
+
+    def close(self):
+        """Write the partial last chunk and wait until everything is on disk."""
+        if self._thread.is_alive():
+            self._flush()
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """
+    Read-only view of a dataset written by TrajectoryWriter. Chunks are memory-mapped when visited, so
+    iterating a dataset only keeps the pages it touches resident.
+    """
+    def __init__(self, directory):
+        meta = _read_meta(directory)
+        if meta is None:
+            raise FileNotFoundError(f"no trajectory dataset in {directory}")
+        self.directory = directory
+        self.fields = {name: (np.dtype(dtype), tuple(shape)) for name, (dtype, shape) in meta["fields"].items()}
+        self.attrs = meta["attrs"]
+        self.chunk_rows = [c["rows"] for c in meta["chunks"]]
+        self._chunk_names = [c["name"] for c in meta["chunks"]]
+
+    def __len__(self):
+        return sum(self.chunk_rows)
+
+    def chunk(self, i):
+        """{field: read-only memmap} for chunk i."""
+        path = os.path.join(self.directory, self._chunk_names[i])
+        return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in self.fields}
+
+    def chunks(self, shuffle=False, seed=None):
+        """Every chunk in order, or in a random order with shuffle."""
+        order = np.arange(len(self.chunk_rows))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for i in order:
+            yield self.chunk(i)
+
+    def batches(self, batch_size, shuffle=False, seed=None):
+        """
+        {field: array} batches of up to batch_size rows, read one chunk at a time. With shuffle, chunk
+        order and rows within each chunk are permuted; batches never span chunks.
+        """
+        rng = np.random.default_rng(seed)
+        for chunk in self.chunks(shuffle, rng):
+            n = len(next(iter(chunk.values())))
+            order = rng.permutation(n) if shuffle else None
+            for start in range(0, n, batch_size):
+                if shuffle:
+                    # sorted indices read each batch front to back through the mapped file
+                    rows = np.sort(order[start:start + batch_size])
+                    yield {name: column[rows] for name, column in chunk.items()}
+                else:
+                    yield {name: np.asarray(column[start:start + batch_size]) for name, column in chunk.items()}